@@ -0,0 +1,138 @@
+"""Thin command line client for the conversion daemon.
+
+Forwards a conversion to the daemon started with `main.py --serve`, so a
+call costs little more than starting Python: this script imports nothing
+but the standard library. When no daemon is listening it converts
+in-process instead, the way main.py does.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+
+SOCKET_ENV = 'DRAWIO2PPTX_SOCKET'
+
+
+class DaemonUnavailable(Exception):
+    """No daemon is listening on the socket."""
+
+
+def default_socket_path():
+    """The daemon's socket: $DRAWIO2PPTX_SOCKET, else one per user."""
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'drawio2pptx.sock')
+    return os.path.join('/tmp', f'drawio2pptx-{os.getuid()}.sock')
+
+
+def request(path, message, out=None):
+    """Send one request to the daemon and return its final reply.
+
+    Lines the daemon prints on the way are passed to `out`. Raises
+    DaemonUnavailable if nothing is listening on `path`.
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        raise DaemonUnavailable("Unix sockets are not supported here")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise DaemonUnavailable(str(e))
+        sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as replies:
+            for line in replies:
+                reply = json.loads(line)
+                if 'out' in reply:
+                    if out:
+                        out(reply['out'])
+                    continue
+                return reply
+    finally:
+        sock.close()
+    raise ConnectionError("The daemon closed the connection without replying")
+
+
+def convert_in_process(input_file, output_file, options):
+    from converter import convert
+    from converter.observe import PrintObserver
+
+    convert(input_file, output_file, observer=PrintObserver(), **options)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert Draw.io XML to PowerPoint through the conversion daemon")
+    parser.add_argument("input_file", nargs='?')
+    parser.add_argument("output_file", nargs='?')
+    parser.add_argument("--socket", default=None,
+                        help=f"Daemon socket (default: ${SOCKET_ENV}, else one per user)")
+    parser.add_argument("--no-fallback", action="store_true",
+                        help="Fail instead of converting in-process when no daemon is running")
+    parser.add_argument("--ping", action="store_true", help="Check whether the daemon is running")
+    parser.add_argument("--stop", action="store_true", help="Stop the daemon")
+    parser.add_argument("--backend", help="Slide emission backend")
+    parser.add_argument("--template", help="Presentation template")
+    parser.add_argument("--pages", metavar="LIST", help="Convert only these pages")
+    parser.add_argument("--layers", metavar="LIST", type=lambda text: text.split(','),
+                        help="Convert only these layers, by name or id, comma-separated")
+    parser.add_argument("--crop", action="store_true",
+                        help="Leave out shapes lying wholly outside the slide")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="Write each slide out as soon as it is built")
+    parser.add_argument("--max-memory", type=float, metavar="MB",
+                        help="Fail if memory use goes over MB megabytes")
+    args = parser.parse_args(argv)
+    path = args.socket or default_socket_path()
+
+    if args.ping or args.stop:
+        try:
+            reply = request(path, {'action': 'stop' if args.stop else 'ping'})
+        except DaemonUnavailable:
+            print(f"No daemon is listening on {path}")
+            sys.exit(1)
+        if args.ping:
+            print(f"Daemon {reply['version']} (pid {reply['pid']}) is listening on {path}")
+        return
+
+    if not (args.input_file and args.output_file):
+        parser.print_help()
+        sys.exit(1)
+
+    options = {name: value for name, value in (
+        ('backend', args.backend), ('template', args.template), ('pages', args.pages),
+        ('layers', args.layers), ('max_memory', args.max_memory)) if value is not None}
+    if args.crop:
+        options['crop'] = True
+    if args.low_memory:
+        options['low_memory'] = True
+
+    # The daemon has its own working directory
+    message = {'action': 'convert', 'input': os.path.abspath(args.input_file),
+               'output': os.path.abspath(args.output_file), 'options': options}
+    try:
+        reply = request(path, message, out=print)
+    except DaemonUnavailable:
+        if args.no_fallback:
+            print(f"Error: No daemon is listening on {path}")
+            sys.exit(1)
+        try:
+            convert_in_process(args.input_file, args.output_file, options)
+        except Exception as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not reply.get('ok'):
+        print(f"Error: {reply.get('error')}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,153 @@
+import io
+import os
+
 from .parser import DrawioParser
 from .engine import PptxGenerator
+from .bulk import BulkPptxGenerator
+from .parallel import render_pages
+from .template import TEMPLATES
+from .memory import MemoryBudget, MemoryLimitExceeded
+from .observe import Observer, PrintObserver, ProfileObserver, measured
+from .utils import emu_to_px
 
 __version__ = "1.0.8"
 
-def convert(input_file, output_file):
-    print(f"Parsing {input_file}...")
-    parser = DrawioParser(input_file)
-    pages = parser.parse()
-    
-    print(f"Found {len(pages)} pages.")
+# Slide emission backends: python-pptx's shape API, or direct bulk XML
+BACKENDS = {
+    'pptx': PptxGenerator,
+    'bulk': BulkPptxGenerator,
+}
+
+def convert(input_file, output_file, backend='pptx', workers=None, threads=None,
+            template='default', progress=None, observer=None, low_memory=False,
+            max_memory=None, pages=None, layers=None, crop=False):
+    """Convert a Draw.io file to PPTX.
+
+    `input_file` is a path, the document's bytes or a binary file object;
+    `output_file` is a path or a writable binary stream. Nothing else
+    touches the disk, so streams convert entirely in memory.
+
+    If given, progress(pages_done, pages_total, page_name) is called after
+    each slide. `observer` receives progress and per-phase timing events
+    (see converter.observe); nothing is printed unless it is a
+    PrintObserver.
+
+    With `low_memory` each slide is written to the output as soon as it is
+    built, so memory use stays at about one page's worth. `max_memory` (in
+    MB) implies it and raises MemoryLimitExceeded if the process grows past
+    that size anyway.
+
+    `pages` converts only some pages: a comma-separated string or a list
+    of page names, numbers (from 1) and ranges like '2-4'. The others are
+    skipped without being parsed.
+
+    Cells that would not be seen in Draw.io (hidden, on hidden layers,
+    inside collapsed containers, or of zero size) are left out; observers
+    are told how many through cells_culled(). `layers` keeps only the
+    layers with those names or ids, and `crop` drops shapes lying wholly
+    outside the slide.
+    """
+    events = observer or Observer()
+    events.conversion_started(_describe(input_file), _describe(output_file))
+    parser = DrawioParser(input_file, layers=layers)
+    total = parser.page_count(pages) if progress else None
     
-    print(f"Generating {output_file}...")
-    generator = PptxGenerator(output_file)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'")
+    parallel = workers is not None and workers > 1
+    # Workers render slide markup, which is the bulk backend's job; its
+    # output is identical to python-pptx's.
+    generator_cls = BulkPptxGenerator if parallel else BACKENDS[backend]
+    generator = generator_cls(output_file, template=template, observer=observer,
+                              low_memory=low_memory or bool(max_memory))
+    if crop:
+        parser.bounds = (0, 0, emu_to_px(generator.prs.slide_width),
+                         emu_to_px(generator.prs.slide_height))
     
-    for page in pages:
-        name = page['name']
-        vertices, edges = page['data']
-        print(f"  Processing page '{name}': {len(vertices)} shapes, {len(edges)} connections")
-        
-        generator.create_slide()
-        # TODO: Set slide title if we add title support
-        generator.add_vertices(vertices)
-        generator.add_edges(edges)
-        
-    generator.save()
-    print("Done.")
+    # Pages are parsed lazily: each one is rendered and released before
+    # the next <diagram> is read from the file.
+    pages = _timed_pages(parser.iter_pages(pages), observer)
+    budget = MemoryBudget(max_memory) if max_memory else None
+    count = 0
+    try:
+        if parallel:
+            # Slides are assembled here in page order, so the output does not
+            # depend on the number of workers.
+            results = render_pages(pages, workers, threads)
+            while True:
+                with measured(observer, 'render', 1, count) as stats:
+                    result = next(results, None)
+                    if result is None and stats:
+                        stats.count, stats.page = 0, None
+                if result is None:
+                    break
+                page, markup, images, n_vertices, n_edges, n_culled = result
+                generator.add_page_markup(markup, images)
+                events.page_done(count, page.name, n_vertices, n_edges)
+                if n_culled:
+                    events.cells_culled(count, page.name, n_culled)
+                count += 1
+                if progress:
+                    progress(count, total, page.name)
+                if budget:
+                    budget.check(page.name)
+                del page, markup, images, result
+        else:
+            for page in pages:
+                name = page.name
+                with measured(observer, 'extract', 1, count):
+                    vertices, edges = page.data
+                
+                # TODO: Set slide title if we add title support
+                generator.add_page(vertices, edges)
+                events.page_done(count, name, len(vertices), len(edges))
+                if page.culled:
+                    events.cells_culled(count, name, page.culled)
+                count += 1
+                if progress:
+                    progress(count, total, name)
+                del page, vertices, edges
+                if budget:
+                    budget.check(name)
+            
+        generator.save()
+    except BaseException:
+        generator.discard()
+        raise
+    events.conversion_finished(count)
+
+
+def convert_bytes(data, **options):
+    """Convert a Draw.io document held in memory, returning the .pptx bytes.
+
+    Takes the same options as convert().
+    """
+    output = io.BytesIO()
+    convert(data, output, **options)
+    return output.getvalue()
+
+
+def _describe(file):
+    """A path as is, or a name for a stream or bytes, for observers."""
+    if isinstance(file, (str, os.PathLike)):
+        return file
+    if isinstance(file, (bytes, bytearray, memoryview)):
+        return '<bytes>'
+    name = getattr(file, 'name', None)
+    return name if isinstance(name, str) else '<stream>'
+
+
+def _timed_pages(pages, observer):
+    """Yield from `pages`, reporting the time spent reading each as 'parse'."""
+    pages = iter(pages)
+    index = 0
+    while True:
+        with measured(observer, 'parse', 1, index) as stats:
+            page = next(pages, None)
+            if page is None and stats:
+                # Reading to the end of the file after the last page
+                stats.count, stats.page = 0, None
+        if page is None:
+            return
+        yield page
+        index += 1
@@ -0,0 +1,178 @@
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import convert, __version__
+from .template import load_template
+
+INPUT_EXTENSIONS = ('.drawio', '.xml')
+
+# Records what each output was built from, to skip unchanged inputs
+MANIFEST_NAME = '.drawio2pptx-manifest.json'
+
+
+def find_inputs(patterns):
+    """Expand directories and glob patterns into (input, output name) pairs.
+
+    Directories are searched recursively for .drawio/.xml files and keep
+    their layout under the output directory; other matches are named after
+    the file alone.
+    """
+    found = {}
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for dirpath, dirnames, filenames in os.walk(pattern):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if filename.lower().endswith(INPUT_EXTENSIONS):
+                        path = os.path.join(dirpath, filename)
+                        found.setdefault(os.path.abspath(path),
+                                         _output_name(os.path.relpath(path, pattern)))
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+            for path in matches:
+                if not os.path.isdir(path):
+                    found.setdefault(os.path.abspath(path), _output_name(os.path.basename(path)))
+    return list(found.items())
+
+
+def _output_name(relative_path):
+    return os.path.splitext(relative_path)[0] + '.pptx'
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _init_worker(template):
+    # Pay for imports and the template load once per worker, not per file
+    load_template(template)
+
+
+def _convert_one(input_file, output_file, options):
+    """Convert one file, returning its result entry instead of raising."""
+    start = time.perf_counter()
+    try:
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        convert(input_file, output_file, **options)
+        return {'status': 'converted', 'seconds': round(time.perf_counter() - start, 4)}
+    except Exception as e:
+        return {'status': 'failed', 'seconds': round(time.perf_counter() - start, 4),
+                'error': f"{type(e).__name__}: {e}"}
+
+
+class BatchConverter:
+    """Converts many files into one output directory on a persistent pool.
+
+    Outputs are skipped when the manifest says they were built from the
+    same input (by size and mtime, falling back to a content hash) with
+    the same converter version and options. One failing file does not
+    stop the rest; run() returns a summary with per-file timings.
+    """
+
+    def __init__(self, output_dir, jobs=1, backend='bulk', template='default', force=False,
+                 pages=None, layers=None, crop=False):
+        self.output_dir = output_dir
+        self.jobs = max(1, jobs or 1)
+        self.options = {'backend': backend, 'template': template}
+        if pages is not None:
+            self.options['pages'] = pages
+        if layers is not None:
+            self.options['layers'] = layers
+        if crop:
+            self.options['crop'] = crop
+        self.force = force
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+
+    def run(self, patterns):
+        start = time.perf_counter()
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = self._load_manifest()
+
+        results = []
+        todo = []
+        outputs = {}
+        for input_file, name in find_inputs(patterns):
+            result = {'input': input_file, 'output': os.path.join(self.output_dir, name)}
+            results.append(result)
+            if name in outputs:
+                result.update(status='failed', seconds=0.0,
+                              error=f"Output name collides with {outputs[name]}")
+                continue
+            outputs[name] = input_file
+            try:
+                source = self._source_info(input_file, manifest.get(name))
+            except OSError as e:
+                result.update(status='failed', seconds=0.0, error=f"{type(e).__name__}: {e}")
+                continue
+            result['source'] = source
+            if not self.force and self._up_to_date(manifest.get(name), source, result['output']):
+                result.update(status='skipped', seconds=0.0)
+            else:
+                todo.append(result)
+
+        for result, outcome in self._convert_all(todo):
+            result.update(outcome)
+
+        for result in results:
+            source = result.pop('source', None)
+            name = os.path.relpath(result['output'], self.output_dir)
+            if result['status'] in ('converted', 'skipped') and source is not None:
+                manifest[name] = dict(source, version=__version__, options=self.options)
+            elif result['status'] == 'failed' and outputs.get(name) == result['input']:
+                manifest.pop(name, None)
+        self._save_manifest(manifest)
+
+        counts = {status: sum(r['status'] == status for r in results)
+                  for status in ('converted', 'skipped', 'failed')}
+        return dict(counts, version=__version__, seconds=round(time.perf_counter() - start, 4),
+                    files=results)
+
+    def _convert_all(self, todo):
+        if self.jobs == 1 or len(todo) <= 1:
+            for result in todo:
+                yield result, _convert_one(result['input'], result['output'], self.options)
+            return
+        with ProcessPoolExecutor(max_workers=min(self.jobs, len(todo)),
+                                 initializer=_init_worker,
+                                 initargs=(self.options['template'],)) as executor:
+            futures = {executor.submit(_convert_one, r['input'], r['output'], self.options): r
+                       for r in todo}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def _source_info(self, input_file, entry):
+        stat = os.stat(input_file)
+        info = {'size': stat.st_size, 'mtime': stat.st_mtime}
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime:
+            info['sha256'] = entry.get('sha256')
+        else:
+            info['sha256'] = file_digest(input_file)
+        return info
+
+    def _up_to_date(self, entry, source, output_file):
+        return (entry is not None
+                and os.path.exists(output_file)
+                and entry.get('version') == __version__
+                and entry.get('options') == self.options
+                and entry.get('sha256') == source['sha256'])
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
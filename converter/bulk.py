@@ -0,0 +1,319 @@
+import re
+
+from lxml import etree
+from pptx.enum.dml import MSO_LINE_DASH_STYLE
+from pptx.enum.shapes import MSO_CONNECTOR
+from pptx.oxml import element_class_lookup
+from pptx.oxml.ns import nsdecls, qn
+from pptx.shapes.autoshape import AutoShapeType
+
+from .engine import PptxGenerator, ShapeLayout
+from .geometry import PageGeometry, path_geometry_xml
+from .styles import NO_COLOR
+from .utils import px_to_emu
+
+# Unlike python-pptx's own parser this keeps whitespace-only text, which
+# labels such as "<b>a</b> <i>b</i>" rely on.
+_parser = etree.XMLParser(resolve_entities=False)
+_parser.set_element_class_lookup(element_class_lookup)
+
+# A fresh slide from the blank layout only holds the spTree itself (id 1)
+FIRST_SHAPE_ID = 2
+# ...and only relates to its layout (rId1)
+FIRST_IMAGE_RID = 2
+
+_CTRL_CHARS = re.compile(r"([\x00-\x08\x0B-\x1F])")
+
+_SHAPE_STYLE = (
+    '<p:style><a:lnRef idx="1"><a:schemeClr val="accent1"/></a:lnRef>'
+    '<a:fillRef idx="3"><a:schemeClr val="accent1"/></a:fillRef>'
+    '<a:effectRef idx="2"><a:schemeClr val="accent1"/></a:effectRef>'
+    '<a:fontRef idx="minor"><a:schemeClr val="lt1"/></a:fontRef></p:style>'
+)
+_CONNECTOR_STYLE = (
+    '<p:style><a:lnRef idx="2"><a:schemeClr val="accent1"/></a:lnRef>'
+    '<a:fillRef idx="0"><a:schemeClr val="accent1"/></a:fillRef>'
+    '<a:effectRef idx="1"><a:schemeClr val="accent1"/></a:effectRef>'
+    '<a:fontRef idx="minor"><a:schemeClr val="tx1"/></a:fontRef></p:style>'
+)
+_TEXT_BODY_PR = 'wrap="square" lIns="0" rIns="0" tIns="0" bIns="0"><a:normAutofit/></a:bodyPr>'
+
+
+def _escape(value):
+    return (value.replace('&', '&amp;').replace('<', '&lt;')
+            .replace('>', '&gt;').replace('"', '&quot;'))
+
+
+def _escape_text(value):
+    # python-pptx writes control characters as _xHHHH_ escapes
+    value = _CTRL_CHARS.sub(lambda m: "_x%04X_" % ord(m.group(1)), value)
+    return _escape(value)
+
+
+def _solid_fill(rgb):
+    return f'<a:solidFill><a:srgbClr val="{rgb}"/></a:solidFill>'
+
+
+def _rpr_xml(tag, bold, italic, underline, rgb, size):
+    """Run properties with only the values that are set, as python-pptx orders them."""
+    attrs = ''
+    if bold is not None:
+        attrs += f' b="{"1" if bold else "0"}"'
+    if italic is not None:
+        attrs += f' i="{"1" if italic else "0"}"'
+    if underline is not None:
+        attrs += f' u="{"sng" if underline else "none"}"'
+    if size is not None:
+        attrs += f' sz="{size.centipoints}"'
+    if rgb:
+        return f'<{tag}{attrs}>{_solid_fill(rgb)}</{tag}>'
+    return f'<{tag}{attrs}/>'
+
+
+class _Box:
+    """Shape bounds in EMU, standing in for a python-pptx shape proxy."""
+    __slots__ = ('left', 'top', 'width', 'height')
+
+    def __init__(self, left, top, width, height):
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+
+
+class SlideMarkup(ShapeLayout):
+    """Renders one page's shapes as p:spTree child markup.
+
+    No Presentation is needed, so this can run in a worker process: ids
+    come from a counter starting at `first_id` and shape bounds are kept
+    in a PageGeometry for the edges that connect them.
+    """
+
+    def __init__(self, first_id=FIRST_SHAPE_ID, embed=None):
+        self.geometry = PageGeometry()
+        self._next_id = first_id
+        # Images in the order they got rIds, when numbering them here
+        self.images = []
+        self._rids = {}
+        self._embed = embed or self._number_image
+
+    def vertices_xml(self, vertices):
+        parts = []
+        for v in vertices:
+            box = _Box(px_to_emu(v.x), px_to_emu(v.y), px_to_emu(v.width), px_to_emu(v.height))
+            image = v.style.image
+            if image is not None:
+                parts.append(self._picture_xml(self._take_id(), self._embed(image), box, image.desc))
+                if v.value:
+                    label_box = self._image_label_box(box, v.style)
+                    parts.append(self._textbox_xml(self._take_id(), label_box, v.value, v.style))
+            else:
+                parts.append(self._autoshape_xml(self._take_id(), v, box))
+            self.geometry.add(v.id, box.left, box.top, box.width, box.height)
+        return ''.join(parts)
+
+    def edges_xml(self, edges):
+        parts = []
+        for e, conn_type, xfrm, path, label_box in self.geometry.connectors(edges):
+            parts.append(self._connector_xml(self._take_id(), conn_type, xfrm, path, e.style))
+
+            # Edge Label (if any)
+            if label_box is not None:
+                parts.append(self._textbox_xml(self._take_id(), label_box, e.value, e.style))
+        return ''.join(parts)
+
+    def _take_id(self):
+        id_ = self._next_id
+        self._next_id += 1
+        return id_
+
+    def _number_image(self, image):
+        # Without a slide part, give out the rIds relate_to() will use on a
+        # fresh slide, whose only relationship is rId1 to its layout
+        payload = image.payload
+        rid = self._rids.get(payload)
+        if rid is None:
+            rid = self._rids[payload] = f'rId{len(self.images) + FIRST_IMAGE_RID}'
+            self.images.append(image)
+        return rid
+
+    def _picture_xml(self, id_, rid, box, desc):
+        return (
+            f'<p:pic><p:nvPicPr><p:cNvPr id="{id_}" name="Picture {id_ - 1}" descr="{desc}"/>'
+            f'<p:cNvPicPr><a:picLocks noChangeAspect="1"/></p:cNvPicPr><p:nvPr/></p:nvPicPr>'
+            f'<p:blipFill><a:blip r:embed="{rid}"/><a:stretch><a:fillRect/></a:stretch></p:blipFill>'
+            f'<p:spPr><a:xfrm><a:off x="{box.left}" y="{box.top}"/>'
+            f'<a:ext cx="{box.width}" cy="{box.height}"/></a:xfrm>'
+            f'<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></p:spPr></p:pic>'
+        )
+
+    def _autoshape_xml(self, id_, vertex, box):
+        style = vertex.style
+        autoshape_type = AutoShapeType(style.shape_type)
+        name = _escape('%s %d' % (autoshape_type.basename, id_ - 1))
+
+        # Fill
+        if style.fill_color == NO_COLOR:
+            fill = '<a:noFill/>'
+        elif style.fill_color:
+            fill = _solid_fill(style.fill_color)
+        else:
+            fill = ''
+
+        # Line / Stroke
+        if style.stroke_color == NO_COLOR:
+            ln_fill = '<a:noFill/>'
+        elif style.stroke_color:
+            ln_fill = _solid_fill(style.stroke_color)
+        else:
+            ln_fill = ''
+        if style.stroke_width is not None:
+            ln = f'<a:ln w="{int(style.stroke_width)}">{ln_fill}</a:ln>'
+        elif ln_fill:
+            ln = f'<a:ln>{ln_fill}</a:ln>'
+        else:
+            ln = ''
+
+        if vertex.value:
+            body_pr = f'<a:bodyPr rtlCol="0" anchor="ctr" {_TEXT_BODY_PR}'
+            text = self._text_xml(vertex.value, style)
+        else:
+            body_pr = '<a:bodyPr rtlCol="0" anchor="ctr"/>'
+            text = '<a:lstStyle/><a:p><a:pPr algn="ctr"/></a:p>'
+
+        return (
+            f'<p:sp><p:nvSpPr><p:cNvPr id="{id_}" name="{name}"/><p:cNvSpPr/><p:nvPr/></p:nvSpPr>'
+            f'<p:spPr><a:xfrm><a:off x="{box.left}" y="{box.top}"/>'
+            f'<a:ext cx="{box.width}" cy="{box.height}"/></a:xfrm>'
+            f'<a:prstGeom prst="{autoshape_type.prst}"><a:avLst/></a:prstGeom>{fill}{ln}</p:spPr>'
+            f'{_SHAPE_STYLE}'
+            f'<p:txBody>{body_pr}{text}</p:txBody></p:sp>'
+        )
+
+    def _connector_xml(self, id_, conn_type, xfrm, path, style):
+        x, y, cx, cy, flipH, flipV = xfrm
+        flip = (' flipH="1"' if flipH else '') + (' flipV="1"' if flipV else '')
+        if path is None:
+            geometry = f'<a:prstGeom prst="{MSO_CONNECTOR.to_xml(conn_type)}"><a:avLst/></a:prstGeom>'
+        else:
+            geometry = f'<a:custGeom>{path_geometry_xml(xfrm, path)}</a:custGeom>'
+
+        width = f' w="{int(style.line_width)}"' if style.line_width is not None else ''
+        color = _solid_fill(style.line_color) if style.line_color else ''
+        dash = MSO_LINE_DASH_STYLE.to_xml(style.dash_style)
+        start_w, start_l = style.start_size
+        end_w, end_l = style.end_size
+
+        return (
+            f'<p:cxnSp><p:nvCxnSpPr><p:cNvPr id="{id_}" name="Connector {id_ - 1}"/>'
+            f'<p:cNvCxnSpPr/><p:nvPr/></p:nvCxnSpPr>'
+            f'<p:spPr><a:xfrm{flip}><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+            f'{geometry}'
+            f'<a:ln{width}>{color}<a:prstDash val="{dash}"/>'
+            f'<a:headEnd type="{style.start_arrow}" w="{start_w}" len="{start_l}"/>'
+            f'<a:tailEnd type="{style.end_arrow}" w="{end_w}" len="{end_l}"/></a:ln></p:spPr>'
+            f'{_CONNECTOR_STYLE}</p:cxnSp>'
+        )
+
+    def _textbox_xml(self, id_, box, text_value, style):
+        left, top, width, height = box
+        # python-pptx formats textbox geometry with %d, truncating floats
+        return (
+            f'<p:sp><p:nvSpPr><p:cNvPr id="{id_}" name="TextBox {id_ - 1}"/>'
+            f'<p:cNvSpPr txBox="1"/><p:nvPr/></p:nvSpPr>'
+            f'<p:spPr><a:xfrm><a:off x="{"%d" % left}" y="{"%d" % top}"/>'
+            f'<a:ext cx="{"%d" % width}" cy="{"%d" % height}"/></a:xfrm>'
+            f'<a:prstGeom prst="rect"><a:avLst/></a:prstGeom><a:noFill/></p:spPr>'
+            f'<p:txBody><a:bodyPr {_TEXT_BODY_PR}{self._text_xml(text_value, style)}</p:txBody></p:sp>'
+        )
+
+    def _text_xml(self, text_value, style):
+        """The lstStyle and paragraph of a label's text body."""
+        defaults, runs = self._text_runs(text_value, style)
+        if any(value is not None for value in defaults):
+            lst_style = f'<a:lstStyle><a:lvl1pPr>{_rpr_xml("a:defRPr", *defaults)}</a:lvl1pPr></a:lstStyle>'
+        else:
+            lst_style = '<a:lstStyle/>'
+        parts = []
+        for text, *run_format in runs:
+            rpr = _rpr_xml('a:rPr', *run_format) if any(v is not None for v in run_format) else ''
+            parts.append(f'<a:r>{rpr}<a:t>{_escape_text(text)}</a:t></a:r>')
+        return f'{lst_style}<a:p><a:pPr algn="ctr"/>{"".join(parts)}</a:p>'
+
+
+def render_page_markup(page):
+    """Render a parsed page to shape markup. Used by parallel workers.
+
+    Returns (markup, images, vertex count, edge count, culled count),
+    where `images` are the embedded images the markup refers to by rId, in
+    rId order.
+    """
+    vertices, edges = page.data
+    markup = SlideMarkup()
+    xml = markup.vertices_xml(vertices) + markup.edges_xml(edges)
+    return xml, markup.images, len(vertices), len(edges), page.culled
+
+
+class BulkPptxGenerator(PptxGenerator):
+    """PptxGenerator that writes shape XML directly instead of via python-pptx.
+
+    python-pptx rescans the shape tree for the next free id on every
+    insertion and walks the XML again for each property it sets, which is
+    quadratic for slides with thousands of shapes. Here each shape is
+    rendered to markup in a single pass by SlideMarkup and a whole batch is
+    parsed once and appended to the slide's spTree. The resulting XML is
+    identical to the python-pptx path.
+    """
+
+    def create_slide(self):
+        slide = super().create_slide()
+        self._spTree = slide.shapes._spTree
+        self._markup = SlideMarkup(self._spTree.max_shape_id + 1, embed=self._image_rid)
+        self._markup.observer = self.observer
+        self._markup.page_index = self.page_index
+        return slide
+
+    def add_page(self, vertices, edges):
+        slide = super().add_page(vertices, edges)
+        self._markup = None
+        return slide
+
+    def add_page_markup(self, xml, images=()):
+        """Add a slide from markup and images rendered by render_page_markup()."""
+        self.create_slide()
+        if self._markup._next_id != FIRST_SHAPE_ID:
+            raise ValueError("Blank slide layout is expected to have no shapes")
+        for rid, image in enumerate(images, FIRST_IMAGE_RID):
+            if self._image_rid(image) != f'rId{rid}':
+                raise ValueError("Blank slide layout is expected to have one relationship")
+        self._append_shapes(xml)
+        self._markup = None
+        slide = self.slide
+        if self.spool is not None:
+            self._spool_slide()
+        return slide
+
+    def _spool_slide(self):
+        super()._spool_slide()
+        self._spTree = None
+
+    def add_vertices(self, vertices):
+        if not self.slide:
+            self.create_slide()
+        self._append_shapes(self._markup.vertices_xml(vertices))
+
+    def add_edges(self, edges):
+        self._append_shapes(self._markup.edges_xml(edges))
+
+    def _append_shapes(self, xml):
+        if not xml:
+            return
+        batch = etree.fromstring(f'<p:spTree {nsdecls("a", "p", "r")}>{xml}</p:spTree>', _parser)
+
+        # Keep new shapes ahead of any extLst, as python-pptx does
+        ext_lst = self._spTree.find(qn('p:extLst'))
+        for shape in list(batch):
+            if ext_lst is not None:
+                ext_lst.addprevious(shape)
+            else:
+                self._spTree.append(shape)
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import threading
+import time
+
+
+class _Flight:
+    """A conversion in progress that other requests for the same key wait on."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.path = None
+        self.error = None
+
+
+# Temporary files untouched for this long were left by a crashed conversion
+STALE_TMP_AGE = 3600
+
+
+class ResultCache:
+    """Content-addressed store of converted files on disk.
+
+    Entries are keyed by a hash of the input bytes and the converter
+    version, so re-uploading the same diagram is served without converting
+    it again. Entries older than `max_age` seconds are dropped, then the
+    least recently used ones until the total is under `max_bytes`.
+    Concurrent requests for the same key share a single conversion.
+
+    A file's mtime records when the entry was created and its atime when it
+    was last served, so expiry and LRU order are tracked separately.
+    """
+
+    def __init__(self, directory, version, max_bytes=512 * 1024 * 1024,
+                 max_age=7 * 24 * 3600, suffix='.pptx'):
+        self.directory = directory
+        self.version = version
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._inflight = {}
+        os.makedirs(directory, exist_ok=True)
+        self.evict()
+
+    def key_for(self, data):
+        digest = hashlib.sha256()
+        digest.update(self.version.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(data)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        """Path of a cached result, or None. Marks the entry as recently used."""
+        path = self.path(key)
+        now = time.time()
+        try:
+            created = os.stat(path).st_mtime
+            if self._expired(created, now):
+                os.remove(path)
+                return None
+            os.utime(path, (now, created))
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_or_create(self, key, produce):
+        """Return the cached result for `key`, calling produce(path) to fill it on a miss."""
+        path = self.get(key)
+        if path is not None:
+            return path
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.path
+
+        try:
+            path = self.get(key)
+            if path is None:
+                path = self.path(key)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                try:
+                    produce(tmp_path)
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            flight.path = path
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+        self.evict(keep=key)
+        return path
+
+    def evict(self, keep=None):
+        """Drop expired entries, then least recently used ones over the size limit."""
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith('.tmp'):
+                if now - stat.st_mtime > STALE_TMP_AGE:
+                    self._remove(entry.path)
+            elif entry.name.endswith(self.suffix):
+                entries.append((stat.st_atime, stat.st_mtime, stat.st_size, entry.path))
+
+        keep_path = self.path(keep) if keep else None
+        entries.sort()
+        total = sum(size for _, _, size, _ in entries)
+        for _, created, size, path in entries:
+            expired = self._expired(created, now)
+            oversize = self.max_bytes is not None and total > self.max_bytes
+            if not (expired or oversize) or path == keep_path:
+                continue
+            self._remove(path)
+            total -= size
+
+    def _expired(self, created, now):
+        return self.max_age is not None and now - created > self.max_age
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
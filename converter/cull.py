@@ -0,0 +1,115 @@
+"""Leaving out the cells of a page that would never be seen.
+
+Draw.io keeps hidden and folded-away cells in the file, and without culling
+each of them would still become a shape on the slide.
+"""
+
+# A cell's state: shown, or hidden for good. Cells folded into a collapsed
+# container have the container's id as their state instead.
+SHOWN = None
+HIDDEN = False
+
+
+def cull_cells(cells, cell_map, geometries, positions, layers=None, bounds=None):
+    """Pick out the cells of a page to leave out.
+
+    Dropped are cells that are invisible or on a hidden layer, directly or
+    through any of their parents; the contents of collapsed containers;
+    vertices of zero size; and with `bounds` (left, top, right, bottom in
+    px), vertices lying wholly outside it. `layers` keeps only the layers
+    with those names or ids. Edges go with either of their ends.
+
+    Returns (dropped ids, terminals), where `terminals` maps each cell
+    folded into a collapsed container to that container. Edges attached to
+    such cells connect to the container instead, as Draw.io draws them.
+    """
+    if layers is not None:
+        layers = set(layers)
+    states = {}
+    dropped = set()
+    terminals = {}
+
+    for cell in cells:
+        cell_id = cell.get('id')
+        state = _state(cell_id, cell_map, states, layers)
+        if state is HIDDEN:
+            dropped.add(cell_id)
+        elif state is not SHOWN:
+            dropped.add(cell_id)
+            terminals[cell_id] = state
+        elif cell.get('vertex') == '1' and _unseen(cell_id, geometries, positions, bounds):
+            dropped.add(cell_id)
+
+    for cell in cells:
+        if cell.get('edge') == '1':
+            cell_id = cell.get('id')
+            if cell_id in dropped:
+                continue
+            ends = (cell.get('source'), cell.get('target'))
+            source, target = (terminals.get(end, end) for end in ends)
+            if source in dropped or target in dropped:
+                dropped.add(cell_id)
+            elif source == target and (source, target) != ends:
+                # Folded onto a single container
+                dropped.add(cell_id)
+
+    return dropped, terminals
+
+
+def _state(cell_id, cell_map, states, layers):
+    """A cell's state (see SHOWN), worked out down its chain of parents.
+
+    `states` memoizes (state, state passed to children) per cell, so each
+    cell is resolved once however deep the nesting.
+    """
+    chain = []
+    seen = set()
+    parent_id = cell_id
+    # Climb to a resolved ancestor, the root or a parent cycle
+    while (parent_id is not None and parent_id not in states and parent_id in cell_map
+           and parent_id not in seen):
+        seen.add(parent_id)
+        chain.append(parent_id)
+        parent_id = cell_map[parent_id].get('parent')
+    inherited = states[parent_id][1] if parent_id in states else SHOWN
+
+    for cid in reversed(chain):
+        cell = cell_map[cid]
+        state = inherited
+        if state is SHOWN:
+            if cell.get('visible') == '0':
+                state = HIDDEN
+            elif layers is not None and _is_layer(cell, cell_map):
+                if cid not in layers and cell.get('value') not in layers:
+                    state = HIDDEN
+        passed = state
+        if state is SHOWN and cell.get('collapsed') == '1' and cell.get('vertex') == '1':
+            passed = cid
+        states[cid] = (state, passed)
+        inherited = passed
+    return states[cell_id][0] if cell_id in states else SHOWN
+
+
+def _is_layer(cell, cell_map):
+    """Whether a cell is a layer: a child of the root cell."""
+    parent = cell_map.get(cell.get('parent'))
+    return parent is not None and parent.get('parent') is None
+
+
+def _unseen(cell_id, geometries, positions, bounds):
+    """Whether a vertex has no size, or lies outside `bounds`."""
+    geo = geometries[cell_id]
+    if geo is None:
+        return False
+    try:
+        width = float(geo.get('width', 0))
+        height = float(geo.get('height', 0))
+    except ValueError:
+        return False
+    if width <= 0 and height <= 0:
+        return True
+    if bounds is not None:
+        x, y = positions[cell_id]
+        left, top, right, bottom = bounds
+        return x + width <= left or x >= right or y + height <= top or y >= bottom
+    return False
@@ -0,0 +1,170 @@
+"""A long-running conversion server on a Unix socket.
+
+Starting a process to convert a small diagram costs more in imports and
+template loading than the conversion itself. The daemon pays that once and
+then converts files for clients (see client.py), one request at a time.
+
+Requests and replies are lines of JSON. A request is
+{"action": "convert", "input": path, "output": path, "options": {...}},
+{"action": "ping"} or {"action": "stop"}. While converting, the daemon
+sends what the command line tool would print as {"out": line} messages.
+Every request ends with {"ok": true} or {"ok": false, "error": message}.
+"""
+import contextlib
+import errno
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+
+from . import BACKENDS, TEMPLATES, __version__, convert, convert_bytes
+from .observe import PrintObserver
+from .template import load_template
+
+# Options a request may pass on to convert()
+CONVERT_OPTIONS = frozenset({'backend', 'template', 'pages', 'layers', 'crop', 'low_memory',
+                             'max_memory'})
+
+# Longest request line read; requests only hold paths and options
+MAX_REQUEST_SIZE = 64 * 1024
+
+# A one-shape diagram converted at startup, so the first request doesn't
+# pay for lazy imports and cold caches
+WARM_UP_DIAGRAM = (
+    b'<mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/>'
+    b'<mxCell id="a" value="Warm" vertex="1" parent="1">'
+    b'<mxGeometry width="100" height="50" as="geometry"/></mxCell>'
+    b'<mxCell id="e" edge="1" parent="1" source="a" target="a">'
+    b'<mxGeometry relative="1" as="geometry"/></mxCell></root></mxGraphModel>'
+)
+
+
+class _LineWriter(io.TextIOBase):
+    """Sends text written to it to the client, a line per message."""
+
+    def __init__(self, send):
+        self._send = send
+        self._pending = ''
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        lines = (self._pending + text).split('\n')
+        self._pending = lines.pop()
+        for line in lines:
+            self._send(out=line)
+        return len(text)
+
+    def flush(self):
+        if self._pending:
+            self._send(out=self._pending)
+            self._pending = ''
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline(MAX_REQUEST_SIZE))
+            action = request.get('action')
+        except (ValueError, AttributeError):
+            self._send(ok=False, error="Malformed request")
+            return
+        if action == 'ping':
+            self._send(ok=True, version=__version__, pid=os.getpid())
+        elif action == 'stop':
+            self._send(ok=True)
+            # shutdown() waits for serve_forever(), which is running this handler
+            threading.Thread(target=self.server.shutdown).start()
+        elif action == 'convert':
+            self._convert(request)
+        else:
+            self._send(ok=False, error=f"Unknown action '{action}'")
+
+    def _convert(self, request):
+        options = request.get('options') or {}
+        unknown = set(options) - CONVERT_OPTIONS
+        if unknown:
+            self._send(ok=False, error=f"Unknown options: {', '.join(sorted(unknown))}")
+            return
+        out = _LineWriter(self._send)
+        try:
+            convert(request['input'], request['output'], observer=PrintObserver(out), **options)
+            out.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away; the output was discarded
+            return
+        except Exception as e:
+            self._send(ok=False, error=str(e))
+            return
+        self._send(ok=True)
+
+    def _send(self, **message):
+        self.wfile.write(json.dumps(message).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+
+class ConversionDaemon(socketserver.UnixStreamServer):
+    """Serves conversion requests on the Unix socket at `path`.
+
+    The socket is only accessible to the current user. A stale socket left
+    by a daemon that died is replaced; a live one is an error.
+    """
+
+    def __init__(self, path):
+        _claim_socket(path)
+        self.path = path
+        umask = os.umask(0o077)
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(umask)
+
+    def server_close(self):
+        super().server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+
+
+def warm_up():
+    """Load the templates and run a tiny conversion on each backend."""
+    for name in TEMPLATES:
+        load_template(name)
+    for backend in BACKENDS:
+        convert_bytes(WARM_UP_DIAGRAM, backend=backend)
+
+
+def serve(path, ready=None):
+    """Warm up, then serve requests on `path` until a client asks to stop.
+
+    `ready`, if given, is called with the daemon once it is listening.
+    """
+    daemon = ConversionDaemon(path)
+    try:
+        warm_up()
+        if ready:
+            ready(daemon)
+        daemon.serve_forever()
+    finally:
+        daemon.server_close()
+
+
+def _claim_socket(path):
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise OSError(errno.EEXIST, f"{path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(errno.EADDRINUSE, f"A daemon is already listening on {path}")
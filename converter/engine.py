@@ -1,33 +1,274 @@
-from pptx import Presentation
-from pptx.enum.shapes import MSO_CONNECTOR
-from pptx.enum.text import PP_ALIGN, MSO_AUTO_SIZE
-from pptx.util import Emu, Pt
-
-from .ppt_map import get_shape_type, get_line_dash, get_arrow_type, get_connector_type
-from .utils import hex_to_rgb, px_to_emu, HtmlTextParser, set_line_end
+import io
+import os
+import zipfile
+from functools import lru_cache
 
-
-class PptxGenerator:
-    def __init__(self, output_file):
+from lxml.etree import SubElement
+from pptx.enum.text import PP_ALIGN, MSO_AUTO_SIZE
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from pptx.opc.serialized import _ContentTypesItem
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
+from pptx.oxml.slide import CT_Slide
+from pptx.text.text import Font
+from pptx.util import Emu
+
+from .geometry import PageGeometry, path_geometry_xml
+from .media import MediaStore
+from .observe import measured
+from .styles import NO_COLOR, font_size
+from .template import load_template, blank_layout
+from .utils import hex_to_rgb, px_to_emu, parse_html_label, set_line_end
+
+# python-pptx stamps every zip member with the current time; a fixed stamp
+# makes the output a pure function of the input.
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# Height in px of the text box holding an image cell's label
+IMAGE_LABEL_HEIGHT = 20
+
+
+def save_presentation(prs, file):
+    """Save a presentation to a path or file object with reproducible bytes."""
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    buffer.seek(0)
+    with zipfile.ZipFile(buffer) as src, zipfile.ZipFile(file, 'w') as dst:
+        for info in src.infolist():
+            member = zipfile.ZipInfo(info.filename, date_time=ZIP_DATE_TIME)
+            member.compress_type = info.compress_type
+            member.external_attr = info.external_attr
+            dst.writestr(member, src.read(info))
+
+
+class SlideSpool:
+    """Writes slides into the output package as soon as they are finished.
+
+    Each slide's XML goes straight into the zip and the part is left with
+    an empty slide, so only the slide being built is held in memory. The
+    rest of the package is written by finish(). Every member has the same
+    bytes as with save_presentation(), but the slides come first.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self._zip = zipfile.ZipFile(file, 'w')
+        self._written = set()
+
+    def write_slide(self, part):
+        self._write_part(part)
+        self._written.add(part)
+        part._element = CT_Slide.new()
+        # Drop the cached Slide, which still points at the old tree
+        part.__dict__.pop('slide', None)
+
+    def finish(self, prs):
+        """Write the parts not written yet, as python-pptx would, and close."""
+        package = prs.part.package
+        parts = tuple(package.iter_parts())
+        self._write(CONTENT_TYPES_URI, serialize_part_xml(_ContentTypesItem.xml_for(parts)))
+        self._write(PACKAGE_URI.rels_uri, package._rels.xml)
+        for part in parts:
+            if part not in self._written:
+                self._write_part(part)
+        self._zip.close()
+
+    def discard(self):
+        """Close the package unfinished, deleting it if it is a file."""
+        self._zip.close()
+        if isinstance(self.file, (str, os.PathLike)):
+            os.remove(self.file)
+
+    def _write_part(self, part):
+        self._write(part.partname, part.blob)
+        if part._rels:
+            self._write(part.partname.rels_uri, part.rels.xml)
+
+    def _write(self, uri, blob):
+        member = zipfile.ZipInfo(uri.membername, date_time=ZIP_DATE_TIME)
+        member.compress_type = zipfile.ZIP_DEFLATED
+        member.external_attr = 0o600 << 16  # as ZipFile.writestr() sets
+        self._zip.writestr(member, blob)
+
+
+class ShapeLayout:
+    """Geometry and text decisions shared by every emission backend.
+
+    Shapes only need left/top/width/height in EMU, so these work on
+    python-pptx shape proxies as well as plain boxes.
+    """
+
+    # Receives 'text' phase timings when set; see converter.observe
+    observer = None
+    page_index = None
+
+    def _image_label_box(self, shape, style):
+        """(left, top, width, height) of an image cell's label.
+
+        Pictures can't hold text, so the label goes in a text box placed
+        where Draw.io draws it: verticalLabelPosition and labelPosition put
+        it above, below or beside the image instead of over it.
+        """
+        height = px_to_emu(IMAGE_LABEL_HEIGHT)
+        left = shape.left
+        top = shape.top + (shape.height - height) // 2
+        vertical = style.get('verticalLabelPosition')
+        if vertical == 'bottom':
+            top = shape.top + shape.height
+        elif vertical == 'top':
+            top = shape.top - height
+        horizontal = style.get('labelPosition')
+        if horizontal == 'left':
+            left -= shape.width
+        elif horizontal == 'right':
+            left += shape.width
+        return left, top, shape.width, height
+
+    def _text_runs(self, text_value, style):
+        """Resolve a label into the (defaults, runs) of its text body.
+
+        Formats are (bold, italic, underline, rgb, size) tuples, where None
+        means the value is inherited. `defaults` is the label's most common
+        format, set once on the body; each (text, *format) run only carries
+        what differs from it.
+        """
+        with measured(self.observer, 'text', 1, self.page_index):
+            return _text_body(text_value, style)
+
+
+# Labels share a handful of colors and sizes
+_segment_color = lru_cache(maxsize=256)(hex_to_rgb)
+_segment_size = lru_cache(maxsize=256)(font_size)
+
+TEXT_CACHE_SIZE = 4096
+NO_FORMAT = (None,) * 5
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _text_body(text_value, style):
+    runs = []
+    for text, fmt in parse_html_label(text_value):
+        # Color priority: Segment markup > Style attribute (black by default)
+        rgb = _segment_color(fmt.color) if fmt.color else style.font_color
+        size = _segment_size(fmt.size) if fmt.size else None
+        if size is None:
+            size = style.font_size
+        run_format = (fmt.bold, fmt.italic, fmt.underline, rgb, size)
+        # Merge runs that look the same
+        if runs and runs[-1][1] == run_format:
+            runs[-1] = (runs[-1][0] + text, run_format)
+        else:
+            runs.append((text, run_format))
+
+    defaults = _common_format(runs)
+    return defaults, tuple((text,) + _format_overrides(run_format, defaults)
+                           for text, run_format in runs)
+
+
+def _common_format(runs):
+    """The format covering most of the text, as defaults for all runs."""
+    if len(runs) < 2:
+        # Nothing to share; the run's own properties are shorter
+        return NO_FORMAT
+    weights = {}
+    for text, run_format in runs:
+        weights[run_format] = weights.get(run_format, 0) + len(text)
+    return _shared_format(tuple(weights.items()))
+
+
+@lru_cache(maxsize=1024)
+def _shared_format(weighted_formats):
+    common = []
+    for i in range(5):
+        weights = {}
+        for run_format, weight in weighted_formats:
+            weights[run_format[i]] = weights.get(run_format[i], 0) + weight
+        common.append(max(weights, key=weights.get))
+    # Bold, italic and underline are off unless set
+    for i in range(3):
+        if not common[i]:
+            common[i] = None
+    # A color or size can't be unset again, so only runs that all have one share it
+    for i in (3, 4):
+        if any(run_format[i] is None for run_format, weight in weighted_formats):
+            common[i] = None
+    return tuple(common)
+
+
+@lru_cache(maxsize=1024)
+def _format_overrides(run_format, defaults):
+    overrides = [value if value != (defaults[i] or False) else None
+                 for i, value in enumerate(run_format[:3])]
+    overrides += [value if value != defaults[i] else None
+                  for i, value in enumerate(run_format[3:], 3)]
+    return tuple(overrides)
+
+
+def _set_font(font, bold, italic, underline, rgb, size):
+    if bold is not None:
+        font.bold = bold
+    if italic is not None:
+        font.italic = italic
+    if underline is not None:
+        font.underline = underline
+    if rgb:
+        font.color.rgb = rgb
+    if size is not None:
+        font.size = size
+
+
+class PptxGenerator(ShapeLayout):
+    def __init__(self, output_file, template='default', prs=None, observer=None,
+                 low_memory=False):
         self.output_file = output_file
-        self.prs = Presentation()
+        self.observer = observer
+        # An existing presentation can be passed in to add slides to it
+        self.prs = prs if prs is not None else load_template(template)
+        self.layout = blank_layout(self.prs)
+        self.media = MediaStore(self.prs.part.package)
         self.slide = None
         self.id_to_shape = {}  # Map Draw.io ID to PPTX Shape per slide
+        self.geometry = PageGeometry()  # Their bounds, for laying out edges
+        # Low-memory mode writes each slide out as soon as it is done
+        self.spool = SlideSpool(output_file) if low_memory else None
 
     def create_slide(self):
-        self.slide = self.prs.slides.add_slide(self.prs.slide_layouts[6])
+        self.slide = self.prs.slides.add_slide(self.layout)
         self.id_to_shape = {} # Reset map for new slide
+        self.geometry = PageGeometry()
+        self.page_index = 0 if self.page_index is None else self.page_index + 1
         return self.slide
 
+    def add_page(self, vertices, edges):
+        """Render one page onto a new slide and release its shape map."""
+        self.create_slide()
+        with measured(self.observer, 'vertices', len(vertices), self.page_index):
+            self.add_vertices(vertices)
+        with measured(self.observer, 'edges', len(edges), self.page_index):
+            self.add_edges(edges)
+        self.id_to_shape = {}
+        self.geometry = PageGeometry()
+        slide = self.slide
+        if self.spool is not None:
+            self._spool_slide()
+        return slide
+
     def add_vertices(self, vertices):
         if not self.slide:
             self.create_slide()
-            
+
         for v in vertices:
-            x, y, w, h = v["x"], v["y"], v["width"], v["height"]
-            style = v["style"]
+            x, y, w, h = v.x, v.y, v.width, v.height
+            style = v.style
+            self.geometry.add(v.id, px_to_emu(x), px_to_emu(y), px_to_emu(w), px_to_emu(h))
+
+            if style.image is not None:
+                self.id_to_shape[v.id] = self._add_picture(v, style.image)
+                continue
 
-            shape_type = get_shape_type(style)
+            shape_type = style.shape_type
 
             shape = self.slide.shapes.add_shape(
                 shape_type, px_to_emu(x), px_to_emu(
@@ -38,134 +279,103 @@ class PptxGenerator:
             self._apply_shape_style(shape, style)
 
             # Add Text
-            if v["value"]:
-                self._apply_text(shape, v["value"], style)
+            if v.value:
+                self._apply_text(shape, v.value, style)
 
-            self.id_to_shape[v["id"]] = shape
+            self.id_to_shape[v.id] = shape
 
     def add_edges(self, edges):
-        for e in edges:
-            source_id = e["source"]
-            target_id = e["target"]
-
-            if source_id in self.id_to_shape and target_id in self.id_to_shape:
-                src_shape = self.id_to_shape[source_id]
-                tgt_shape = self.id_to_shape[target_id]
-                
-                # Determine Connector Type
-                # If shapes are aligned, prefer STRAIGHT over ELBOW to prevent auto-routing mess
-                conn_type = get_connector_type(e["style"])
-                
-                if conn_type == MSO_CONNECTOR.ELBOW:
-                    # Check alignment
-                    src_l, src_r = src_shape.left, src_shape.left + src_shape.width
-                    src_t, src_b = src_shape.top, src_shape.top + src_shape.height
-                    tgt_l, tgt_r = tgt_shape.left, tgt_shape.left + tgt_shape.width
-                    tgt_t, tgt_b = tgt_shape.top, tgt_shape.top + tgt_shape.height
-                    
-                    x_overlap = max(0, min(src_r, tgt_r) - max(src_l, tgt_l))
-                    y_overlap = max(0, min(src_b, tgt_b) - max(src_t, tgt_t))
-                    
-                    # If significant overlap, use STRAIGHT
-                    if x_overlap > min(src_shape.width, tgt_shape.width) * 0.5 or \
-                       y_overlap > min(src_shape.height, tgt_shape.height) * 0.5:
-                        conn_type = MSO_CONNECTOR.STRAIGHT
-
-                connector = self.slide.shapes.add_connector(
-                    conn_type, 0, 0, 0, 0
-                )
-
-                # Smart connection logic
-                self._connect_shapes(connector, src_shape, tgt_shape, e["style"], conn_type)
-
-                # Apply Styles
-                self._apply_line_style(connector.line, e["style"])
-                
-                # Edge Label (if any)
-                if e['value']:
-                    self._add_edge_label(e, src_shape, tgt_shape)
+        for e, conn_type, xfrm, path, label_box in self.geometry.connectors(edges):
+            connector = self.slide.shapes.add_connector(conn_type, 0, 0, 0, 0)
+            self._place_connector(connector, xfrm)
+            if path is not None:
+                # A routed or waypoint connector is drawn as a freeform path
+                prst_geom = connector._element.spPr.find(qn('a:prstGeom'))
+                prst_geom.getparent().replace(prst_geom, parse_xml(
+                    f'<a:custGeom {nsdecls("a")}>{path_geometry_xml(xfrm, path)}</a:custGeom>'))
+
+            # Apply Styles
+            self._apply_line_style(connector.line, e.style)
+
+            # Edge Label (if any)
+            if label_box is not None:
+                self._add_text_box(label_box, e.value, e.style)
+
+    def _add_picture(self, vertex, image):
+        part = self.media.image_part(image)
+        rId = self.slide.part.relate_to(part, RT.IMAGE)
+        pic = self.slide.shapes._add_pic_from_image_part(
+            part, rId, px_to_emu(vertex.x), px_to_emu(vertex.y),
+            px_to_emu(vertex.width), px_to_emu(vertex.height))
+        # The same description whichever part the image ended up in
+        pic.nvPicPr.cNvPr.set('descr', image.desc)
+        picture = self.slide.shapes._shape_factory(pic)
+
+        if vertex.value:
+            self._add_text_box(self._image_label_box(picture, vertex.style),
+                               vertex.value, vertex.style)
+        return picture
+
+    def _image_rid(self, image):
+        """Relate the current slide to an image's part, returning the rId."""
+        return self.slide.part.relate_to(self.media.image_part(image), RT.IMAGE)
 
     def save(self):
-        self.prs.save(self.output_file)
+        with measured(self.observer, 'save', len(self.prs.slides)):
+            if self.spool is not None:
+                self.spool.finish(self.prs)
+            else:
+                save_presentation(self.prs, self.output_file)
+
+    def discard(self):
+        """Give up on the output after a failure, removing any partial file."""
+        if self.spool is not None:
+            self.spool.discard()
+
+    def _spool_slide(self):
+        self.spool.write_slide(self.slide.part)
+        self.slide = None
 
     def _apply_shape_style(self, shape, style):
         # Fill
-        fill_color = style.get("fillColor")
-        if fill_color == "none":
+        if style.fill_color == NO_COLOR:
             shape.fill.background()  # No fill
-        elif fill_color:
-            rgb = hex_to_rgb(fill_color)
-            if rgb:
-                shape.fill.solid()
-                shape.fill.fore_color.rgb = rgb
-        else:
-            # Default white fill if not specified
+        elif style.fill_color:
             shape.fill.solid()
-            shape.fill.fore_color.rgb = hex_to_rgb("#FFFFFF")
+            shape.fill.fore_color.rgb = style.fill_color
 
         # Line / Stroke
-        stroke_color = style.get("strokeColor")
-        if stroke_color == "none":
+        if style.stroke_color == NO_COLOR:
             shape.line.fill.background()
-        elif stroke_color:
-            rgb = hex_to_rgb(stroke_color)
-            if rgb:
-                shape.line.color.rgb = rgb
-        else:
-            # Default black stroke
-            shape.line.color.rgb = hex_to_rgb("#000000")
+        elif style.stroke_color:
+            shape.line.color.rgb = style.stroke_color
 
         # Stroke Width
-        if "strokeWidth" in style:
-            try:
-                width_pt = float(style["strokeWidth"])
-                shape.line.width = Pt(width_pt)
-            except:
-                pass
+        if style.stroke_width is not None:
+            shape.line.width = style.stroke_width
 
     def _apply_line_style(self, line, style):
         # Color
-        stroke_color = style.get("strokeColor")
-        if stroke_color and stroke_color != "none":
-            rgb = hex_to_rgb(stroke_color)
-            if rgb:
-                line.color.rgb = rgb
-        else:
-            line.color.rgb = hex_to_rgb("#000000")  # Default black
+        if style.line_color:
+            line.color.rgb = style.line_color
 
         # Width
-        if "strokeWidth" in style:
-            try:
-                width_pt = float(style["strokeWidth"])
-                line.width = Pt(width_pt)
-            except:
-                pass
-        else:
-            line.width = Pt(1)
-            
+        if style.line_width is not None:
+            line.width = style.line_width
+
         # Dash Style
-        line.dash_style = get_line_dash(style)
-        
+        line.dash_style = style.dash_style
+
         # Arrowheads (Manual XML injection)
-        from .ppt_map import get_arrow_type, get_arrow_size
-        
-        start_fill = style.get('startFill') != '0'
-        end_fill = style.get('endFill') != '0'
-        
-        start_arrow = get_arrow_type(style.get('startArrow', 'none'), fill=start_fill)
-        end_arrow = get_arrow_type(style.get('endArrow', 'none'), fill=end_fill)
-        
-        # Size mapping
-        start_w, start_l = get_arrow_size(style.get('startSize', '6'))
-        end_w, end_l = get_arrow_size(style.get('endSize', '6'))
-        
-        set_line_end(line, head_type=start_arrow, tail_type=end_arrow,
+        start_w, start_l = style.start_size
+        end_w, end_l = style.end_size
+        set_line_end(line, head_type=style.start_arrow, tail_type=style.end_arrow,
                      head_w=start_w, head_l=start_l, tail_w=end_w, tail_l=end_l)
 
     def _apply_text(self, shape, text_value, style):
         if not text_value:
             return
-            
+
         tf = shape.text_frame
         tf.word_wrap = True
         tf.margin_left = Emu(0)
@@ -176,126 +386,22 @@ class PptxGenerator:
         tf.clear()
         p = tf.paragraphs[0]
         p.alignment = PP_ALIGN.CENTER
-        
-        parser = HtmlTextParser(text_value)
-        segments = parser.parse()
-        
-        for seg in segments:
+
+        defaults, runs = self._text_runs(text_value, style)
+        if any(value is not None for value in defaults):
+            lst_style = tf._txBody.find(qn('a:lstStyle'))
+            def_rpr = SubElement(SubElement(lst_style, qn('a:lvl1pPr')), qn('a:defRPr'))
+            _set_font(Font(def_rpr), *defaults)
+        for text, *run_format in runs:
             run = p.add_run()
-            run.text = seg['text']
-            fmt = seg['format']
-            
-            run.font.bold = fmt['bold']
-            run.font.italic = fmt['italic']
-            run.font.underline = fmt['underline']
-            
-            # Color priority: Segment tag > Style attribute > Default Black
-            color_hex = fmt.get('color') or style.get('fontColor') or '#000000'
-            rgb = hex_to_rgb(color_hex)
-            if rgb:
-                run.font.color.rgb = rgb
-            
-            size = fmt.get('size') or style.get('fontSize')
-            if size:
-                try:
-                    run.font.size = Pt(float(size))
-                except:
-                    pass
-
-    def _connect_shapes(self, connector, src_shape, tgt_shape, edge_style, conn_type):
-        def get_idx_from_ratio(x, y):
-            try:
-                xf, yf = float(x), float(y)
-                if yf <= 0.1: return 0 # Top
-                if xf >= 0.9: return 1 # Right
-                if yf >= 0.9: return 2 # Bottom
-                if xf <= 0.1: return 3 # Left
-            except: pass
-            return None
-
-        # 1. Explicit points
-        src_idx = get_idx_from_ratio(edge_style.get('exitX'), edge_style.get('exitY'))
-        tgt_idx = get_idx_from_ratio(edge_style.get('entryX'), edge_style.get('entryY'))
-
-        if src_idx is None or tgt_idx is None:
-            # 2. Alignment / Overlap Logic
-            # Check if shapes are "in the same lane"
-            
-            src_l, src_r = src_shape.left, src_shape.left + src_shape.width
-            src_t, src_b = src_shape.top, src_shape.top + src_shape.height
-            tgt_l, tgt_r = tgt_shape.left, tgt_shape.left + tgt_shape.width
-            tgt_t, tgt_b = tgt_shape.top, tgt_shape.top + tgt_shape.height
-            
-            x_overlap = max(0, min(src_r, tgt_r) - max(src_l, tgt_l))
-            y_overlap = max(0, min(src_b, tgt_b) - max(src_t, tgt_t))
-            
-            scx = (src_l + src_r) / 2
-            scy = (src_t + src_b) / 2
-            tcx = (tgt_l + tgt_r) / 2
-            tcy = (tgt_t + tgt_b) / 2
-            
-            dx = tcx - scx
-            dy = tcy - scy
-            
-            # Determine relationship
-            if x_overlap > 0:
-                # Vertical alignment
-                if dy > 0: # Target Below
-                    src_idx = 2; tgt_idx = 0
-                else: # Target Above
-                    src_idx = 0; tgt_idx = 2
-            elif y_overlap > 0:
-                # Horizontal alignment
-                if dx > 0: # Target Right
-                    src_idx = 1; tgt_idx = 3
-                else: # Target Left
-                    src_idx = 3; tgt_idx = 1
-            else:
-                # No overlap, use delta heuristic (Diagonal)
-                # Use strict cardinal
-                if abs(dx) > abs(dy):
-                    if dx > 0: src_idx = 1; tgt_idx = 3
-                    else: src_idx = 3; tgt_idx = 1
-                else:
-                    if dy > 0: src_idx = 2; tgt_idx = 0
-                    else: src_idx = 0; tgt_idx = 2
-
-        # 3. Optimize Connector Type
-        # If perfectly aligned, force STRAIGHT to avoid weird elbows
-        # (Only if style wasn't explicitly curved)
-        if conn_type == MSO_CONNECTOR.ELBOW:
-            # Check if we can use straight line
-            can_be_straight = False
-            if src_idx == 2 and tgt_idx == 0 and abs(src_shape.left + src_shape.width/2 - (tgt_shape.left + tgt_shape.width/2)) < px_to_emu(10):
-                can_be_straight = True # Vertically aligned center
-            elif src_idx == 1 and tgt_idx == 3 and abs(src_shape.top + src_shape.height/2 - (tgt_shape.top + tgt_shape.height/2)) < px_to_emu(10):
-                can_be_straight = True # Horizontally aligned center
-            
-            if can_be_straight:
-                try:
-                    # We can't easily change type of existing object in python-pptx wrapper sometimes, 
-                    # but we can try setting the prst property if we accessed xml.
-                    # Or simpler: The user already passed `conn_type` to `add_connector`.
-                    # We should have decided this BEFORE creating the connector.
-                    pass 
-                except: pass
-
-        # Calculate connection point coordinates directly
-        # idx: 0=top, 1=right, 2=bottom, 3=left
-        def conn_point(shape, idx):
-            cx = shape.left + shape.width // 2
-            cy = shape.top + shape.height // 2
-            if idx == 0: return (cx, shape.top)
-            if idx == 1: return (shape.left + shape.width, cy)
-            if idx == 2: return (cx, shape.top + shape.height)
-            if idx == 3: return (shape.left, cy)
-            return (cx, cy)
-
-        sx, sy = conn_point(src_shape, src_idx)
-        ex, ey = conn_point(tgt_shape, tgt_idx)
+            run.text = text
+            if any(value is not None for value in run_format):
+                _set_font(run.font, *run_format)
+
+    def _place_connector(self, connector, placement):
+        x, y, cx, cy, flipH, flipV = placement
 
         # Set xfrm directly to avoid python-pptx flip normalisation
-        from lxml import etree
         nsmap_a = 'http://schemas.openxmlformats.org/drawingml/2006/main'
         nsmap_p = 'http://schemas.openxmlformats.org/presentationml/2006/main'
 
@@ -304,10 +410,6 @@ class PptxGenerator:
             spPr = connector._element.find(f'{{{nsmap_a}}}spPr')
         xfrm = spPr.find(f'{{{nsmap_a}}}xfrm')
 
-        # Determine flips: if source coord > target coord in either axis
-        flipH = '1' if sx > ex else None
-        flipV = '1' if sy > ey else None
-
         # Clear existing flip attributes
         for attr in ('flipH', 'flipV'):
             if attr in xfrm.attrib:
@@ -319,80 +421,22 @@ class PptxGenerator:
 
         off = xfrm.find(f'{{{nsmap_a}}}off')
         ext = xfrm.find(f'{{{nsmap_a}}}ext')
-        off.set('x', str(min(sx, ex)))
-        off.set('y', str(min(sy, ey)))
-        ext.set('cx', str(abs(ex - sx)))
-        ext.set('cy', str(abs(ey - sy)))
+        off.set('x', str(x))
+        off.set('y', str(y))
+        ext.set('cx', str(cx))
+        ext.set('cy', str(cy))
 
         # Note: stCxn/endCxn references omitted intentionally.
         # LibreOffice recalculates connector geometry from these references,
         # which overrides the explicit xfrm and produces incorrect rendering.
 
-
-    def _add_edge_label(self, edge, src_shape, tgt_shape):
-        # Calculate midpoint using shape centres
-        src_cx = src_shape.left + src_shape.width / 2
-        src_cy = src_shape.top + src_shape.height / 2
-        tgt_cx = tgt_shape.left + tgt_shape.width / 2
-        tgt_cy = tgt_shape.top + tgt_shape.height / 2
-
-        geo = edge["geometry"]
-
-        # Relative position along edge (0=source, 0.5=mid, 1=target)
-        rel_pos = 0.5
-        perp_offset = 0
-        pixel_offset_x = 0
-        pixel_offset_y = 0
-
-        if geo is not None:
-            if geo.get('relative') == '1':
-                try:
-                    # x is relative position: -1=source, 0=mid, 1=target
-                    rel_pos = (float(geo.get('x', 0)) + 1) / 2
-                except:
-                    pass
-                try:
-                    perp_offset = float(geo.get('y', 0))
-                except:
-                    pass
-
-            # Explicit pixel offset from <mxPoint as="offset">
-            offset = geo.find("mxPoint")
-            if offset is not None and offset.get("as") == "offset":
-                try:
-                    pixel_offset_x = float(offset.get("x", 0))
-                    pixel_offset_y = float(offset.get("y", 0))
-                except:
-                    pass
-
-        mid_x = src_cx + (tgt_cx - src_cx) * rel_pos
-        mid_y = src_cy + (tgt_cy - src_cy) * rel_pos
-
-        # Apply perpendicular offset
-        import math
-        dx = tgt_cx - src_cx
-        dy = tgt_cy - src_cy
-        length = math.sqrt(dx * dx + dy * dy)
-        if length > 0 and perp_offset != 0:
-            # Perpendicular direction (rotate 90 degrees)
-            mid_x += (-dy / length) * px_to_emu(perp_offset)
-            mid_y += (dx / length) * px_to_emu(perp_offset)
-
-        # Apply pixel offsets
-        mid_x += px_to_emu(pixel_offset_x)
-        mid_y += px_to_emu(pixel_offset_y)
-
-        # Create a text box
-        box_w = px_to_emu(80)
-        box_h = px_to_emu(40)
-
-        left = mid_x - (box_w / 2)
-        top = mid_y - (box_h / 2)
-
+    def _add_text_box(self, box, text_value, style):
+        left, top, box_w, box_h = box
         tb = self.slide.shapes.add_textbox(left, top, box_w, box_h)
-        tb.text_frame.word_wrap = False 
-        
+        tb.text_frame.word_wrap = False
+
         # Style the textbox background (optional, Draw.io labels are usually transparent or white)
         # For now, let's keep it transparent but ensure text is visible
-        
-        self._apply_text(tb, edge["value"], edge["style"])
+
+        self._apply_text(tb, text_value, style)
+        return tb
@@ -0,0 +1,507 @@
+import math
+from functools import lru_cache
+
+from pptx.enum.shapes import MSO_CONNECTOR
+from pptx.util import Pt
+
+from .utils import parse_html_label, px_to_emu
+
+# Connection sides of a shape, as indexes into its side points
+TOP, RIGHT, BOTTOM, LEFT = range(4)
+
+# Unit step away from a shape on each side
+_SIDE_STEPS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+# Clearance routed connectors keep from shapes: Draw.io's grid size
+ROUTE_MARGIN = px_to_emu(10)
+# Rounds of detours tried around the shapes in the way
+ROUTE_ROUNDS = 3
+# Smallest obstacle grid cell, and the most cells a shape is filed under
+MIN_GRID_CELL = px_to_emu(20)
+MAX_BOX_CELLS = 64
+
+# Label size estimate: PowerPoint's text box font size when the style has
+# none, average character width and line height in ems, padding in px
+DEFAULT_FONT_SIZE = Pt(18)
+CHAR_WIDTH = 0.6
+LINE_HEIGHT = 1.2
+LABEL_PADDING = 4
+LABEL_SIZE_CACHE_SIZE = 4096
+
+# Where to try an edge label when its own spot is taken, as offsets along
+# the edge and across it in label lengths, nearest first
+LABEL_SLOTS = (
+    (0, 0), (0.5, 0), (-0.5, 0), (0, 1), (0, -1), (1, 0), (-1, 0),
+    (0.5, 1), (-0.5, 1), (0.5, -1), (-0.5, -1), (1.5, 0), (-1.5, 0),
+)
+
+
+def ratio_side(x, y):
+    """The side an exitX/exitY (or entryX/entryY) pair is on, or None."""
+    try:
+        xf, yf = float(x), float(y)
+    except (TypeError, ValueError):
+        return None
+    if yf <= 0.1: return TOP
+    if xf >= 0.9: return RIGHT
+    if yf >= 0.9: return BOTTOM
+    if xf <= 0.1: return LEFT
+    return None
+
+
+class PageGeometry:
+    """Bounds of one page's shapes in EMU, by cell id.
+
+    Each shape's edges, centre and side midpoints are worked out once when
+    it is added; connectors() then lays out all of a page's edges from
+    those numbers alone, without going back to the shapes.
+    """
+
+    def __init__(self):
+        self._bounds = {}
+        self._obstacles = None
+        self._labels = None
+
+    def add(self, cell_id, left, top, width, height):
+        self._bounds[cell_id] = _make_bounds(left, top, width, height)
+        self._obstacles = None
+        self._labels = None
+
+    def __contains__(self, cell_id):
+        return cell_id in self._bounds
+
+    def connectors(self, edges):
+        """Yield (edge, connector type, xfrm, path, label box) for each drawable edge.
+
+        Edges missing an end on this page are skipped. xfrm is
+        (x, y, cx, cy, flipH, flipV). path is None for a preset connector,
+        or the points in EMU of a freeform one: edges with waypoints, and
+        orthogonal edges that would otherwise cut through other shapes.
+        The label box is (left, top, width, height), or None for an edge
+        without a label; labels are kept off shapes and earlier labels
+        where there is room nearby.
+        """
+        bounds = self._bounds
+        elbow = MSO_CONNECTOR.ELBOW
+        for edge in edges:
+            src = bounds.get(edge.source)
+            tgt = bounds.get(edge.target)
+            if src is None or tgt is None:
+                continue
+            x_overlap, y_overlap = _overlaps(src, tgt)
+            style = edge.style
+
+            # Elbows between shapes that largely overlap on one axis get
+            # tangled, so those are drawn straight
+            conn_type = style.connector_type
+            orthogonal = conn_type == elbow
+            if orthogonal and (x_overlap > min(src[4], tgt[4]) * 0.5
+                               or y_overlap > min(src[5], tgt[5]) * 0.5):
+                conn_type = MSO_CONNECTOR.STRAIGHT
+
+            if edge.points:
+                path = _waypoint_path(src, tgt, edge.points, style, orthogonal)
+                xfrm = _path_xfrm(path)
+            else:
+                src_idx = style.exit_side
+                tgt_idx = style.entry_side
+                if src_idx is None or tgt_idx is None:
+                    src_idx, tgt_idx = _facing_sides(src, tgt, x_overlap, y_overlap)
+
+                sx, sy = src[6][src_idx]
+                ex, ey = tgt[6][tgt_idx]
+                path = self._route(src, tgt, src_idx, tgt_idx, conn_type) if orthogonal else None
+                if path is None:
+                    xfrm = (min(sx, ex), min(sy, ey), abs(ex - sx), abs(ey - sy), sx > ex, sy > ey)
+                else:
+                    xfrm = _path_xfrm(path)
+
+            label_box = self._place_label(edge, src, tgt, path) if edge.value else None
+            yield edge, conn_type, xfrm, path, label_box
+
+    def _route(self, src, tgt, src_idx, tgt_idx, conn_type):
+        """An orthogonal path around the shapes in the way, or None.
+
+        None means the connector as PowerPoint draws it is clear, or that
+        no detour was found. Candidates leave and enter their shapes
+        square to the side, with a single cross channel; channels next to
+        the shapes blocking earlier candidates are tried in later rounds,
+        shortest path first.
+        """
+        start = src[6][src_idx]
+        end = tgt[6][tgt_idx]
+        if conn_type == MSO_CONNECTOR.STRAIGHT:
+            drawn = (start, end)
+        else:
+            # bentConnector3 crosses over halfway along its width
+            mid = (start[0] + end[0]) / 2
+            drawn = (start, (mid, start[1]), (mid, end[1]), end)
+        grid = self._obstacle_grid()
+        blocker = grid.blocker
+        ignore = grid.around(src, tgt)
+        if blocker(drawn, ignore) is None:
+            return None
+
+        margin = ROUTE_MARGIN
+        step_x, step_y = _SIDE_STEPS[src_idx]
+        out = (start[0] + step_x * margin, start[1] + step_y * margin)
+        step_x, step_y = _SIDE_STEPS[tgt_idx]
+        into = (end[0] + step_x * margin, end[1] + step_y * margin)
+
+        xs = {(out[0] + into[0]) // 2}
+        ys = {(out[1] + into[1]) // 2}
+        tried = set()
+        for _ in range(ROUTE_ROUNDS):
+            candidates = [_simplify((start, out, (x, out[1]), (x, into[1]), into, end)) for x in xs]
+            candidates += [_simplify((start, out, (out[0], y), (into[0], y), into, end)) for y in ys]
+            candidates = sorted((path for path in set(candidates) if path not in tried),
+                                key=lambda path: (_length(path), path))
+            blocking = []
+            for path in candidates:
+                tried.add(path)
+                box = blocker(path, ignore)
+                if box is None:
+                    return path
+                blocking.append(box)
+            for box in blocking:
+                xs.update((box[0] - margin, box[2] + margin))
+                ys.update((box[1] - margin, box[3] + margin))
+        return None
+
+    def _place_label(self, edge, src, tgt, path):
+        """The box for an edge's label, sized to its text.
+
+        The spot Draw.io would use is tried first, then spots further
+        along and beside the edge, until one clears every shape and
+        earlier label. When none does, the label stays on its own spot.
+        """
+        x, y, ux, uy = _label_anchor(edge, src, tgt, path)
+        width, height = label_size(edge.value, edge.style)
+        # How far the label reaches along the edge and across it
+        along = abs(ux) * width + abs(uy) * height
+        across = abs(uy) * width + abs(ux) * height
+        shapes = self._obstacle_grid()
+        ignore = shapes.around(src, tgt)
+        if self._labels is None:
+            self._labels = ObstacleGrid((), shapes.size)
+        labels = self._labels
+
+        box = first = None
+        for a, c in LABEL_SLOTS:
+            cx = x + ux * a * along - uy * c * across
+            cy = y + uy * a * along + ux * c * across
+            box = (cx - width / 2, cy - height / 2, cx + width / 2, cy + height / 2)
+            if first is None:
+                first = box
+            if not shapes.overlaps(box, ignore) and not labels.overlaps(box):
+                break
+        else:
+            box = first
+        labels.add(box)
+        return box[0], box[1], width, height
+
+    def _obstacle_grid(self):
+        if self._obstacles is None:
+            self._obstacles = ObstacleGrid(self._bounds.values())
+        return self._obstacles
+
+
+class ObstacleGrid:
+    """Shape bounds bucketed into a uniform grid.
+
+    Finding the shapes a segment or box might touch only looks at the grid
+    cells it covers, so the cost of a lookup does not grow with the number
+    of shapes on the page. Shapes spanning many cells (containers,
+    swimlanes) are kept in a short list of their own instead.
+    """
+
+    def __init__(self, boxes, size=None):
+        boxes = list(boxes)
+        if size is None:
+            size = sum(max(box[4], box[5]) for box in boxes) // max(len(boxes), 1)
+        self.size = max(size, MIN_GRID_CELL)
+        self.cells = {}
+        self.large = []
+        self._containers = {}
+        for box in boxes:
+            self.add(box)
+
+    def add(self, box):
+        size = self.size
+        x0, x1 = int(box[0] // size), int(box[2] // size)
+        y0, y1 = int(box[1] // size), int(box[3] // size)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_BOX_CELLS:
+            self.large.append(box)
+            return
+        for gx in range(x0, x1 + 1):
+            for gy in range(y0, y1 + 1):
+                self.cells.setdefault((gx, gy), []).append(box)
+
+    def overlaps(self, box, ignore=frozenset()):
+        """Whether anything overlaps the inside of `box`.
+
+        Shapes whose ids are in `ignore` do not count, as in blocker().
+        """
+        left, top, right, bottom = box[:4]
+        size = self.size
+        cells = self.cells
+        for gx in range(int(left // size), int(right // size) + 1):
+            for gy in range(int(top // size), int(bottom // size) + 1):
+                for other in cells.get((gx, gy), ()):
+                    if (other[0] < right and other[2] > left and other[1] < bottom
+                            and other[3] > top and id(other) not in ignore):
+                        return True
+        return any(_intersects(other, box) and id(other) not in ignore for other in self.large)
+
+    def around(self, src, tgt):
+        """Ids of the shapes that contain either end of an edge: its containers.
+
+        A shape around another covers its top left corner, so only that
+        grid cell (and the large shapes) is searched. Results are kept per
+        shape, as most shapes are the end of several edges.
+        """
+        return self._around(src) | self._around(tgt)
+
+    def _around(self, inner):
+        key = id(inner)
+        found = self._containers.get(key)
+        if found is None:
+            size = self.size
+            cell = self.cells.get((int(inner[0] // size), int(inner[1] // size)), [])
+            found = self._containers[key] = frozenset(
+                id(box) for box in cell + self.large
+                if box is not inner and box[0] <= inner[0] and box[1] <= inner[1]
+                and box[2] >= inner[2] and box[3] >= inner[3])
+        return found
+
+    def blocker(self, path, ignore=frozenset()):
+        """The first shape `path` passes through, or None.
+
+        Shapes are entered only through their interior, so running along
+        an outline is fine. Shapes whose ids are in `ignore` (the
+        containers the edge sits in, see around()) do not count. Each shape
+        near the path is looked at once, however many segments it is near.
+        """
+        size = self.size
+        cells = self.cells
+        large = self.large
+        # The last segment each shape was looked at for, kept for the whole
+        # path; the edge's containers count as looked at for every segment
+        looked = dict.fromkeys(ignore, math.inf)
+        for i, ((x1, y1), (x2, y2)) in enumerate(zip(path, path[1:])):
+            left, right = min(x1, x2), max(x1, x2)
+            top, bottom = min(y1, y2), max(y1, y2)
+            straight = x1 == x2 or y1 == y2
+            for gx in range(int(left // size), int(right // size) + 1):
+                for gy in range(int(top // size), int(bottom // size) + 1):
+                    for box in cells.get((gx, gy), ()):
+                        key = id(box)
+                        if looked.get(key, -1) >= i:
+                            continue
+                        looked[key] = i
+                        # Bounding boxes settle level and upright segments
+                        if (right > box[0] and left < box[2] and bottom > box[1] and top < box[3]
+                                and (straight or _crosses(x1, y1, x2, y2, box))):
+                            return box
+            for box in large:
+                if id(box) not in ignore and _crosses(x1, y1, x2, y2, box):
+                    return box
+        return None
+
+
+def _make_bounds(left, top, width, height):
+    """(left, top, right, bottom, width, height, side midpoints) of a shape."""
+    right = left + width
+    bottom = top + height
+    mid_x = left + width // 2
+    mid_y = top + height // 2
+    sides = ((mid_x, top), (right, mid_y), (mid_x, bottom), (left, mid_y))
+    return (left, top, right, bottom, width, height, sides)
+
+
+def _overlaps(a, b):
+    """How far two shapes overlap horizontally and vertically, or 0."""
+    return (max(0, min(a[2], b[2]) - max(a[0], b[0])),
+            max(0, min(a[3], b[3]) - max(a[1], b[1])))
+
+
+def _facing_sides(src, tgt, x_overlap, y_overlap):
+    """The sides of two shapes that face each other."""
+    # Twice the distance between centres; only signs and magnitudes are
+    # compared
+    dx = (tgt[0] + tgt[2]) - (src[0] + src[2])
+    dy = (tgt[1] + tgt[3]) - (src[1] + src[3])
+    if x_overlap > 0:
+        # Same column
+        return (BOTTOM, TOP) if dy > 0 else (TOP, BOTTOM)
+    if y_overlap > 0:
+        # Same row
+        return (RIGHT, LEFT) if dx > 0 else (LEFT, RIGHT)
+    if abs(dx) > abs(dy):
+        return (RIGHT, LEFT) if dx > 0 else (LEFT, RIGHT)
+    return (BOTTOM, TOP) if dy > 0 else (TOP, BOTTOM)
+
+
+def _waypoint_path(src, tgt, waypoints, style, orthogonal):
+    """The path through an edge's waypoints, squared off for orthogonal styles."""
+    points = [(px_to_emu(x), px_to_emu(y)) for x, y in waypoints]
+    src_idx = style.exit_side
+    if src_idx is None:
+        first = _make_bounds(*points[0], 0, 0)
+        src_idx = _facing_sides(src, first, *_overlaps(src, first))[0]
+    tgt_idx = style.entry_side
+    if tgt_idx is None:
+        last = _make_bounds(*points[-1], 0, 0)
+        tgt_idx = _facing_sides(last, tgt, *_overlaps(last, tgt))[1]
+    points = [src[6][src_idx], *points, tgt[6][tgt_idx]]
+
+    if orthogonal:
+        # Turn a corner between points that are not lined up, going the
+        # other way from the segment before
+        horizontal = src_idx in (LEFT, RIGHT)
+        squared = [points[0]]
+        for x, y in points[1:]:
+            px, py = squared[-1]
+            if px != x and py != y:
+                squared.append((x, py) if horizontal else (px, y))
+            elif py == y:
+                horizontal = False
+            elif px == x:
+                horizontal = True
+            squared.append((x, y))
+        points = squared
+    return _simplify(points)
+
+
+def _simplify(points):
+    """Drop repeated points and corners that are not turns."""
+    out = []
+    for point in points:
+        if out and point == out[-1]:
+            continue
+        if len(out) >= 2:
+            (ax, ay), (bx, by) = out[-2], out[-1]
+            if (ax == bx == point[0]) or (ay == by == point[1]):
+                out[-1] = point
+                continue
+        out.append(point)
+    if len(out) == 1:
+        out.append(out[0])
+    return tuple(out)
+
+
+def _length(path):
+    return sum(abs(x2 - x1) + abs(y2 - y1) for (x1, y1), (x2, y2) in zip(path, path[1:]))
+
+
+def _path_xfrm(path):
+    xs = [x for x, _ in path]
+    ys = [y for _, y in path]
+    x, y = min(xs), min(ys)
+    return x, y, max(xs) - x, max(ys) - y, False, False
+
+
+def _crosses(x1, y1, x2, y2, box):
+    """Whether a segment passes through the inside of a shape."""
+    left, top, right, bottom = box[:4]
+    if max(x1, x2) <= left or min(x1, x2) >= right or max(y1, y2) <= top or min(y1, y2) >= bottom:
+        return False
+    if x1 == x2 or y1 == y2:
+        return True
+    # Clip the segment to the shape's columns and compare heights there
+    t0 = min(max((left - x1) / (x2 - x1), 0), 1)
+    t1 = min(max((right - x1) / (x2 - x1), 0), 1)
+    ya = y1 + (y2 - y1) * t0
+    yb = y1 + (y2 - y1) * t1
+    return max(ya, yb) > top and min(ya, yb) < bottom
+
+
+def _intersects(a, b):
+    """Whether two boxes share more than an edge."""
+    return a[0] < b[2] and a[2] > b[0] and a[1] < b[3] and a[3] > b[1]
+
+
+def path_geometry_xml(xfrm, path):
+    """The children of an a:custGeom drawing `path` within `xfrm`, as markup."""
+    x, y, cx, cy = xfrm[:4]
+    (x0, y0), *rest = path
+    # A zero path size would scale by zero; points on that axis are all 0
+    return (
+        '<a:avLst/><a:gdLst/><a:ahLst/><a:cxnLst/><a:rect l="0" t="0" r="r" b="b"/>'
+        f'<a:pathLst><a:path w="{max(cx, 1)}" h="{max(cy, 1)}" fill="none">'
+        f'<a:moveTo><a:pt x="{x0 - x}" y="{y0 - y}"/></a:moveTo>'
+        + ''.join(f'<a:lnTo><a:pt x="{px - x}" y="{py - y}"/></a:lnTo>' for px, py in rest)
+        + '</a:path></a:pathLst>'
+    )
+
+
+def _label_anchor(edge, src, tgt, path):
+    """Where Draw.io puts an edge's label, as (x, y, ux, uy).
+
+    (ux, uy) is the unit direction of the edge at that point. A preset
+    connector's label goes between the shape centres, a freeform one's
+    along its path.
+    """
+    rel_pos = edge.label_position
+    if path is None:
+        src_cx = src[0] + src[4] / 2
+        src_cy = src[1] + src[5] / 2
+        tgt_cx = tgt[0] + tgt[4] / 2
+        tgt_cy = tgt[1] + tgt[5] / 2
+        x = src_cx + (tgt_cx - src_cx) * rel_pos
+        y = src_cy + (tgt_cy - src_cy) * rel_pos
+        dx = tgt_cx - src_cx
+        dy = tgt_cy - src_cy
+    else:
+        x, y, dx, dy = _point_along(path, rel_pos)
+    length = math.sqrt(dx * dx + dy * dy)
+    ux, uy = (dx / length, dy / length) if length > 0 else (1.0, 0.0)
+
+    # Perpendicular offset (the edge direction rotated 90 degrees)
+    if length > 0 and edge.label_offset != 0:
+        x += -uy * px_to_emu(edge.label_offset)
+        y += ux * px_to_emu(edge.label_offset)
+
+    x += px_to_emu(edge.label_dx)
+    y += px_to_emu(edge.label_dy)
+    return x, y, ux, uy
+
+
+def _point_along(path, fraction):
+    """The point `fraction` of the way along a path, and its segment's (dx, dy)."""
+    segments = [(a, b, math.dist(a, b)) for a, b in zip(path, path[1:])]
+    remaining = sum(length for _, _, length in segments) * min(max(fraction, 0), 1)
+    for (x1, y1), (x2, y2), length in segments:
+        if remaining <= length and length > 0:
+            f = remaining / length
+            return x1 + (x2 - x1) * f, y1 + (y2 - y1) * f, x2 - x1, y2 - y1
+        remaining -= length
+    (x1, y1), (x2, y2), _ = segments[-1]
+    return x2, y2, x2 - x1, y2 - y1
+
+
+@lru_cache(maxsize=LABEL_SIZE_CACHE_SIZE)
+def label_size(text_value, style):
+    """Estimated (width, height) in EMU of the text box for a label.
+
+    Takes the longest line and the number of lines at the largest font
+    size in the label, plus a little padding.
+    """
+    default = style.font_size or DEFAULT_FONT_SIZE
+    size = 0
+    text = []
+    for segment, fmt in parse_html_label(text_value):
+        text.append(segment)
+        size = max(size, _points(fmt.size) or default)
+    lines = ''.join(text).strip('\n').split('\n')
+    padding = 2 * px_to_emu(LABEL_PADDING)
+    width = int(max(len(line) for line in lines) * (size or default) * CHAR_WIDTH) + padding
+    height = int(len(lines) * (size or default) * LINE_HEIGHT) + padding
+    return width, height
+
+
+def _points(value):
+    try:
+        return Pt(float(value))
+    except (TypeError, ValueError):
+        return None
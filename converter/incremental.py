@@ -0,0 +1,170 @@
+import json
+import os
+import time
+
+from pptx import Presentation
+
+from . import BACKENDS, __version__
+from .engine import save_presentation
+from .parser import DrawioParser
+from .utils import emu_to_px
+
+
+def fingerprint_path(output_file):
+    """Sidecar file recording which page each slide of `output_file` came from."""
+    return output_file + '.pages.json'
+
+
+class IncrementalConverter:
+    """Keeps an output deck in sync with its diagram, one page at a time.
+
+    Every page is fingerprinted and the fingerprints are stored next to the
+    output. On update() pages whose fingerprint is unchanged keep their
+    existing slide untouched; only new or edited pages are extracted and
+    rendered, and slides for pages that are gone are dropped. Without a
+    usable fingerprint file the deck is rebuilt from scratch.
+    """
+
+    def __init__(self, input_file, output_file, backend='pptx', template='default',
+                 observer=None, pages=None, layers=None, crop=False):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}'")
+        self.input_file = input_file
+        self.output_file = output_file
+        self.backend = backend
+        self.template = template
+        self.observer = observer
+        self.pages = pages
+        self.layers = layers
+        self.crop = crop
+
+    def update(self):
+        """Bring the output up to date. Returns (rendered, reused) slide counts."""
+        parser = DrawioParser(self.input_file, layers=self.layers)
+        # Pages are read twice rather than held: once for the fingerprints,
+        # each page's source let go before the next is read, then again
+        # for the pages that need rendering
+        fingerprints = [page.fingerprint for page in parser.iter_pages(self.pages)]
+
+        info = self._load_fingerprints()
+        if (info is not None and info.get('pages') == fingerprints
+                and self._matches(info) and os.path.exists(self.output_file)):
+            # Nothing changed: leave the output file alone
+            return 0, len(fingerprints)
+
+        prs, old = self._load_previous(info)
+        generator = BACKENDS[self.backend](self.output_file, template=self.template, prs=prs,
+                                           observer=self.observer)
+        prs = generator.prs
+        if self.crop:
+            parser.bounds = (0, 0, emu_to_px(prs.slide_width), emu_to_px(prs.slide_height))
+
+        # Match pages to existing slides by fingerprint
+        available = {}
+        for index, fp in enumerate(old):
+            available.setdefault(fp, []).append(index)
+        reuse = [available[fp].pop(0) if available.get(fp) else None for fp in fingerprints]
+
+        sld_id_lst = prs.slides._sldIdLst
+        old_ids = list(sld_id_lst)
+        kept = {index for index in reuse if index is not None}
+        for index, sld_id in enumerate(old_ids):
+            if index not in kept:
+                prs.part.drop_rel(sld_id.rId)
+                sld_id_lst.remove(sld_id)
+        self._rename_slide_parts(prs)
+
+        rendered = 0
+        order = []
+        pages = parser.iter_pages(self.pages) if None in reuse else iter(())
+        for fp, index in zip(fingerprints, reuse):
+            page = next(pages, None)
+            if index is not None:
+                order.append(old_ids[index])
+                continue
+            if page is None or page.fingerprint != fp:
+                raise ValueError(f"{self.input_file} changed during the update")
+            vertices, edges = page.data
+            generator.add_page(vertices, edges)
+            if self.observer:
+                self.observer.page_done(len(order), page.name, len(vertices), len(edges))
+                if page.culled:
+                    self.observer.cells_culled(len(order), page.name, page.culled)
+            order.append(sld_id_lst[-1])
+            rendered += 1
+
+        # Put the slides back into page order
+        for sld_id in order:
+            sld_id_lst.append(sld_id)
+        self._rename_slide_parts(prs)
+
+        save_presentation(prs, self.output_file)
+        self._save_fingerprints(fingerprints)
+        return rendered, len(fingerprints) - rendered
+
+    def watch(self, interval=1.0):
+        """Update the output whenever the input file changes, until interrupted.
+
+        Each update is reported to the observer, as is an update that
+        fails; watching carries on either way.
+        """
+        last = None
+        while True:
+            try:
+                stat = os.stat(self.input_file)
+                mark = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                mark = None
+            if mark is not None and mark != last:
+                last = mark
+                try:
+                    rendered, reused = self.update()
+                except Exception as e:
+                    # Editors often save in several steps; try again on the next change
+                    if self.observer:
+                        self.observer.update_failed(e)
+                else:
+                    if self.observer:
+                        self.observer.output_updated(self.output_file, rendered, reused)
+            time.sleep(interval)
+
+    def _load_previous(self, info):
+        """The existing deck and its slides' fingerprints, or (None, [])."""
+        if info is None or not self._matches(info) or not os.path.exists(self.output_file):
+            return None, []
+        try:
+            prs = Presentation(self.output_file)
+        except Exception:
+            return None, []
+        pages = info.get('pages', [])
+        if len(prs.slides) != len(pages):
+            return None, []
+        return prs, pages
+
+    @staticmethod
+    def _rename_slide_parts(prs):
+        prs.part.rename_slide_parts([sld_id.rId for sld_id in prs.slides._sldIdLst])
+
+    def _matches(self, info):
+        return info.get('version') == __version__ and info.get('options') == self._options()
+
+    def _options(self):
+        options = {'backend': self.backend, 'template': self.template}
+        # Fingerprints cover the whole page, whichever cells are kept
+        if self.layers is not None:
+            options['layers'] = self.layers
+        if self.crop:
+            options['crop'] = self.crop
+        return options
+
+    def _load_fingerprints(self):
+        try:
+            with open(fingerprint_path(self.output_file), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_fingerprints(self, fingerprints):
+        with open(fingerprint_path(self.output_file), 'w', encoding='utf-8') as f:
+            json.dump({'version': __version__, 'options': self._options(),
+                       'pages': fingerprints}, f, indent=1)
@@ -0,0 +1,115 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    """Raised when a JobQueue already holds its maximum number of pending jobs."""
+
+
+class Job:
+    """State of one queued conversion, updated by the worker running it."""
+    __slots__ = ('id', 'status', 'pages_done', 'pages_total', 'page', 'result',
+                 'error', 'submitted', 'finished', 'meta')
+
+    def __init__(self, meta=None):
+        self.id = uuid.uuid4().hex
+        self.meta = meta
+        self.status = 'queued'
+        self.pages_done = 0
+        self.pages_total = None
+        self.page = None
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+
+    def progress(self, pages_done, pages_total, page_name):
+        self.pages_done = pages_done
+        self.pages_total = pages_total
+        self.page = page_name
+
+    @property
+    def fraction(self):
+        """Share of the work done, from 0.0 to 1.0."""
+        if self.status == 'done':
+            return 1.0
+        if self.pages_total:
+            return self.pages_done / self.pages_total
+        return 0.0
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'pages_done': self.pages_done,
+            'pages_total': self.pages_total,
+            'page': self.page,
+            'progress': round(self.fraction, 3),
+            'error': self.error,
+        }
+
+
+class JobQueue:
+    """Runs conversions on a bounded pool of local worker threads.
+
+    At most `max_pending` jobs may be queued or running at once; submit()
+    raises QueueFull beyond that so callers can push back. Finished jobs
+    are forgotten `keep` seconds after they complete.
+    """
+
+    def __init__(self, workers=2, max_pending=16, keep=3600):
+        self.max_pending = max_pending
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='convert')
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._pending = 0
+
+    def submit(self, fn, *args, meta=None):
+        """Queue fn(job, *args); its return value becomes job.result.
+
+        `meta` is stored on the job untouched, for the caller's own use.
+        """
+        with self._lock:
+            self._purge()
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"{self._pending} jobs already pending")
+            job = Job(meta)
+            self._jobs[job.id] = job
+            self._pending += 1
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, fn, args):
+        job.status = 'running'
+        try:
+            job.result = fn(job, *args)
+            job.status = 'done'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._pending -= 1
+
+    def _purge(self):
+        cutoff = time.time() - self.keep
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished is not None and job.finished < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,121 @@
+import binascii
+import hashlib
+import io
+import re
+
+from pptx.opc.constants import CONTENT_TYPE as CT
+from pptx.parts.image import ImagePart
+
+# "image=data:image/png,<base64>" as Draw.io writes it; ";base64" before
+# the comma is accepted too, although it looks like a style separator.
+_DATA_URI = re.compile(r'data:image/[-\w.+]+(?:;base64)?,([A-Za-z0-9+/]*={0,2})(?:;|$)')
+
+# Raster formats PowerPoint shows, by their leading bytes
+_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+)
+_CONTENT_TYPES = {
+    'png': CT.PNG,
+    'jpg': CT.JPEG,
+    'gif': CT.GIF,
+    'bmp': CT.BMP,
+    'tiff': CT.TIFF,
+}
+
+# Base64 characters decoded per step; a multiple of 4
+DECODE_CHUNK = 1 << 20
+
+
+class EmbeddedImage:
+    """A base64 image from a cell style, not decoded yet.
+
+    Only offsets into the style string are kept, so a cached style holds no
+    copy of the payload; `payload` slices it out when asked.
+    """
+    __slots__ = ('ext', 'source', 'start', 'end')
+
+    def __init__(self, ext, source, start, end):
+        self.ext = ext
+        self.source = source
+        self.start = start
+        self.end = end
+
+    @property
+    def payload(self):
+        return self.source[self.start:self.end]
+
+    @property
+    def desc(self):
+        # The description python-pptx gives pictures added from a stream
+        return f'image.{self.ext}'
+
+
+def style_image(style_str):
+    """The raster image embedded in a style string, or None.
+
+    Only the first bytes are decoded, to tell the format. SVG and anything
+    unrecognised give None, so the cell is drawn as a plain shape.
+    """
+    start = style_str.find('image=data:')
+    if start < 0 or (start > 0 and style_str[start - 1] != ';'):
+        return None
+    m = _DATA_URI.match(style_str, start + len('image='))
+    if m is None or (m.end(1) - m.start(1)) % 4:
+        return None
+    head = binascii.a2b_base64(style_str[m.start(1):m.start(1) + 24])
+    for signature, ext in _SIGNATURES:
+        if head.startswith(signature):
+            return EmbeddedImage(ext, style_str, m.start(1), m.end(1))
+    return None
+
+
+def decode_image(payload):
+    """Decode a base64 payload, returning (sha1 hex digest, bytes).
+
+    Works a chunk at a time so the only full-size copy is the result.
+    """
+    out = io.BytesIO()
+    digest = hashlib.sha1()
+    for start in range(0, len(payload), DECODE_CHUNK):
+        block = binascii.a2b_base64(payload[start:start + DECODE_CHUNK])
+        digest.update(block)
+        out.write(block)
+    # getvalue() hands over the buffer without copying it
+    return digest.hexdigest(), out.getvalue()
+
+
+class MediaStore:
+    """Image parts of one presentation, shared by every slide.
+
+    Each distinct payload is decoded once and parts are keyed by a hash of
+    their content, so an icon used on many cells and slides is stored once.
+    Images already in the package (when adding to an existing deck) are
+    reused too.
+    """
+
+    def __init__(self, package):
+        self.package = package
+        self._by_payload = {}
+        self._by_sha1 = None
+
+    def image_part(self, image):
+        payload = image.payload
+        part = self._by_payload.get(payload)
+        if part is None:
+            if self._by_sha1 is None:
+                self._by_sha1 = {p.sha1: p for p in self.package.iter_parts()
+                                 if isinstance(p, ImagePart)}
+            sha1, blob = decode_image(payload)
+            part = self._by_sha1.get(sha1)
+            if part is None:
+                partname = self.package.next_image_partname(image.ext)
+                part = ImagePart(partname, _CONTENT_TYPES[image.ext], self.package, blob)
+                self._by_sha1[sha1] = part
+            self._by_payload[payload] = part
+        return part
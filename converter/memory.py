@@ -0,0 +1,51 @@
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class MemoryLimitExceeded(MemoryError):
+    """The conversion went over its memory ceiling."""
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if unknown.
+
+    Read from /proc where there is one; elsewhere the peak stands in for it.
+    """
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+class MemoryBudget:
+    """A ceiling on resident memory, checked after each page.
+
+    Going over it raises MemoryLimitExceeded, so a diagram too big for the
+    budget fails cleanly instead of being killed by the system.
+    """
+
+    def __init__(self, limit_mb):
+        self.limit_mb = limit_mb
+        self.limit = int(limit_mb * 1024 * 1024)
+
+    def check(self, page_name):
+        rss = current_rss()
+        if rss is not None and rss > self.limit:
+            raise MemoryLimitExceeded(
+                f"Memory use reached {rss / (1024 * 1024):.0f} MB on page '{page_name}', "
+                f"over the {self.limit_mb:g} MB limit")
@@ -0,0 +1,41 @@
+class Vertex:
+    """A shape cell with its absolute geometry in pixels."""
+    __slots__ = ('id', 'value', 'style', 'style_str', 'parent_id',
+                 'x', 'y', 'width', 'height')
+
+    def __init__(self, id, value, style, style_str, parent_id, x, y, width, height):
+        self.id = id
+        self.value = value
+        self.style = style
+        self.style_str = style_str
+        self.parent_id = parent_id
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+
+class Edge:
+    """A connector cell with its label placement resolved to plain numbers."""
+    __slots__ = ('id', 'value', 'style', 'style_str', 'parent_id',
+                 'source', 'target',
+                 'label_position', 'label_offset', 'label_dx', 'label_dy', 'points')
+
+    def __init__(self, id, value, style, style_str, parent_id, source, target,
+                 label_position=0.5, label_offset=0.0, label_dx=0.0, label_dy=0.0, points=()):
+        self.id = id
+        self.value = value
+        self.style = style
+        self.style_str = style_str
+        self.parent_id = parent_id
+        self.source = source
+        self.target = target
+        # Relative position along edge (0=source, 0.5=mid, 1=target)
+        self.label_position = label_position
+        # Perpendicular offset from the edge, in pixels
+        self.label_offset = label_offset
+        # Explicit pixel offset from <mxPoint as="offset">
+        self.label_dx = label_dx
+        self.label_dy = label_dy
+        # Waypoints from <Array as="points">, absolute (x, y) in pixels
+        self.points = points
@@ -0,0 +1,271 @@
+import cProfile
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from .memory import peak_rss
+
+
+class PhaseStats:
+    """Cost of one run of a pipeline phase.
+
+    `blocks` is the net change in allocated memory blocks, a cheap stand-in
+    for allocations that needs no tracemalloc. `count` is the number of
+    elements handled (pages, shapes, edges, labels...).
+    """
+    __slots__ = ('phase', 'wall', 'cpu', 'blocks', 'count', 'page')
+
+    def __init__(self, phase, wall, cpu, blocks, count, page):
+        self.phase = phase
+        self.wall = wall
+        self.cpu = cpu
+        self.blocks = blocks
+        self.count = count
+        self.page = page
+
+
+class Observer:
+    """Receives progress and timing events from a conversion.
+
+    Every hook does nothing by default; subclass and override the ones you
+    need. Phases are 'parse' (reading each page from the file), 'extract'
+    (building a page's vertices and edges), 'vertices', 'edges', 'text'
+    (label layout, nested inside vertices and edges), 'render' (a page's
+    markup when rendered on workers, timed as the wait for it) and 'save'.
+    """
+
+    def conversion_started(self, input_file, output_file):
+        pass
+
+    def page_done(self, index, name, n_vertices, n_edges):
+        pass
+
+    def cells_culled(self, index, name, count):
+        """`count` vertices and edges of a page were left out as unseen."""
+        pass
+
+    def phase_done(self, stats):
+        pass
+
+    def conversion_finished(self, page_count):
+        pass
+
+    def output_updated(self, output_file, rendered, reused):
+        """An incremental update wrote `output_file` (see converter.incremental)."""
+        pass
+
+    def update_failed(self, error):
+        """An update while watching raised `error`; watching carries on."""
+        pass
+
+
+@contextlib.contextmanager
+def measure(observer, phase, count=0, page=None):
+    """Time the enclosed block and report it to observer.phase_done().
+
+    Yields the PhaseStats, whose count and page may be changed in the block.
+    """
+    stats = PhaseStats(phase, 0.0, 0.0, 0, count, page)
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    blocks = sys.getallocatedblocks()
+    try:
+        yield stats
+    finally:
+        stats.wall = time.perf_counter() - wall
+        stats.cpu = time.process_time() - cpu
+        stats.blocks = sys.getallocatedblocks() - blocks
+        observer.phase_done(stats)
+
+
+def measured(observer, phase, count=0, page=None):
+    """measure() when there is an observer, otherwise a no-op context."""
+    if observer is None:
+        return contextlib.nullcontext()
+    return measure(observer, phase, count, page)
+
+
+class PrintObserver(Observer):
+    """Prints progress to stdout (or `file`), as the command line tool does."""
+
+    def __init__(self, file=None):
+        self.file = file
+
+    def conversion_started(self, input_file, output_file):
+        print(f"Parsing {input_file}...", file=self.file)
+        print(f"Generating {output_file}...", file=self.file)
+
+    def page_done(self, index, name, n_vertices, n_edges):
+        print(f"  Processing page '{name}': {n_vertices} shapes, {n_edges} connections",
+              file=self.file)
+
+    def cells_culled(self, index, name, count):
+        print(f"    Left out {count} hidden or unseen cells", file=self.file)
+
+    def conversion_finished(self, page_count):
+        print(f"Found {page_count} pages.", file=self.file)
+        print("Done.", file=self.file)
+
+    def output_updated(self, output_file, rendered, reused):
+        print(f"Updated {output_file}: {rendered} pages rendered, {reused} unchanged.",
+              file=self.file)
+
+    def update_failed(self, error):
+        print(f"Error: {error}", file=self.file)
+
+
+class ProfileObserver(Observer):
+    """Collects phase timings into a JSON-friendly report.
+
+    Events are passed on to `inner`, if given, so progress can still be
+    printed while profiling.
+    """
+
+    def __init__(self, inner=None):
+        self.inner = inner
+        self.input_file = None
+        self.output_file = None
+        self.started = None
+        self.wall = None
+        self.phases = {}
+        self.pages = []
+        self.peak_rss = None
+
+    def conversion_started(self, input_file, output_file):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.started = time.perf_counter()
+        if self.inner:
+            self.inner.conversion_started(input_file, output_file)
+
+    def page_done(self, index, name, n_vertices, n_edges):
+        self._page(index)['name'] = name
+        self._page(index).update(vertices=n_vertices, edges=n_edges)
+        if self.inner:
+            self.inner.page_done(index, name, n_vertices, n_edges)
+
+    def cells_culled(self, index, name, count):
+        self._page(index)['culled'] = count
+        if self.inner:
+            self.inner.cells_culled(index, name, count)
+
+    def phase_done(self, stats):
+        self._add(self.phases, stats)
+        if stats.page is not None and stats.phase != 'text':
+            self._add(self._page(stats.page).setdefault('phases', {}), stats)
+        if self.inner:
+            self.inner.phase_done(stats)
+
+    def conversion_finished(self, page_count):
+        self.wall = time.perf_counter() - self.started
+        self.peak_rss = peak_rss()
+        if self.inner:
+            self.inner.conversion_finished(page_count)
+
+    def output_updated(self, output_file, rendered, reused):
+        if self.inner:
+            self.inner.output_updated(output_file, rendered, reused)
+
+    def update_failed(self, error):
+        if self.inner:
+            self.inner.update_failed(error)
+
+    def report(self):
+        return {
+            'input_file': self.input_file,
+            'output_file': self.output_file,
+            'wall': self.wall,
+            'peak_rss': self.peak_rss,
+            'phases': self.phases,
+            'pages': self.pages,
+        }
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+            f.write('\n')
+
+    def _page(self, index):
+        while len(self.pages) <= index:
+            self.pages.append({'index': len(self.pages)})
+        return self.pages[index]
+
+    @staticmethod
+    def _add(phases, stats):
+        entry = phases.get(stats.phase)
+        if entry is None:
+            entry = phases[stats.phase] = {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'blocks': 0, 'count': 0}
+        entry['calls'] += 1
+        entry['wall'] += stats.wall
+        entry['cpu'] += stats.cpu
+        entry['blocks'] += stats.blocks
+        entry['count'] += stats.count
+
+
+class StackSampler:
+    """Samples the calling thread's stack into collapsed stacks for flame graphs.
+
+    The output has one "outer;inner;leaf count" line per distinct stack, as
+    read by flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._target = None
+
+    def __enter__(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextlib.contextmanager
+def profiled(path):
+    """Profile the enclosed block into `path`.
+
+    A path ending in .prof gets cProfile stats (for pstats or snakeviz);
+    anything else gets sampled collapsed stacks.
+    """
+    if path.endswith('.prof'):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+    else:
+        sampler = StackSampler()
+        try:
+            with sampler:
+                yield
+        finally:
+            sampler.write(path)
@@ -0,0 +1,42 @@
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .bulk import render_page_markup
+
+
+def free_threaded():
+    """True on a free-threaded CPython build running with the GIL disabled."""
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def render_pages(pages, workers, threads=None):
+    """Render pages to slide markup on a pool, yielding results in page order.
+
+    Yields (page, markup, images, vertex_count, edge_count, culled_count).
+    Pages are pulled from the iterator lazily and at most `workers * 2` are
+    in flight, so the streaming parser's memory bound still holds. `threads` picks a thread
+    pool instead of processes; by default threads are used only when the
+    interpreter runs without the GIL.
+    """
+    if threads is None:
+        threads = free_threaded()
+    executor_cls = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    window = max(1, workers) * 2
+
+    with executor_cls(max_workers=workers) as executor:
+        pending = deque()
+        for page in pages:
+            pending.append((page, executor.submit(render_page_markup, page)))
+            if len(pending) >= window:
+                page, future = pending.popleft()
+                yield (page, *future.result())
+        while pending:
+            page, future = pending.popleft()
+            yield (page, *future.result())
@@ -1,52 +1,343 @@
+import base64
+import contextlib
+import hashlib
+import io
+import mmap
+import re
+import urllib.parse
 import xml.etree.ElementTree as ET
-from .utils import parse_style_string
+import zlib
+from collections import deque
+from functools import cached_property
 
-class DrawioParser:
-    def __init__(self, file_path):
-        self.file_path = file_path
-        self.root = None
-        
-    def parse(self):
+from .cull import cull_cells
+from .model import Vertex, Edge
+from .styles import compile_style
+
+
+# Upper bound on the inflated size of one compressed page. A few MB of
+# deflate data can expand to gigabytes, which would take down a web worker.
+MAX_INFLATED_SIZE = 256 * 1024 * 1024
+
+# A <diagram> start tag; attribute values may hold '>'
+_DIAGRAM_TAG = re.compile(rb'<diagram((?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|\'[^\']*\'))*)\s*(/?)>')
+_DIAGRAM_END = re.compile(rb'</diagram\s*>')
+_NOT_SPACE = re.compile(rb'\S')
+# Encodings whose bytes the directory scan can search directly
+_XML_ENCODING = re.compile(rb'\s*<\?xml[^>]*?encoding\s*=\s*["\']([-\w.]+)')
+_ASCII_ENCODINGS = {b'utf-8', b'utf8', b'us-ascii', b'ascii'}
+# A page selection item that is a number or a range of numbers
+_PAGE_RANGE = re.compile(r'(\d*)\s*-\s*(\d*)')
+
+
+def _inflate(data, wbits, max_size):
+    inflater = zlib.decompressobj(wbits)
+    xml = inflater.decompress(data, max_size + 1)
+    if len(xml) > max_size:
+        raise ValueError(f"page inflates to more than {max_size} bytes")
+    if not inflater.eof:
+        raise zlib.error("incomplete or truncated stream")
+    return xml
+
+
+def decode_diagram(text, max_size=MAX_INFLATED_SIZE):
+    """Inflate a compressed <diagram> payload into its mxGraphModel element.
+
+    Draw.io stores compressed pages as base64(deflateRaw(encodeURIComponent(xml))).
+    """
+    try:
+        data = base64.b64decode(text.strip())
         try:
-            tree = ET.parse(self.file_path)
-        except Exception as e:
-            raise ValueError(f"Error parsing XML: {e}")
+            xml = _inflate(data, -zlib.MAX_WBITS, max_size)
+        except zlib.error:
+            # Some exporters write a zlib header
+            xml = _inflate(data, zlib.MAX_WBITS, max_size)
+        xml = urllib.parse.unquote(xml.decode('utf-8'))
+        return ET.fromstring(xml)
+    except (ValueError, zlib.error, ET.ParseError) as e:
+        raise ValueError(f"Error decoding compressed diagram: {e}")
 
-        self.root = tree.getroot()
-        
-        pages = []
-        
-        # Draw.io structure: mxfile -> diagram
-        diagrams = self.root.findall('diagram')
-        
-        if not diagrams:
-            # Fallback for single page or raw model without diagram tag
-            graph_model = self.root.find('mxGraphModel') or self.root.find('.//mxGraphModel')
-            if graph_model is not None:
-                pages.append({
-                    'name': 'Page-1',
-                    'data': self._extract_elements(graph_model)
-                })
+
+class Page:
+    """A single diagram page whose elements are extracted on first access.
+
+    Compressed payloads are kept as text until `data` is read, so pages the
+    caller never touches are never inflated, and the result is memoized.
+    """
+    def __init__(self, parser, name, source, compressed=False, id=None):
+        self.name = name
+        self.id = id
+        # Vertices and edges left out as unseen, once `data` has been read
+        self.culled = 0
+        self.compressed = compressed
+        self._parser = parser
+        self._source = source
+
+    @cached_property
+    def fingerprint(self):
+        """Hash of the page name and model, to tell whether a page changed.
+
+        Must be read before `data`, which releases the source it hashes.
+        """
+        if self._source is None:
+            raise ValueError(f"Page '{self.name}' has already been extracted")
+        source = self._source if self.compressed else ET.tostring(self._source, encoding='unicode')
+        digest = hashlib.sha256(self.name.encode('utf-8'))
+        digest.update(b'\0' + source.encode('utf-8'))
+        return digest.hexdigest()
+
+    @cached_property
+    def data(self):
+        graph_model = decode_diagram(self._source) if self.compressed else self._source
+        vertices, edges, self.culled = self._parser._extract_elements(graph_model)
+        data = vertices, edges
+        # Only drop the source once it has been used, so a failed decode
+        # raises the same error again on the next access
+        self._source = None
+        return data
+
+
+class PageEntry:
+    """A page in the page directory: where its <diagram> sits in the file.
+
+    `number` counts from 1 in document order. `offset` and `end` are byte
+    positions of the <diagram> element, or None when the file could not
+    be scanned (a raw model without <diagram> tags, or a file in an
+    encoding other than UTF-8).
+    """
+    __slots__ = ('number', 'name', 'id', 'offset', 'end', 'compressed')
+
+    def __init__(self, number, name, id, offset, end, compressed):
+        self.number = number
+        self.name = name
+        self.id = id
+        self.offset = offset
+        self.end = end
+        self.compressed = compressed
+
+    def __repr__(self):
+        return f"PageEntry({self.number}, {self.name!r}, offset={self.offset})"
+
+
+def select_pages(entries, pages):
+    """The directory entries picked by a page selection, in document order.
+
+    `pages` is a comma-separated string or a list of page names, page
+    numbers (from 1) and ranges such as '2-4', '3-' or '-2'. A name is
+    matched before a number, so a page called '2' is picked by its name.
+    """
+    if isinstance(pages, (str, int)):
+        pages = str(pages).split(',')
+    by_name = {}
+    for entry in entries:
+        by_name.setdefault(entry.name, []).append(entry)
+    count = len(entries)
+    chosen = set()
+    for item in pages:
+        item = str(item).strip()
+        if item in by_name:
+            chosen.update(entry.number for entry in by_name[item])
+            continue
+        if item.isdigit():
+            first = last = int(item)
         else:
-            for diagram in diagrams:
-                name = diagram.get('name', 'Page')
-                graph_model = diagram.find('mxGraphModel')
-                # TODO: Add decompression logic here if graph_model is missing but text content exists
+            m = _PAGE_RANGE.fullmatch(item)
+            if m is None or not (m.group(1) or m.group(2)):
+                raise ValueError(f"No page named '{item}'")
+            first = int(m.group(1) or 1)
+            last = int(m.group(2) or count)
+        if not 1 <= first <= last <= count:
+            raise ValueError(f"Page '{item}' is out of range; the file has pages 1-{count}")
+        chosen.update(range(first, last + 1))
+    if not chosen:
+        raise ValueError("No pages selected")
+    return [entry for entry in entries if entry.number in chosen]
+
+
+class DrawioParser:
+    """Reads the pages of a Draw.io document.
+
+    `source` is a path, the document's bytes, or a binary file object.
+    File objects are read from their current position; one that can't
+    seek is read into memory first, as the document may be read twice.
+
+    Cells that would not be seen are left out of the pages (see
+    converter.cull). `layers` keeps only the layers with those names or
+    ids, and `bounds` (left, top, right, bottom in px) drops shapes
+    lying wholly outside it.
+    """
+
+    def __init__(self, source, layers=None, bounds=None):
+        self.layers = layers
+        self.bounds = bounds
+        self._start = None
+        if hasattr(source, 'read'):
+            if source.seekable():
+                self._start = source.tell()
+            else:
+                source = source.read()
+        self.file_path = source
+
+    def __getstate__(self):
+        # Pages sent to worker processes carry their parser, which only
+        # needs to extract them, not the whole document
+        return dict(self.__dict__, file_path=None)
+
+    def parse(self, pages=None):
+        """Parse every page (or the selected ones) eagerly and return them as a list."""
+        return list(self.iter_pages(pages))
+
+    def iter_pages(self, pages=None):
+        """Yield pages one at a time using incremental parsing.
+
+        Each <diagram> subtree is detached from the document as soon as its
+        page has been read, so peak memory is bounded by the largest page
+        rather than by the whole document.
+
+        `pages` selects pages as select_pages() does. The selected ones are
+        then read straight from their place in the file, and the others are
+        never parsed at all.
+        """
+        if pages is not None:
+            yield from self._iter_selected(select_pages(self.directory(), pages))
+            return
+
+        root = None
+        seen_diagram = False
+        found = False
+
+        for event, elem in self._iter_events():
+            if event == 'start':
+                if root is None:
+                    root = elem
+                continue
+
+            if elem.tag == 'diagram':
+                page = self._make_page(elem)
+                # Drop the consumed subtree before handing the page out
+                elem.clear()
+                if root is not None and elem in root:
+                    root.remove(elem)
+                seen_diagram = True
+                if page is not None:
+                    found = True
+                    yield page
+
+            elif elem is root and not seen_diagram:
+                # Fallback for single page or raw model without diagram tag
+                if root.tag == 'mxGraphModel':
+                    graph_model = root
+                else:
+                    graph_model = root.find('mxGraphModel')
+                    if graph_model is None:
+                        graph_model = root.find('.//mxGraphModel')
                 if graph_model is not None:
-                    pages.append({
-                        'name': name,
-                        'data': self._extract_elements(graph_model)
-                    })
-            
-        if not pages:
+                    found = True
+                    yield Page(self, 'Page-1', graph_model)
+
+        if not found:
             raise ValueError("Could not find any mxGraphModel")
-            
-        return pages
+
+    def directory(self):
+        """List the pages in the file as PageEntry objects, without parsing them.
+
+        One pass over the raw bytes finds each <diagram> tag and the end
+        of its element; nothing inside a page is parsed or inflated.
+        """
+        with self._buffer() as data:
+            entries = _scan_directory(data)
+        if entries is None:
+            # Can't search the bytes: read the tags with the XML parser
+            entries = [PageEntry(number, page.name, page.id, None, None, page.compressed)
+                       for number, page in enumerate(self.iter_pages(), 1)]
+        return entries
+
+    def _iter_selected(self, entries):
+        if any(entry.offset is None for entry in entries):
+            wanted = {entry.number for entry in entries}
+            for number, page in enumerate(self.iter_pages(), 1):
+                if number in wanted:
+                    yield page
+            return
+        with self._buffer() as data:
+            for entry in entries:
+                try:
+                    diagram = ET.fromstring(data[entry.offset:entry.end])
+                except ET.ParseError as e:
+                    raise ValueError(f"Error parsing XML: {e}")
+                yield self._make_page(diagram)
+
+    @contextlib.contextmanager
+    def _buffer(self):
+        """The whole document as a bytes-like object; files are mapped, not read."""
+        source = self.file_path
+        if isinstance(source, (bytes, bytearray)):
+            yield source
+        elif isinstance(source, memoryview):
+            yield source.tobytes()
+        elif self._start is not None:
+            source.seek(self._start)
+            yield source.read()
+        else:
+            try:
+                f = open(source, 'rb')
+            except OSError as e:
+                raise ValueError(f"Error parsing XML: {e}")
+            with f:
+                try:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # Empty file
+                    yield b''
+                    return
+                with data:
+                    yield data
+
+    def page_count(self, pages=None):
+        """Count the pages in the file (or the selected ones) without building any of them."""
+        if pages is not None:
+            return len(select_pages(self.directory(), pages))
+        count = 0
+        seen_diagram = False
+        for event, elem in self._iter_events():
+            if event == 'end':
+                if elem.tag == 'diagram':
+                    seen_diagram = True
+                    # Empty pages are skipped, as iter_pages() skips them
+                    if self._make_page(elem) is not None:
+                        count += 1
+                elem.clear()
+        # A file without <diagram> tags holds a single raw model
+        return count if seen_diagram else 1
+
+    def _make_page(self, diagram):
+        name = diagram.get('name', 'Page')
+        page_id = diagram.get('id')
+        graph_model = diagram.find('mxGraphModel')
+        if graph_model is not None:
+            return Page(self, name, graph_model, id=page_id)
+        # Compressed page: keep the payload text, inflate on demand
+        text = (diagram.text or '').strip()
+        if text:
+            return Page(self, name, text, compressed=True, id=page_id)
+        return None
+
+    def _iter_events(self):
+        source = self.file_path
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        elif self._start is not None:
+            source.seek(self._start)
+        try:
+            for event, elem in ET.iterparse(source, events=('start', 'end')):
+                yield event, elem
+        except (ET.ParseError, OSError) as e:
+            raise ValueError(f"Error parsing XML: {e}")
         
     def _extract_elements(self, graph_model):
         root_cell = graph_model.find('root')
         if root_cell is None:
-            return [], []
+            return [], [], 0
             
         cells = root_cell.findall('mxCell')
         
@@ -56,21 +347,98 @@ class DrawioParser:
         vertices = []
         edges = []
         
-        def get_abs_pos(cell_id):
-            """Recursively calculate absolute x, y."""
-            cell = cell_map.get(cell_id)
-            if cell is None:
-                return 0, 0
+        geometries = {c.get('id'): c.find('mxGeometry') for c in cells}
+        abs_pos = self._resolve_positions(cells, cell_map, geometries)
+        dropped, terminals = cull_cells(cells, cell_map, geometries, abs_pos,
+                                        self.layers, self.bounds)
+        culled = 0
+
+        for cell in cells:
+            attrib = cell.attrib
+            cell_id = attrib.get('id')
+            if cell_id in dropped:
+                if attrib.get('vertex') == '1' or attrib.get('edge') == '1':
+                    culled += 1
+                continue
+            geo = geometries[cell_id]
+            style_str = attrib.get('style', '')
             
-            parent_id = cell.get('parent')
-            px, py = 0, 0
-            if parent_id and parent_id in cell_map:
-                # We skip the '0' and '1' root/layer cells which usually have no geometry
-                parent_cell = cell_map[parent_id]
-                if parent_cell.get('vertex') == '1':
-                    px, py = get_abs_pos(parent_id)
+            if attrib.get('vertex') == '1':
+                if geo is not None:
+                    # Calculate absolute position
+                    ax, ay = abs_pos[cell_id]
+                    vertices.append(Vertex(
+                        cell_id, attrib.get('value', ''),
+                        compile_style(style_str), style_str,
+                        attrib.get('parent'), ax, ay,
+                        float(geo.get('width', 0)), float(geo.get('height', 0)),
+                    ))
             
-            geo = cell.find('mxGeometry')
+            elif attrib.get('edge') == '1':
+                edge = Edge(
+                    cell_id, attrib.get('value', ''),
+                    compile_style(style_str), style_str,
+                    attrib.get('parent'), terminals.get(attrib.get('source'), attrib.get('source')),
+                    terminals.get(attrib.get('target'), attrib.get('target')),
+                )
+                if geo is not None:
+                    # Waypoints are relative to a container parent
+                    parent = cell_map.get(edge.parent_id)
+                    origin = (abs_pos[edge.parent_id]
+                              if parent is not None and parent.get('vertex') == '1' else (0, 0))
+                    self._read_edge_geometry(edge, geo, origin)
+                edges.append(edge)
+                
+        return vertices, edges, culled
+
+    def _read_edge_geometry(self, edge, geo, origin):
+        """Pull label placement and waypoints out of an edge's mxGeometry as plain numbers."""
+        if geo.get('relative') == '1':
+            try:
+                # x is relative position: -1=source, 0=mid, 1=target
+                edge.label_position = (float(geo.get('x', 0)) + 1) / 2
+            except ValueError:
+                pass
+            try:
+                edge.label_offset = float(geo.get('y', 0))
+            except ValueError:
+                pass
+
+        # The label offset is the mxPoint with as="offset", wherever it sits.
+        # Edges drawn in Draw.io usually list sourcePoint/targetPoint first,
+        # and only checking the first point missed their offsets.
+        for point in geo.iterfind('mxPoint'):
+            if point.get('as') == 'offset':
+                try:
+                    edge.label_dx = float(point.get('x', 0))
+                    edge.label_dy = float(point.get('y', 0))
+                except ValueError:
+                    pass
+                break
+
+        for array in geo.iterfind('Array'):
+            if array.get('as') == 'points':
+                ox, oy = origin
+                try:
+                    edge.points = tuple((ox + float(point.get('x', 0)), oy + float(point.get('y', 0)))
+                                        for point in array.iterfind('mxPoint'))
+                except ValueError:
+                    pass
+                break
+
+    def _resolve_positions(self, cells, cell_map, geometries):
+        """Calculate the absolute x, y of every cell in a single pass.
+
+        Cells are visited parent-before-child over the container tree, so
+        each origin is computed once and reused by all of its descendants.
+        """
+        offsets = {}
+        children = {}
+        pending = deque()
+        for cell in cells:
+            cell_id = cell.get('id')
+            x, y = 0, 0
+            geo = geometries[cell_id]
             if geo is not None:
                 try:
                     # For vertices, x and y are absolute or relative to parent
@@ -78,40 +446,74 @@ class DrawioParser:
                     # We only care about vertex positioning here
                     x = float(geo.get('x', 0))
                     y = float(geo.get('y', 0))
-                    return px + x, py + y
                 except ValueError:
-                    pass
-            return px, py
+                    x, y = 0, 0
+            offsets[cell_id] = (x, y)
 
-        for cell in cells:
-            attrib = cell.attrib
-            cell_id = attrib.get('id')
-            
-            cell_data = {
-                'id': cell_id,
-                'value': attrib.get('value', ''),
-                'style_str': attrib.get('style', ''),
-                'style': parse_style_string(attrib.get('style', '')),
-                'geometry': cell.find('mxGeometry'),
-                'vertex': attrib.get('vertex') == '1',
-                'edge': attrib.get('edge') == '1',
-                'source': attrib.get('source'),
-                'target': attrib.get('target'),
-                'parent_id': attrib.get('parent')
-            }
-            
-            if cell_data['vertex']:
-                geo = cell_data['geometry']
-                if geo is not None:
-                    # Calculate absolute position
-                    ax, ay = get_abs_pos(cell_id)
-                    cell_data['x'] = ax
-                    cell_data['y'] = ay
-                    cell_data['width'] = float(geo.get('width', 0))
-                    cell_data['height'] = float(geo.get('height', 0))
-                    vertices.append(cell_data)
-            
-            elif cell_data['edge']:
-                edges.append(cell_data)
-                
-        return vertices, edges
+            # We skip the '0' and '1' root/layer cells which usually have no geometry
+            parent_id = cell.get('parent')
+            parent_cell = cell_map.get(parent_id) if parent_id else None
+            if parent_cell is not None and parent_cell.get('vertex') == '1':
+                children.setdefault(parent_id, []).append(cell_id)
+            else:
+                pending.append((cell_id, 0, 0))
+
+        positions = {}
+        while pending:
+            cell_id, px, py = pending.popleft()
+            if cell_id in positions:
+                continue
+            x, y = offsets[cell_id]
+            ax, ay = px + x, py + y
+            positions[cell_id] = (ax, ay)
+            for child_id in children.get(cell_id, ()):
+                pending.append((child_id, ax, ay))
+
+        # Cells caught in a parent cycle are never reached from a root
+        for cell_id, offset in offsets.items():
+            positions.setdefault(cell_id, offset)
+
+        return positions
+
+
+def _scan_directory(data):
+    """Page entries found by searching the raw bytes, or None if they can't be.
+
+    Empty <diagram> elements are left out, as iter_pages() skips them. A
+    file without any <diagram> tag is a single raw model.
+    """
+    head = bytes(data[:256])
+    if head.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return None
+    m = _XML_ENCODING.match(head)
+    if m is not None and m.group(1).lower() not in _ASCII_ENCODINGS:
+        return None
+
+    entries = []
+    found = False
+    pos = 0
+    while True:
+        m = _DIAGRAM_TAG.search(data, pos)
+        if m is None:
+            break
+        found = True
+        pos = m.end()
+        if m.group(2):
+            continue
+        close = _DIAGRAM_END.search(data, pos)
+        if close is None:
+            raise ValueError(f"Error parsing XML: <diagram> at byte {m.start()} is not closed")
+        end = close.end()
+        first = _NOT_SPACE.search(data, pos, close.start())
+        if first is not None:
+            # The tag alone, closed, gives the attributes as the XML parser reads them
+            try:
+                tag = ET.fromstring(m.group(0)[:-1] + b'/>')
+            except ET.ParseError as e:
+                raise ValueError(f"Error parsing XML: {e}")
+            entries.append(PageEntry(len(entries) + 1, tag.get('name', 'Page'), tag.get('id'),
+                                     m.start(), end, data[first.start()] != ord('<')))
+        pos = end
+    if not found:
+        return [PageEntry(1, 'Page-1', None, None, None, False)]
+    return entries
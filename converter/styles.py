@@ -0,0 +1,158 @@
+from dataclasses import dataclass
+from functools import lru_cache
+
+from pptx.util import Pt
+
+from .ppt_map import (get_shape_type, get_line_dash, get_arrow_type, get_arrow_size,
+                      get_connector_type)
+from .geometry import ratio_side
+from .media import style_image
+from .utils import hex_to_rgb, parse_style_string
+
+# Marker for colors explicitly set to "none" (no fill / no line)
+NO_COLOR = 'none'
+
+STYLE_CACHE_SIZE = 4096
+
+MAX_LINE_WIDTH = 20116800
+# Font sizes are stored in centipoints
+MIN_FONT_SIZE = 100
+MAX_FONT_SIZE = 400000
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class CompiledStyle:
+    """A style string parsed once and resolved to python-pptx values.
+
+    Colors are RGBColor, NO_COLOR, or None when the value should be left
+    untouched. Widths are Length values or None. exit_side and entry_side
+    are the connection sides pinned by exitX/exitY and entryX/entryY, if
+    any (see converter.geometry). `image` is the
+    EmbeddedImage drawn instead of a shape, if any; `attrs` keeps only the
+    media type of an embedded image, not its data.
+    """
+    style_str: str
+    attrs: dict
+    shape_type: object
+    fill_color: object
+    stroke_color: object
+    stroke_width: object
+    line_color: object
+    line_width: object
+    dash_style: object
+    start_arrow: str
+    end_arrow: str
+    start_size: tuple
+    end_size: tuple
+    connector_type: object
+    exit_side: object
+    entry_side: object
+    font_color: object
+    font_size: object
+    image: object
+
+    def __reduce__(self):
+        # Rebuild through the cache; python-pptx values don't pickle cleanly
+        return (compile_style, (self.style_str,))
+
+    def get(self, key, default=None):
+        return self.attrs.get(key, default)
+
+    def __contains__(self, key):
+        return key in self.attrs
+
+
+def _color(value):
+    if value == NO_COLOR:
+        return NO_COLOR
+    if isinstance(value, str):
+        return hex_to_rgb(value)
+    return None
+
+
+def _font_color(value):
+    if not value:
+        return hex_to_rgb('#000000')
+    return hex_to_rgb(value) if isinstance(value, str) else None
+
+
+def _width(value):
+    try:
+        width = Pt(float(value))
+    except (TypeError, ValueError):
+        return None
+    # Same range python-pptx accepts for a:ln/@w
+    if 0 <= width <= MAX_LINE_WIDTH:
+        return width
+    return None
+
+
+def font_size(value):
+    """Parse a point size into a Length, or None if PowerPoint would reject it."""
+    try:
+        size = Pt(float(value))
+    except (TypeError, ValueError):
+        return None
+    if MIN_FONT_SIZE <= size.centipoints <= MAX_FONT_SIZE:
+        return size
+    return None
+
+
+def _without_image_data(style):
+    """Drop the base64 data of an embedded image from parsed style attributes.
+
+    The cache would otherwise keep a copy of every image beside the style
+    string; EmbeddedImage reads the data from the string instead.
+    """
+    image = style.get('image')
+    if isinstance(image, str) and image.startswith('data:'):
+        style['image'] = image.split(',', 1)[0]
+        # "data:image/png;base64,<data>" splits at the ';' into a flag
+        for key in [key for key in style if key.startswith('base64,')]:
+            del style[key]
+    return style
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def compile_style(style_str):
+    """Parse and resolve a Draw.io style string. Results are shared, do not mutate."""
+    style = _without_image_data(parse_style_string(style_str))
+
+    # Shapes: missing fill is white, missing stroke is black
+    fill = style.get('fillColor')
+    fill_color = _color(fill) if fill else hex_to_rgb('#FFFFFF')
+    stroke = style.get('strokeColor')
+    stroke_color = _color(stroke) if stroke else hex_to_rgb('#000000')
+    stroke_width = _width(style['strokeWidth']) if 'strokeWidth' in style else None
+
+    # Connectors: "none" or missing stroke falls back to black, width to 1pt
+    if stroke and stroke != NO_COLOR:
+        line_color = _color(stroke)
+    else:
+        line_color = hex_to_rgb('#000000')
+    line_width = stroke_width if 'strokeWidth' in style else Pt(1)
+
+    start_fill = style.get('startFill') != '0'
+    end_fill = style.get('endFill') != '0'
+
+    return CompiledStyle(
+        style_str=style_str,
+        attrs=style,
+        shape_type=get_shape_type(style),
+        fill_color=fill_color,
+        stroke_color=stroke_color,
+        stroke_width=stroke_width,
+        line_color=line_color,
+        line_width=line_width,
+        dash_style=get_line_dash(style),
+        start_arrow=get_arrow_type(style.get('startArrow', 'none'), fill=start_fill),
+        end_arrow=get_arrow_type(style.get('endArrow', 'none'), fill=end_fill),
+        start_size=get_arrow_size(style.get('startSize', '6')),
+        end_size=get_arrow_size(style.get('endSize', '6')),
+        connector_type=get_connector_type(style),
+        exit_side=ratio_side(style.get('exitX'), style.get('exitY')),
+        entry_side=ratio_side(style.get('entryX'), style.get('entryY')),
+        font_color=_font_color(style.get('fontColor')),
+        font_size=font_size(style['fontSize']) if 'fontSize' in style else None,
+        image=style_image(style_str) if 'image' in style else None,
+    )
@@ -0,0 +1,58 @@
+import copy
+import io
+import threading
+
+from pptx import Presentation
+
+# Built-in templates: python-pptx's default package, or the same package
+# stripped down to the one blank layout the converter uses.
+TEMPLATES = ('default', 'minimal')
+
+BLANK_LAYOUT_NAME = 'Blank'
+BLANK_LAYOUT_INDEX = 6  # Position of "Blank" in the default template
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def load_template(name='default'):
+    """Return a fresh Presentation for a built-in template.
+
+    The template package is loaded once per process and each call gets a
+    deep copy of it, which is cheaper than parsing the package again.
+    """
+    if name not in TEMPLATES:
+        raise ValueError(f"Unknown template '{name}'")
+    with _lock:
+        prs = _cache.get(name)
+        if prs is None:
+            prs = _cache[name] = _build_template(name)
+    prs = copy.deepcopy(prs)
+    # Views cached on the original (prs.slides holds its sldIdLst element)
+    # are copied apart from the copied tree; let them be rebuilt from it
+    for view in ('slides', 'slide_masters'):
+        prs.__dict__.pop(view, None)
+    return prs
+
+
+def blank_layout(prs):
+    """The slide layout used for converted pages."""
+    layout = prs.slide_layouts.get_by_name(BLANK_LAYOUT_NAME)
+    if layout is None:
+        layout = prs.slide_layouts[BLANK_LAYOUT_INDEX]
+    return layout
+
+
+def _build_template(name):
+    prs = Presentation()
+    if name == 'minimal':
+        blank = blank_layout(prs)
+        for layout in list(prs.slide_layouts):
+            if layout is not blank:
+                prs.slide_layouts.remove(layout)
+        # Round-trip so parts no longer referenced are dropped
+        stream = io.BytesIO()
+        prs.save(stream)
+        stream.seek(0)
+        prs = Presentation(stream)
+    return prs
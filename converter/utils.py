@@ -2,11 +2,17 @@ from pptx.util import Inches, Pt, Emu
 from pptx.dml.color import RGBColor
 from pptx.oxml import parse_xml
 from pptx.oxml.ns import nsdecls
+import html
 import re
+from collections import namedtuple
+from functools import lru_cache
 
 def px_to_emu(px):
     return int(float(px) * 914400 / 96)
 
+def emu_to_px(emu):
+    return emu * 96 / 914400
+
 def hex_to_rgb(hex_color):
     if not hex_color or hex_color == 'none':
         return None
@@ -51,60 +57,184 @@ def set_line_end(line, head_type='none', tail_type='none', head_w='med', head_l=
     _set_end('headEnd', head_type, head_w, head_l)
     _set_end('tailEnd', tail_type, tail_w, tail_l)
 
+# Splits a label into alternating text and tag-like pieces
+_HTML_SPLIT = re.compile(r'(<!--.*?-->|<[^<>]*>)', re.S)
+# A tag: group 1 is "/" if closing, 2 the name, 3 the attributes
+_HTML_TAG = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)([^>]*)>$')
+_HTML_ATTR = re.compile(r'([a-zA-Z_:][-a-zA-Z0-9_:.]*)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))')
+_CSS_RGB = re.compile(r'rgba?\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)')
+_CSS_SIZE = re.compile(r'([\d.]+)\s*(px|pt)?$')
+
+# Tags that break the line instead of starting a new run
+_LINE_BREAK_TAGS = frozenset(('br',))
+_BLOCK_TAGS = frozenset(('div', 'p', 'li'))
+_VOID_TAGS = frozenset(('br', 'hr', 'img', 'wbr', 'input', 'meta', 'link'))
+_TAG_FORMAT = {
+    'b': ('bold', True), 'strong': ('bold', True),
+    'i': ('italic', True), 'em': ('italic', True),
+    'u': ('underline', True),
+}
+# <font size="1".."7"> in pixels, as browsers render them
+_FONT_TAG_SIZES = {'1': 10, '2': 13, '3': 16, '4': 18, '5': 24, '6': 32, '7': 48}
+
+LABEL_CACHE_SIZE = 4096
+
+
+class TextFormat(namedtuple('TextFormat', 'bold italic underline color size')):
+    """Formatting of a run of label text.
+
+    `color` is '#rrggbb' and `size` a point size string; None for either
+    means the style's font color or size applies.
+    """
+    __slots__ = ()
+
+
+PLAIN = TextFormat(False, False, False, None, None)
+
+
+def _css_color(value):
+    value = value.strip().lower()
+    m = _CSS_RGB.match(value)
+    if m:
+        r, g, b = (min(int(c), 255) for c in m.groups())
+        return f'#{r:02x}{g:02x}{b:02x}'
+    if value.startswith('#') and hex_to_rgb(value) is not None:
+        return value
+    return None
+
+
+def _css_size(value):
+    m = _CSS_SIZE.match(value.strip().lower())
+    return m.group(1) if m else None
+
+
+@lru_cache(maxsize=1024)
+def _tag_format(fmt, name, attrs):
+    """Apply a tag's own meaning and its attributes to the enclosing format."""
+    changes = {}
+    if name in _TAG_FORMAT:
+        key, value = _TAG_FORMAT[name]
+        changes[key] = value
+
+    for m in _HTML_ATTR.finditer(attrs):
+        attr = m.group(1).lower()
+        value = m.group(2) if m.group(2) is not None else m.group(3) if m.group(3) is not None else m.group(4)
+        if attr == 'style':
+            _apply_css(changes, value)
+        elif name == 'font' and attr == 'color':
+            color = _css_color(value)
+            if color:
+                changes['color'] = color
+        elif name == 'font' and attr == 'size':
+            size = _FONT_TAG_SIZES.get(value.strip())
+            if size:
+                changes['size'] = str(size)
+
+    return fmt._replace(**changes) if changes else fmt
+
+
+def _apply_css(changes, css):
+    for declaration in css.split(';'):
+        prop, sep, value = declaration.partition(':')
+        if not sep:
+            continue
+        prop = prop.strip().lower()
+        value = value.strip().lower()
+        if prop == 'color':
+            color = _css_color(value)
+            if color:
+                changes['color'] = color
+        elif prop == 'font-size':
+            size = _css_size(value)
+            if size:
+                changes['size'] = size
+        elif prop == 'font-weight':
+            changes['bold'] = value in ('bold', 'bolder') or (value.isdigit() and int(value) >= 600)
+        elif prop == 'font-style':
+            changes['italic'] = value in ('italic', 'oblique')
+        elif prop in ('text-decoration', 'text-decoration-line'):
+            changes['underline'] = 'underline' in value
+
+
+# What a tag does to the text: one of these kinds, with its name and attributes
+_TEXT, _IGNORE, _BREAK, _OPEN, _CLOSE = range(5)
+
+
+@lru_cache(maxsize=1024)
+def _classify_tag(tag):
+    if tag.startswith('<!--'):
+        return _IGNORE, None, None
+    m = _HTML_TAG.match(tag)
+    if m is None:
+        return _TEXT, None, None  # a stray "<", kept as text
+    name = m.group(2).lower()
+    if name in _LINE_BREAK_TAGS:
+        return _BREAK, name, None
+    if m.group(1):
+        return _CLOSE, name, None
+    if name in _VOID_TAGS or m.group(3).endswith('/'):
+        return (_BREAK if name in _BLOCK_TAGS else _IGNORE), name, None
+    return _OPEN, name, m.group(3)
+
+
+def _unescape(text):
+    return html.unescape(text) if '&' in text else text
+
+
+@lru_cache(maxsize=LABEL_CACHE_SIZE)
+def parse_html_label(html_text):
+    """Split an HTML label into a tuple of (text, TextFormat) segments.
+
+    A single pass over the label with a format stack, so closing a tag
+    restores the formatting from before it was opened. Line breaks and
+    block elements become newlines and entities are decoded. Labels repeat
+    a lot within a diagram, so results are memoized.
+    """
+    parts = _HTML_SPLIT.split(html_text)
+    segments = []
+    stack = []  # (tag name, format outside it)
+    fmt = PLAIN
+    buffer = [_unescape(parts[0])] if parts[0] else []
+
+    for i in range(1, len(parts), 2):
+        kind, name, attrs = _classify_tag(parts[i])
+        new_fmt = fmt
+        if kind == _TEXT:
+            buffer.append(_unescape(parts[i]))
+        elif kind == _BREAK:
+            buffer.append('\n')
+        elif kind != _IGNORE:
+            if name in _BLOCK_TAGS:
+                buffer.append('\n')
+            if kind == _OPEN:
+                stack.append((name, fmt))
+                new_fmt = _tag_format(fmt, name, attrs)
+            else:
+                for depth in range(len(stack) - 1, -1, -1):
+                    if stack[depth][0] == name:
+                        new_fmt = stack[depth][1]
+                        del stack[depth:]
+                        break
+
+        if new_fmt != fmt:
+            if buffer:
+                segments.append((''.join(buffer), fmt))
+                buffer = []
+            fmt = new_fmt
+        text = parts[i + 1]
+        if text:
+            buffer.append(_unescape(text))
+
+    if buffer:
+        segments.append((''.join(buffer), fmt))
+    return tuple(segments)
+
+
 class HtmlTextParser:
     def __init__(self, html_text):
         self.raw_text = html_text
-        
+
     def parse(self):
-        # normalize
-        text = self.raw_text.replace('<div>', '\n').replace('</div>', '\n').replace('<br>', '\n')
-        
-        # Strip outer containers if they are just spans/divs without style
-        # But we'll just split by any tag
-        parts = re.split(r'(</?[a-zA-Z0-9]+[^>]*>)', text)
-        
-        # Default state
-        current_format = {
-            'bold': False,
-            'italic': False,
-            'underline': False,
-            'color': '#000000', # Default to black
-            'size': None
-        }
-        
-        segments = []
-        for part in parts:
-            if not part: continue
-            if part.startswith('<'):
-                tag = part.lower()
-                if '<b>' in tag or 'font-weight: bold' in tag or 'font-weight:bold' in tag:
-                    current_format['bold'] = True
-                elif '</b>' in tag:
-                    current_format['bold'] = False
-                elif '<i>' in tag or 'font-style: italic' in tag:
-                    current_format['italic'] = True
-                elif '</i>' in tag:
-                    current_format['italic'] = False
-                elif '<u>' in tag:
-                    current_format['underline'] = True
-                elif '</u>' in tag:
-                    current_format['underline'] = False
-                elif tag.startswith('<font') or tag.startswith('<span'):
-                    # Extract color
-                    m = re.search(r'color[:=]\s*["\']?([^"\';\s>]+)["\']?', part, re.I)
-                    if m: current_format['color'] = m.group(1)
-                    # Extract size
-                    s = re.search(r'size[:=]\s*["\']?([^"\';\s>]+)["\']?', part, re.I)
-                    if s: current_format['size'] = s.group(1)
-                elif tag == '</font>' or tag == '</span>':
-                    # Resetting is hard without a stack, but Draw.io usually doesn't nest deeply
-                    # For now we'll just keep the last set color/size if nested
-                    pass
-            else:
-                segments.append({'text': part, 'format': current_format.copy()})
-        
-        if not segments and text:
-            # Fallback if no tags but text exists
-            segments.append({'text': text, 'format': current_format.copy()})
-            
-        return segments
\ No newline at end of file
+        """Segments as dicts of text and format, see parse_html_label()."""
+        return [{'text': text, 'format': fmt._asdict()}
+                for text, fmt in parse_html_label(self.raw_text)]
@@ -1,23 +1,182 @@
 import argparse
+import contextlib
+import json
 import sys
-from converter import convert, __version__
+from converter import convert, BACKENDS, TEMPLATES, __version__
+from converter.memory import peak_rss
+from converter.observe import PrintObserver, ProfileObserver, profiled
 
 def main():
     parser = argparse.ArgumentParser(description="Convert Draw.io XML to PowerPoint")
-    parser.add_argument("input_file", nargs='?', help="Path to input .drawio or .xml file")
-    parser.add_argument("output_file", nargs='?', help="Path to output .pptx file")
+    parser.add_argument("paths", nargs='*', metavar="input_file [output_file]",
+                        help="Input .drawio/.xml file and output .pptx file, or with "
+                             "--output-dir any number of files, directories and glob patterns")
+    parser.add_argument("--output-dir", "-o",
+                        help="Batch mode: convert every input into this directory")
+    parser.add_argument("--force", action="store_true",
+                        help="Batch mode: convert inputs even if their output is up to date")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Re-render only the pages that changed since the last run")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and update the output incrementally when the input changes")
+    parser.add_argument("--summary",
+                        help="Batch mode: write the JSON summary here instead of stdout")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="pptx",
+                        help="Slide emission backend ('bulk' is faster on large diagrams)")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Render pages (or in batch mode, files) in parallel on N workers")
+    parser.add_argument("--threads", action="store_true", default=None,
+                        help="Use threads instead of processes for --jobs (for free-threaded Python)")
+    parser.add_argument("--template", choices=TEMPLATES, default="default",
+                        help="Presentation template ('minimal' keeps only the blank layout)")
+    parser.add_argument("--pages", metavar="LIST",
+                        help="Convert only these pages: names, numbers from 1 and ranges, "
+                             "comma-separated (e.g. 'Overview,3-5')")
+    parser.add_argument("--list-pages", action="store_true",
+                        help="List the pages of each input file and exit")
+    parser.add_argument("--layers", metavar="LIST", type=lambda text: text.split(','),
+                        help="Convert only these layers, by name or id, comma-separated")
+    parser.add_argument("--crop", action="store_true",
+                        help="Leave out shapes lying wholly outside the slide")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="Write each slide out as soon as it is built to keep memory use low")
+    parser.add_argument("--max-memory", type=float, metavar="MB",
+                        help="Fail if memory use goes over MB megabytes (implies --low-memory)")
+    parser.add_argument("--profile", metavar="REPORT.json",
+                        help="Write per-phase wall/CPU time, allocations and counts as JSON")
+    parser.add_argument("--profile-dump", metavar="FILE",
+                        help="Also profile the run: cProfile stats if FILE ends in .prof, "
+                             "otherwise collapsed stacks for flame graphs")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run as a daemon that keeps the converter loaded and converts "
+                             "files sent by client.py")
+    parser.add_argument("--socket",
+                        help="Unix socket for --serve (default: $DRAWIO2PPTX_SOCKET, else one per user)")
     parser.add_argument("--version", action="version", version=f"Drawio2PPTX {__version__}")
     args = parser.parse_args()
 
-    if not args.input_file or not args.output_file:
+    if args.serve:
+        run_daemon(args)
+        return
+
+    if args.list_pages:
+        list_pages(args, parser)
+        return
+
+    if args.output_dir:
+        run_batch(args, parser)
+        return
+
+    if len(args.paths) != 2:
+        parser.print_help()
+        sys.exit(1)
+
+    if args.incremental or args.watch:
+        run_incremental(args)
+        return
+
+    observer = PrintObserver()
+    if args.profile:
+        observer = ProfileObserver(inner=observer)
+    try:
+        input_file, output_file = args.paths
+        with profiled(args.profile_dump) if args.profile_dump else contextlib.nullcontext():
+            convert(input_file, output_file, backend=args.backend,
+                    workers=args.jobs, threads=args.threads, template=args.template,
+                    observer=observer, low_memory=args.low_memory, max_memory=args.max_memory,
+                    pages=args.pages, layers=args.layers, crop=args.crop)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    peak = peak_rss()
+    if peak is not None:
+        print(f"Peak memory: {peak / (1024 * 1024):.0f} MB")
+    if args.profile:
+        observer.write(args.profile)
+        print(f"Profile written to {args.profile}")
+
+def run_daemon(args):
+    from client import default_socket_path
+    from converter.daemon import serve
+
+    path = args.socket or default_socket_path()
+    try:
+        serve(path, ready=lambda daemon: print(f"Listening on {path} (Ctrl+C to stop)...",
+                                                flush=True))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+def list_pages(args, parser):
+    from converter.parser import DrawioParser
+
+    if not args.paths:
         parser.print_help()
         sys.exit(1)
+    for input_file in args.paths:
+        try:
+            entries = DrawioParser(input_file).directory()
+        except Exception as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        if len(args.paths) > 1:
+            print(f"{input_file}:")
+        for entry in entries:
+            state = "compressed" if entry.compressed else "plain"
+            offset = "-" if entry.offset is None else entry.offset
+            print(f"{entry.number:4}  {entry.id or '-':20}  {state:10}  {offset!s:>10}  {entry.name}")
+
+def run_incremental(args):
+    from converter.incremental import IncrementalConverter
 
+    input_file, output_file = args.paths
     try:
-        convert(args.input_file, args.output_file)
+        converter = IncrementalConverter(input_file, output_file, backend=args.backend,
+                                         template=args.template, observer=PrintObserver(),
+                                         pages=args.pages, layers=args.layers, crop=args.crop)
+        if args.watch:
+            print(f"Watching {input_file} (Ctrl+C to stop)...")
+            converter.watch()
+        else:
+            rendered, reused = converter.update()
+            print(f"Done: {rendered} pages rendered, {reused} unchanged.")
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
 
+def run_batch(args, parser):
+    from converter.batch import BatchConverter
+
+    if not args.paths:
+        parser.print_help()
+        sys.exit(1)
+
+    batch = BatchConverter(args.output_dir, jobs=args.jobs, backend=args.backend,
+                           template=args.template, force=args.force, pages=args.pages,
+                           layers=args.layers, crop=args.crop)
+    try:
+        summary = batch.run(args.paths)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    for result in summary['files']:
+        if result['status'] == 'failed':
+            print(f"FAILED {result['input']}: {result['error']}", file=sys.stderr)
+    text = json.dumps(summary, indent=2)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"{summary['converted']} converted, {summary['skipped']} skipped, "
+              f"{summary['failed']} failed.")
+    else:
+        print(text)
+    if summary['failed']:
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
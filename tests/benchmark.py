@@ -0,0 +1,200 @@
+"""Phase-level benchmarks on synthetic diagrams.
+
+    python tests/benchmark.py                    # run, compare with the stored baseline
+    python tests/benchmark.py --update-baseline  # run and store the results as the baseline
+    python tests/benchmark.py --quick            # smaller scenarios, no baseline check
+
+Each scenario times DrawioParser.parse (including page extraction),
+add_vertices, add_edges and save separately, reports shapes per second and
+the peak traced memory, and fails if a phase got slower than the baseline by
+more than the tolerance. A scaling check then converts 100 to 20,000 shapes
+and fails if the cost per shape grows more than linearly.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from converter import BACKENDS  # noqa: E402
+from converter.parser import DrawioParser  # noqa: E402
+import synthetic  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'benchmark_baseline.json')
+PHASES = ('parse', 'add_vertices', 'add_edges', 'save')
+
+SCENARIOS = {
+    'flat-1k': dict(shapes=1000),
+    'flat-5k': dict(shapes=5000),
+    'nested-2k-depth8': dict(shapes=2000, depth=8),
+    'html-2k': dict(shapes=2000, html=2),
+    'pages-8x500-compressed': dict(shapes=500, pages=8, compressed=True),
+}
+QUICK_SCENARIOS = {
+    'flat-200': dict(shapes=200),
+    'nested-200-depth8': dict(shapes=200, depth=8),
+    'html-200-compressed': dict(shapes=200, html=2, pages=2, compressed=True),
+}
+SCALING_SIZES = (100, 1000, 5000, 20000)
+
+
+def run_phases(input_file, output_file, backend, trace=False):
+    """Convert once, returning seconds per phase (and peak bytes when tracing)."""
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    times = dict.fromkeys(PHASES, 0.0)
+
+    start = time.perf_counter()
+    pages = DrawioParser(input_file).parse()
+    data = [page.data for page in pages]
+    times['parse'] = time.perf_counter() - start
+
+    generator = BACKENDS[backend](output_file)
+    for vertices, edges in data:
+        generator.create_slide()
+        start = time.perf_counter()
+        generator.add_vertices(vertices)
+        times['add_vertices'] += time.perf_counter() - start
+        start = time.perf_counter()
+        generator.add_edges(edges)
+        times['add_edges'] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    generator.save()
+    times['save'] = time.perf_counter() - start
+
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    shapes = sum(len(v) for v, e in data)
+    return times, shapes, peak
+
+
+def best_of(input_file, output_file, backend, repeat):
+    best = None
+    for _ in range(repeat):
+        times, shapes, _ = run_phases(input_file, output_file, backend)
+        if best is None:
+            best = times
+        else:
+            best = {phase: min(best[phase], times[phase]) for phase in PHASES}
+    return best, shapes
+
+
+def bench_scenarios(scenarios, backend, repeat, memory, workdir):
+    results = {}
+    for name, params in scenarios.items():
+        input_file = synthetic.write(os.path.join(workdir, f'{name}.drawio'), **params)
+        output_file = os.path.join(workdir, f'{name}.pptx')
+        times, shapes = best_of(input_file, output_file, backend, repeat)
+        total = sum(times.values())
+        result = {phase: round(t, 4) for phase, t in times.items()}
+        result['total'] = round(total, 4)
+        result['shapes_per_second'] = round(shapes / total) if total else None
+        if memory:
+            _, _, peak = run_phases(input_file, output_file, backend, trace=True)
+            result['peak_mb'] = round(peak / 1024 / 1024, 1)
+        results[name] = result
+        print(f"{name:26s} " + ' '.join(f"{p}={result[p]:.3f}s" for p in PHASES)
+              + f"  {result['shapes_per_second']} shapes/s"
+              + (f"  peak {result['peak_mb']} MB" if memory else ''))
+    return results
+
+
+def check_scaling(backend, workdir, sizes=SCALING_SIZES, max_ratio=2.0):
+    """Fail if the cost per shape at the largest size is > max_ratio x the reference size."""
+    per_shape = {}
+    for n in sizes:
+        input_file = synthetic.write(os.path.join(workdir, f'scale-{n}.drawio'), shapes=n)
+        times, shapes = best_of(input_file, os.path.join(workdir, f'scale-{n}.pptx'), backend, 1)
+        per_shape[n] = sum(times.values()) / shapes
+        print(f"scale {n:6d} shapes: {per_shape[n] * 1e6:8.1f} us/shape")
+    # Below ~1000 shapes fixed costs dominate, so compare against that
+    reference = next((n for n in sizes if n >= 1000), sizes[0])
+    ratio = per_shape[sizes[-1]] / per_shape[reference]
+    ok = ratio <= max_ratio
+    print(f"{'PASS' if ok else 'FAIL'}: cost per shape grew {ratio:.2f}x "
+          f"from {reference} to {sizes[-1]} shapes (limit {max_ratio}x)")
+    return ok
+
+
+def compare(results, baseline, tolerance):
+    ok = True
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"  {name}: no baseline")
+            continue
+        for phase in PHASES + ('total',):
+            # Ignore tiny phases, where timer noise dominates
+            limit = max(base[phase] * (1 + tolerance), base[phase] + 0.02)
+            if result[phase] > limit:
+                ok = False
+                print(f"FAIL: {name} {phase} took {result[phase]:.3f}s, baseline {base[phase]:.3f}s")
+        if 'peak_mb' in result and 'peak_mb' in base:
+            if result['peak_mb'] > base['peak_mb'] * (1 + tolerance) + 1:
+                ok = False
+                print(f"FAIL: {name} peak memory {result['peak_mb']} MB, baseline {base['peak_mb']} MB")
+    if ok:
+        print(f"PASS: no phase slower or larger than the baseline by more than {tolerance:.0%}.")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark conversion phases")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="bulk",
+                        help="'pptx' is quadratic in shapes per slide, so the scaling check fails on it")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario; the best is kept")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed slowdown against the baseline (0.5 = 50%%)")
+    parser.add_argument("--quick", action="store_true", help="Small scenarios, no baseline or scaling check")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced-memory pass")
+    parser.add_argument("--no-scaling", action="store_true", help="Skip the linear scaling check")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as workdir:
+        scenarios = QUICK_SCENARIOS if args.quick else SCENARIOS
+        results = bench_scenarios(scenarios, args.backend, args.repeat, not args.no_memory, workdir)
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+
+        if args.update_baseline:
+            try:
+                with open(BASELINE_FILE, encoding='utf-8') as f:
+                    stored = json.load(f)
+            except FileNotFoundError:
+                stored = {}
+            stored[args.backend] = results
+            with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+                json.dump(stored, f, indent=2)
+                f.write('\n')
+            print(f"Baseline written to {BASELINE_FILE}")
+        elif not args.quick:
+            try:
+                with open(BASELINE_FILE, encoding='utf-8') as f:
+                    baseline = json.load(f).get(args.backend, {})
+            except FileNotFoundError:
+                baseline = {}
+            ok = compare(results, baseline, args.tolerance)
+
+        if not args.quick and not args.no_scaling:
+            ok = check_scaling(args.backend, workdir) and ok
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import base64
+import os
+import sys
+import urllib.parse
+import zlib
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def page_cells(n_vertices=6, n_edges=5, label='Node'):
+    """mxCell markup for a simple grid of boxes joined in a chain."""
+    cells = ['<mxCell id="0"/><mxCell id="1" parent="0"/>']
+    for i in range(n_vertices):
+        cells.append(
+            f'<mxCell id="v{i}" value="{label} {i}" style="rounded=1;fillColor=#dae8fc;" '
+            f'vertex="1" parent="1"><mxGeometry x="{(i % 5) * 150}" y="{(i // 5) * 100}" '
+            f'width="100" height="50" as="geometry"/></mxCell>')
+    for j in range(min(n_edges, max(n_vertices - 1, 0))):
+        cells.append(
+            f'<mxCell id="e{j}" value="{"Yes" if j % 2 else ""}" '
+            f'style="edgeStyle=orthogonalEdgeStyle;endArrow=block;" edge="1" parent="1" '
+            f'source="v{j}" target="v{j + 1}"><mxGeometry relative="1" as="geometry"/></mxCell>')
+    return ''.join(cells)
+
+
+def compress_model(model_xml):
+    """Encode a model the way Draw.io stores compressed pages."""
+    deflate = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    quoted = urllib.parse.quote(model_xml, safe='').encode('utf-8')
+    data = deflate.compress(quoted) + deflate.flush()
+    return base64.b64encode(data).decode('ascii')
+
+
+def drawio_xml(pages, compressed=False):
+    """Build an .mxfile from (name, cells) pairs."""
+    diagrams = []
+    for name, cells in pages:
+        model = f'<mxGraphModel><root>{cells}</root></mxGraphModel>'
+        body = compress_model(model) if compressed else model
+        diagrams.append(f'<diagram name="{name}">{body}</diagram>')
+    return '<mxfile>' + ''.join(diagrams) + '</mxfile>'
+
+
+@pytest.fixture
+def make_drawio(tmp_path):
+    def make(pages, compressed=False, name='diagram.drawio'):
+        path = tmp_path / name
+        path.write_text(drawio_xml(pages, compressed), encoding='utf-8')
+        return str(path)
+    return make
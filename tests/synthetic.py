@@ -0,0 +1,124 @@
+"""Synthetic Draw.io diagrams for benchmarks and tests.
+
+    python tests/synthetic.py out.drawio --shapes 5000 --edges 5000 --depth 3 --html 2 --pages 4 --compressed
+"""
+import argparse
+import base64
+import random
+import urllib.parse
+import zlib
+from xml.sax.saxutils import quoteattr
+
+STYLES = [
+    'rounded=1;whiteSpace=wrap;html=1;fillColor=#dae8fc;strokeColor=#6c8ebf;',
+    'rhombus;whiteSpace=wrap;html=1;fillColor=#fff2cc;strokeColor=#d6b656;',
+    'ellipse;whiteSpace=wrap;html=1;fillColor=#d5e8d4;strokeColor=#82b366;fontSize=14;',
+    'shape=cylinder;whiteSpace=wrap;html=1;fillColor=#f8cecc;strokeWidth=2;fontColor=#FF0000;',
+    'shape=cloud;whiteSpace=wrap;html=1;fillColor=none;strokeColor=#9673a6;',
+]
+EDGE_STYLES = [
+    'edgeStyle=orthogonalEdgeStyle;rounded=0;html=1;endArrow=block;',
+    'edgeStyle=elbowEdgeStyle;html=1;dashed=1;endArrow=open;endSize=3;',
+    'curved=1;html=1;startArrow=diamond;startSize=14;strokeColor=#ff0000;',
+    'html=1;exitX=1;exitY=0.5;entryX=0;entryY=0.5;strokeWidth=2;',
+]
+
+
+def label(i, html):
+    """A vertex label; `html` 0 is plain text, 1 simple markup, 2 rich markup."""
+    if html <= 0:
+        return f'Node {i}'
+    if html == 1:
+        return f'<b>Node</b> {i}'
+    return (f'<div><b>Node</b> <i>{i}</i></div><div><font color="#ff0000">red</font> and '
+            f'<span style="font-size:18px;color:#00ff00">big</span><br><u>under</u> &amp; more</div>')
+
+
+def page_cells(rng, shapes, edges, depth=1, html=0, prefix=''):
+    """mxCell markup for one page.
+
+    Vertices are laid out on a grid; with `depth` > 1 every run of `depth`
+    vertices is nested as a chain of containers.
+    """
+    depth = max(1, depth)
+    cells = ['<mxCell id="0"/>', '<mxCell id="1" parent="0"/>']
+    ids = []
+    for i in range(shapes):
+        level = i % depth
+        vid = f'{prefix}v{i}'
+        if level == 0:
+            parent = '1'
+            x, y = (i // depth % 60) * 160, (i // depth // 60) * 120
+            w, h = 120, 80
+        else:
+            parent = ids[-1]
+            x, y = 4, 4
+            w, h = max(10, 120 - 8 * level), max(10, 80 - 8 * level)
+        ids.append(vid)
+        cells.append(
+            f'<mxCell id="{vid}" value={quoteattr(label(i, html))} style="{STYLES[i % len(STYLES)]}" '
+            f'vertex="1" parent="{parent}"><mxGeometry x="{x}" y="{y}" width="{w}" height="{h}" '
+            f'as="geometry"/></mxCell>')
+    for j in range(edges if shapes > 1 else 0):
+        a = rng.randrange(shapes)
+        b = (a + rng.choice([1, depth, 60 * depth])) % shapes
+        if a == b:
+            b = (a + 1) % shapes
+        value = quoteattr(['', 'Yes', 'No', '<b>maybe</b>'][j % 4] if html else ['', 'Yes', 'No', ''][j % 4])
+        geometry = ('<mxGeometry relative="1" as="geometry"/>' if j % 3 else
+                    '<mxGeometry x="-0.5" y="10" relative="1" as="geometry">'
+                    '<mxPoint x="5" y="-7" as="offset"/></mxGeometry>')
+        cells.append(
+            f'<mxCell id="{prefix}e{j}" value={value} style="{EDGE_STYLES[j % len(EDGE_STYLES)]}" '
+            f'edge="1" parent="1" source="{ids[a]}" target="{ids[b]}">{geometry}</mxCell>')
+    return ''.join(cells)
+
+
+def compress(model_xml):
+    deflate = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    data = deflate.compress(urllib.parse.quote(model_xml, safe='').encode('utf-8')) + deflate.flush()
+    return base64.b64encode(data).decode('ascii')
+
+
+def generate(shapes=100, edges=None, depth=1, html=0, pages=1, compressed=False, seed=1):
+    """Return a complete .drawio document as a string.
+
+    Each page holds `shapes` vertices and `edges` edges (as many edges as
+    shapes by default).
+    """
+    rng = random.Random(seed)
+    if edges is None:
+        edges = shapes
+    diagrams = []
+    for p in range(pages):
+        model = (f'<mxGraphModel><root>{page_cells(rng, shapes, edges, depth, html)}'
+                 f'</root></mxGraphModel>')
+        body = compress(model) if compressed else model
+        diagrams.append(f'<diagram id="page{p}" name="Page-{p + 1}">{body}</diagram>')
+    return '<mxfile host="synthetic">' + ''.join(diagrams) + '</mxfile>'
+
+
+def write(path, **params):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(generate(**params))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic .drawio file")
+    parser.add_argument("output_file")
+    parser.add_argument("--shapes", type=int, default=100)
+    parser.add_argument("--edges", type=int, default=None)
+    parser.add_argument("--depth", type=int, default=1, help="Container nesting depth")
+    parser.add_argument("--html", type=int, default=0, choices=(0, 1, 2),
+                        help="Label complexity: plain, simple or rich HTML")
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--compressed", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    write(args.output_file, shapes=args.shapes, edges=args.edges, depth=args.depth,
+          html=args.html, pages=args.pages, compressed=args.compressed, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+
+from conftest import drawio_xml, page_cells
+from converter.batch import BatchConverter, find_inputs
+
+
+def make_tree(root):
+    (root / 'in' / 'sub').mkdir(parents=True)
+    (root / 'in' / 'a.drawio').write_text(drawio_xml([('A', page_cells())]))
+    (root / 'in' / 'sub' / 'b.xml').write_text(drawio_xml([('B', page_cells(3, 2))]))
+    (root / 'in' / 'bad.drawio').write_text('<broken')
+    (root / 'in' / 'notes.txt').write_text('ignored')
+    return root / 'in'
+
+
+def statuses(summary):
+    return {os.path.basename(r['input']): r['status'] for r in summary['files']}
+
+
+def test_find_inputs(tmp_path):
+    src = make_tree(tmp_path)
+    found = dict(find_inputs([str(src), str(src / 'sub' / '*.xml')]))
+    assert sorted(found.values()) == ['a.pptx', 'bad.pptx', os.path.join('sub', 'b.pptx')]
+
+
+def test_batch_skips_up_to_date_outputs(tmp_path):
+    src = make_tree(tmp_path)
+    out = tmp_path / 'out'
+
+    summary = BatchConverter(str(out), jobs=2).run([str(src)])
+    assert statuses(summary) == {'a.drawio': 'converted', 'b.xml': 'converted',
+                                 'bad.drawio': 'failed'}
+    assert (summary['converted'], summary['failed']) == (2, 1)
+    assert 'Error parsing XML' in [r for r in summary['files'] if r['status'] == 'failed'][0]['error']
+    assert (out / 'sub' / 'b.pptx').exists()
+
+    summary = BatchConverter(str(out)).run([str(src)])
+    assert statuses(summary)['a.drawio'] == 'skipped'
+    assert statuses(summary)['bad.drawio'] == 'failed'
+
+    # A touched but unchanged file is recognised by its hash
+    os.utime(src / 'a.drawio', (1, 1))
+    assert statuses(BatchConverter(str(out)).run([str(src)]))['a.drawio'] == 'skipped'
+
+    (src / 'a.drawio').write_text(drawio_xml([('A', page_cells(4, 3))]))
+    summary = BatchConverter(str(out)).run([str(src)])
+    assert statuses(summary)['a.drawio'] == 'converted'
+    assert statuses(summary)['b.xml'] == 'skipped'
+
+    # Different options or a missing output force a rebuild
+    assert statuses(BatchConverter(str(out), template='minimal').run([str(src)]))['b.xml'] == 'converted'
+    (out / 'sub' / 'b.pptx').unlink()
+    assert statuses(BatchConverter(str(out), template='minimal').run([str(src)]))['b.xml'] == 'converted'
+    assert statuses(BatchConverter(str(out), template='minimal', force=True).run([str(src)]))['a.drawio'] == 'converted'
+
+
+def test_colliding_output_names(tmp_path):
+    for folder in ('x', 'y'):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / 'same.drawio').write_text(drawio_xml([('A', page_cells())]))
+    summary = BatchConverter(str(tmp_path / 'out')).run([str(tmp_path / '*' / 'same.drawio')])
+    assert [r['status'] for r in summary['files']] == ['converted', 'failed']
+    assert 'collides' in summary['files'][1]['error']
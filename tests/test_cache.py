@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+
+import pytest
+
+from converter.cache import STALE_TMP_AGE, ResultCache
+
+
+def write(data):
+    def produce(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+    return produce
+
+
+def backdate(path, seconds, atime=None):
+    created = time.time() - seconds
+    os.utime(path, (atime if atime is not None else created, created))
+
+
+def test_key_depends_on_version(tmp_path):
+    a = ResultCache(str(tmp_path), '1.0')
+    b = ResultCache(str(tmp_path), '1.1')
+    assert a.key_for(b'x') == a.key_for(b'x')
+    assert a.key_for(b'x') != a.key_for(b'y')
+    assert a.key_for(b'x') != b.key_for(b'x')
+
+
+def test_single_flight(tmp_path):
+    cache = ResultCache(str(tmp_path), 'v')
+    calls = []
+    started = threading.Event()
+
+    def produce(path):
+        calls.append(path)
+        started.set()
+        time.sleep(0.2)
+        write(b'result')(path)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create('k', produce)))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [cache.path('k')] * 5
+    assert cache.get_or_create('k', produce) == cache.path('k')
+    assert len(calls) == 1
+
+
+def test_failure_is_shared_and_not_cached(tmp_path):
+    cache = ResultCache(str(tmp_path), 'v')
+
+    def fail(path):
+        raise ValueError('bad diagram')
+
+    with pytest.raises(ValueError):
+        cache.get_or_create('k', fail)
+    assert cache.get('k') is None
+    assert os.listdir(tmp_path) == []
+    assert cache.get_or_create('k', write(b'ok')) == cache.path('k')
+
+
+def test_expiry_counts_from_creation(tmp_path):
+    cache = ResultCache(str(tmp_path), 'v', max_age=60)
+    path = cache.get_or_create('k', write(b'x'))
+    backdate(path, 30)
+    # Serving an entry does not extend its life
+    assert cache.get('k') == path
+    assert time.time() - os.stat(path).st_mtime >= 29
+    backdate(path, 100, atime=time.time())
+    assert cache.get('k') is None
+    assert not os.path.exists(path)
+
+
+def test_lru_eviction_over_size(tmp_path):
+    cache = ResultCache(str(tmp_path), 'v', max_bytes=25)
+    for i, key in enumerate(['a', 'b']):
+        path = cache.get_or_create(key, write(b'x' * 10))
+        backdate(path, 10 - i)
+    cache.get('a')  # now the most recently used
+    cache.get_or_create('c', write(b'x' * 10))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+
+
+def test_new_entry_survives_even_when_too_big(tmp_path):
+    cache = ResultCache(str(tmp_path), 'v', max_bytes=5)
+    assert os.path.exists(cache.get_or_create('k', write(b'x' * 10)))
+
+
+def test_stale_temp_files_are_removed(tmp_path):
+    stale = tmp_path / 'k.pptx.1.tmp'
+    fresh = tmp_path / 'j.pptx.2.tmp'
+    stale.write_bytes(b'partial')
+    fresh.write_bytes(b'partial')
+    backdate(stale, STALE_TMP_AGE + 10)
+    ResultCache(str(tmp_path), 'v')
+    assert not stale.exists()
+    assert fresh.exists()
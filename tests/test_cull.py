@@ -0,0 +1,80 @@
+import pytest
+
+from converter import ProfileObserver, convert
+from converter.parser import DrawioParser
+
+
+def vertex(id_, parent='1', x=0, y=0, width=100, height=50, **attrs):
+    extra = ''.join(f' {name}="{value}"' for name, value in attrs.items())
+    return (f'<mxCell id="{id_}" value="{id_}" vertex="1" parent="{parent}"{extra}>'
+            f'<mxGeometry x="{x}" y="{y}" width="{width}" height="{height}" as="geometry"/></mxCell>')
+
+
+def edge(id_, source, target, parent='1'):
+    return (f'<mxCell id="{id_}" edge="1" parent="{parent}" source="{source}" target="{target}">'
+            f'<mxGeometry relative="1" as="geometry"/></mxCell>')
+
+
+LAYERED = (
+    '<mxCell id="0"/><mxCell id="1" parent="0"/>'
+    '<mxCell id="notes" value="Notes" parent="0" visible="0"/>'
+    '<mxCell id="extra" value="Extra" parent="0"/>'
+    + vertex('a') + vertex('b', x=200)
+    # Hidden through its layer, or its own flag, or its container's
+    + vertex('note', parent='notes') + vertex('hidden', visible='0')
+    + vertex('group', x=400, visible='0') + vertex('in_group', parent='group')
+    # A collapsed container keeps itself but not its contents
+    + vertex('folder', x=0, y=200, collapsed='1') + vertex('inside', parent='folder')
+    + vertex('deeper', parent='inside')
+    + vertex('dot', x=50, y=50, width=0, height=0)
+    + vertex('far', x=5000, y=5000)
+    + vertex('overlay', parent='extra', x=600)
+    + edge('ab', 'a', 'b') + edge('to_note', 'a', 'note') + edge('to_inside', 'a', 'deeper')
+    + edge('within', 'inside', 'deeper') + edge('to_dot', 'b', 'dot')
+    + edge('on_notes', 'a', 'b', parent='notes')
+)
+
+
+def page_data(make_drawio, **options):
+    [page] = DrawioParser(make_drawio([('Layers', LAYERED)]), **options).parse()
+    vertices, edges = page.data
+    return [v.id for v in vertices], {e.id: (e.source, e.target) for e in edges}, page.culled
+
+
+def test_unseen_cells_are_left_out(make_drawio):
+    vertices, edges, culled = page_data(make_drawio)
+    assert vertices == ['a', 'b', 'folder', 'far', 'overlay']
+    # Edges to folded cells go to their collapsed container instead
+    assert edges == {'ab': ('a', 'b'), 'to_inside': ('a', 'folder')}
+    assert culled == 7 + 4
+
+
+def test_layer_selection(make_drawio):
+    vertices, edges, _ = page_data(make_drawio, layers=['Extra'])
+    assert (vertices, edges) == (['overlay'], {})
+    # By id; the default layer has no name. Hidden layers stay hidden.
+    vertices, _, _ = page_data(make_drawio, layers=['1', 'Notes'])
+    assert vertices == ['a', 'b', 'folder', 'far']
+
+
+def test_bounds(make_drawio):
+    vertices, _, _ = page_data(make_drawio, bounds=(0, 0, 600, 1000))
+    assert vertices == ['a', 'b', 'folder']
+
+
+def test_crop_and_report(make_drawio, tmp_path):
+    path = make_drawio([('Layers', LAYERED)])
+    observer = ProfileObserver()
+    convert(path, str(tmp_path / 'out.pptx'), crop=True, observer=observer)
+    # 'far' is off the 960x720 px slide; 'overlay' at x=600 is on it
+    assert observer.pages[0]['vertices'] == 4
+    assert observer.pages[0]['culled'] == 12
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_layers_through_convert(make_drawio, tmp_path, workers):
+    path = make_drawio([('Layers', LAYERED)])
+    observer = ProfileObserver()
+    convert(path, str(tmp_path / 'out.pptx'), backend='bulk', workers=workers, layers=['Extra'],
+            observer=observer)
+    assert (observer.pages[0]['vertices'], observer.pages[0]['culled']) == (1, 17)
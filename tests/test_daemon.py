@@ -0,0 +1,98 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import client
+from converter import convert
+from converter.daemon import ConversionDaemon, serve
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    path = str(tmp_path / 'd.sock')
+    ready = threading.Event()
+    thread = threading.Thread(target=serve, args=(path,), kwargs={'ready': lambda _: ready.set()})
+    thread.start()
+    assert ready.wait(30)
+    yield path
+    if thread.is_alive():
+        client.request(path, {'action': 'stop'})
+    thread.join(30)
+    assert not thread.is_alive()
+    assert not os.path.exists(path)
+
+
+def test_daemon_converts(daemon, make_drawio, tmp_path, capsys, monkeypatch):
+    source = make_drawio([('One', '<mxCell id="0"/>'), ('Two', '<mxCell id="0"/>')])
+    convert(source, str(tmp_path / 'direct.pptx'), backend='bulk', pages='2')
+
+    lines = []
+    reply = client.request(daemon, {'action': 'convert', 'input': source,
+                                    'output': str(tmp_path / 'served.pptx'),
+                                    'options': {'backend': 'bulk', 'pages': '2'}}, out=lines.append)
+    assert reply == {'ok': True}
+    assert (tmp_path / 'served.pptx').read_bytes() == (tmp_path / 'direct.pptx').read_bytes()
+    assert lines[0] == f"Parsing {source}..."
+    assert "  Processing page 'Two': 0 shapes, 0 connections" in lines
+
+    # The command line client, with relative paths
+    monkeypatch.chdir(tmp_path)
+    client.main(['--socket', daemon, '--backend', 'bulk', '--pages', '2', source, 'cli.pptx'])
+    assert (tmp_path / 'cli.pptx').read_bytes() == (tmp_path / 'direct.pptx').read_bytes()
+    assert "Done." in capsys.readouterr().out
+
+
+def test_daemon_errors(daemon, tmp_path):
+    def convert_request(**options):
+        return client.request(daemon, {'action': 'convert', 'input': str(tmp_path / 'missing.drawio'),
+                                       'output': str(tmp_path / 'out.pptx'), 'options': options})
+
+    assert 'Error parsing XML' in convert_request()['error']
+    assert convert_request(workers=4) == {'ok': False, 'error': 'Unknown options: workers'}
+    assert client.request(daemon, {'action': 'nap'})['error'] == "Unknown action 'nap'"
+    assert client.request(daemon, {'action': 'ping'})['pid'] == os.getpid()
+    # A second daemon can't take the socket over
+    with pytest.raises(OSError, match='already listening'):
+        ConversionDaemon(daemon)
+    # Still serving
+    assert client.request(daemon, {'action': 'ping'})['ok']
+
+
+def test_client_falls_back_to_converting_in_process(make_drawio, tmp_path, capsys):
+    source = make_drawio([('One', '<mxCell id="0"/>')])
+    path = str(tmp_path / 'none.sock')
+    client.main(['--socket', path, source, str(tmp_path / 'out.pptx')])
+    assert (tmp_path / 'out.pptx').exists()
+    assert "Done." in capsys.readouterr().out
+
+    with pytest.raises(SystemExit):
+        client.main(['--socket', path, '--no-fallback', source, str(tmp_path / 'out.pptx')])
+    assert "No daemon is listening" in capsys.readouterr().out
+
+
+def test_stale_socket_is_replaced(tmp_path):
+    path = str(tmp_path / 'stale.sock')
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    with pytest.raises(client.DaemonUnavailable):
+        client.request(path, {'action': 'ping'})
+    daemon = ConversionDaemon(path)
+    # Only this user may connect
+    assert not os.stat(path).st_mode & 0o077
+    daemon.server_close()
+    assert not os.path.exists(path)
+
+
+def test_client_does_not_import_the_converter():
+    code = ("import sys, client; "
+            "print(sorted({m.split('.')[0] for m in sys.modules} & {'pptx', 'lxml', 'converter'}))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True,
+                            check=True)
+    assert result.stdout.strip() == '[]'
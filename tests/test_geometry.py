@@ -0,0 +1,197 @@
+from pptx import Presentation
+from pptx.enum.shapes import MSO_CONNECTOR, MSO_SHAPE_TYPE
+from pptx.oxml.ns import qn
+from pptx.util import Pt
+
+from converter import convert
+from converter.geometry import (BOTTOM, LEFT, RIGHT, ROUTE_MARGIN, TOP, PageGeometry, label_size,
+                                ratio_side)
+from converter.model import Edge
+from converter.styles import compile_style
+from converter.utils import px_to_emu
+
+
+def edge(source, target, style='edgeStyle=orthogonalEdgeStyle;', value='', **label):
+    return Edge('e', value, compile_style(style), style, '1', source, target, **label)
+
+
+def connectors(boxes, *edges):
+    geometry = PageGeometry()
+    for cell_id, box in boxes.items():
+        geometry.add(cell_id, *box)
+    return list(geometry.connectors(edges))
+
+
+def layout(boxes, *edges):
+    return [(conn_type, xfrm, label_box)
+            for _, conn_type, xfrm, path, label_box in connectors(boxes, *edges)]
+
+
+def paths(boxes, *edges):
+    return [path for _, _, _, path, _ in connectors(boxes, *edges)]
+
+
+BOXES = {
+    'a': (0, 0, 100, 50),
+    'below': (20, 200, 100, 50),
+    'right': (300, 10, 100, 50),
+    'diagonal': (400, 300, 100, 50),
+    'above_left': (-500, -100, 100, 50),
+}
+
+
+def test_sides_follow_the_shapes_relative_position():
+    results = layout(BOXES, edge('a', 'below'), edge('a', 'right'), edge('a', 'diagonal'),
+                     edge('a', 'above_left'))
+    assert [xfrm for _, xfrm, _ in results] == [
+        (50, 50, 20, 150, False, False),   # bottom centre to top centre
+        (100, 25, 200, 10, False, False),  # right middle to left middle
+        (100, 25, 300, 300, False, False),  # wider than tall: right to left
+        (-400, -75, 400, 100, True, True),  # left to right, drawn backwards
+    ]
+    # Elbows between shapes that overlap on one axis are drawn straight
+    assert [conn_type for conn_type, _, _ in results] == [
+        MSO_CONNECTOR.STRAIGHT, MSO_CONNECTOR.STRAIGHT, MSO_CONNECTOR.ELBOW, MSO_CONNECTOR.ELBOW]
+
+
+def test_explicit_exit_and_entry():
+    style = 'exitX=0.5;exitY=0;entryX=1;entryY=0.5;'
+    [(_, xfrm, _)] = layout(BOXES, edge('a', 'below', style))
+    # Top of a to the right of below
+    assert xfrm == (50, 0, 70, 225, False, False)
+    assert compile_style(style).exit_side == TOP
+    assert compile_style(style).entry_side == RIGHT
+
+    # Both ends must be pinned, otherwise both are chosen
+    [(_, xfrm, _)] = layout(BOXES, edge('a', 'below', 'exitX=0.5;exitY=0;'))
+    assert xfrm[:4] == (50, 50, 20, 150)
+
+
+def test_ratio_side():
+    assert [ratio_side('0.5', '0'), ratio_side('1', '0.5'), ratio_side('0.5', '1'),
+            ratio_side('0', '0.5')] == [TOP, RIGHT, BOTTOM, LEFT]
+    assert ratio_side('0.5', '0.5') is None
+    assert ratio_side(None, '0') is None
+    assert ratio_side('x', '0') is None
+
+
+def test_edges_need_both_ends_on_the_page():
+    assert layout(BOXES, edge('a', 'missing'), edge('missing', 'a')) == []
+
+
+M = ROUTE_MARGIN
+ROW_PX = {
+    'a': (0, 0, 100, 50),
+    'b': (200, 0, 100, 50),
+    'c': (400, 0, 100, 50),
+    'far': (0, 1000, 100, 50),
+}
+ROW = {name: tuple(map(px_to_emu, box)) for name, box in ROW_PX.items()}
+
+
+def emu(*points):
+    return tuple((px_to_emu(x), px_to_emu(y)) for x, y in points)
+
+
+def test_clear_connectors_keep_their_preset_shape():
+    assert paths(ROW, edge('a', 'b'), edge('a', 'far'), edge('a', 'c', style='')) == [None, None, None]
+
+
+def test_orthogonal_edges_go_around_shapes_in_the_way():
+    [(_, conn_type, xfrm, path, _)] = connectors(ROW, edge('a', 'c'))
+    # Out of a's right side, over b and down into c's left side
+    assert path == emu((100, 25), (110, 25), (110, -10), (390, -10), (390, 25), (400, 25))
+    assert xfrm == (px_to_emu(100), -M, px_to_emu(300), px_to_emu(25) + M, False, False)
+
+    # A container around both ends is not in the way
+    boxes = dict(ROW, lane=tuple(map(px_to_emu, (-50, -50, 600, 200))))
+    assert paths(boxes, edge('a', 'b'))[0] is None
+    assert paths(boxes, edge('a', 'c'))[0] == path
+
+
+def test_boxed_in_shapes_keep_the_drawn_connector():
+    def walls(above, below):
+        return dict(ROW, above=tuple(map(px_to_emu, above)), below=tuple(map(px_to_emu, below)))
+    assert paths(walls((-500, -200, 1500, 195), (-500, 55, 1500, 100)), edge('a', 'c')) == [None]
+    # Room for a detour under b
+    assert paths(walls((-500, -200, 1500, 195), (-500, 70, 1500, 100)), edge('a', 'c')) == [
+        emu((100, 25), (110, 25), (110, 60), (390, 60), (390, 25), (400, 25))]
+
+
+def test_waypoints():
+    # Straight edges pass through the points as they are
+    [path] = paths(ROW, edge('a', 'far', style='', points=((300, 200), (300, 500))))
+    assert path == emu((100, 25), (300, 200), (300, 500), (50, 1000))
+
+    # Orthogonal edges turn corners between them, leaving a's side squarely
+    [path] = paths(ROW, edge('a', 'far', points=((300, 200),)))
+    assert path == emu((100, 25), (300, 25), (300, 200), (50, 200), (50, 1000))
+
+
+def centre(box):
+    left, top, width, height = box
+    return left + width / 2, top + height / 2
+
+
+def test_label_size():
+    style = compile_style('')
+    assert label_size('Yes', style) == (int(3 * Pt(18) * 0.6) + 2 * px_to_emu(4),
+                                        int(Pt(18) * 1.2) + 2 * px_to_emu(4))
+    assert label_size('a<br>bcd', compile_style('fontSize=10;html=1;')) == (
+        int(3 * Pt(10) * 0.6) + 2 * px_to_emu(4), int(2 * Pt(10) * 1.2) + 2 * px_to_emu(4))
+    # The largest font in the label counts
+    assert label_size('a<font style="font-size:30px">b</font>', style)[1] == int(Pt(30) * 1.2) + 2 * px_to_emu(4)
+
+
+def test_labels_stay_clear_of_shapes_and_each_other():
+    width, height = label_size('Yes', compile_style(''))
+    first, second = [box for _, _, box in layout(ROW, edge('a', 'far', value='Yes', label_dx=20),
+                                                 edge('a', 'far', value='Yes', label_dx=20))]
+    # Midway between the centres, moved by the offset
+    assert first[2:] == (width, height)
+    assert centre(first) == (px_to_emu(70), px_to_emu(525))
+    # The second moves beside it
+    assert centre(second) == (px_to_emu(70) - width, px_to_emu(525))
+
+    # A shape on the spot pushes the label along the edge
+    boxes = dict(ROW, block=tuple(map(px_to_emu, (0, 500, 100, 50))))
+    [(_, _, box)] = layout(boxes, edge('a', 'far', style='', value='Yes'))
+    assert box[1] >= px_to_emu(550)
+
+    # No free spot nearby: the label keeps its own
+    crowded = dict(ROW, block=tuple(map(px_to_emu, (-1000, 100, 3000, 850))))
+    [(_, _, box)] = layout(crowded, edge('a', 'far', style='', value='Yes'))
+    assert centre(box) == (px_to_emu(50), px_to_emu(525))
+
+
+def test_labels_follow_routed_paths():
+    [(_, _, box)] = layout(ROW, edge('a', 'c', value='Over'))
+    # Halfway along the path over b, which is above it
+    x, y = centre(box)
+    assert y < 0 and px_to_emu(200) < x < px_to_emu(300)
+
+
+def test_backends_agree_on_routed_connectors(make_drawio, tmp_path):
+    cells = ('<mxCell id="0"/><mxCell id="1" parent="0"/>'
+             + ''.join(f'<mxCell id="{name}" vertex="1" parent="1"><mxGeometry x="{x}" y="{y}" '
+                       f'width="{w}" height="{h}" as="geometry"/></mxCell>'
+                       for name, (x, y, w, h) in ROW_PX.items())
+             + '<mxCell id="e1" value="Over" edge="1" parent="1" source="a" target="c" '
+               'style="edgeStyle=orthogonalEdgeStyle;endArrow=block;">'
+               '<mxGeometry relative="1" as="geometry"/></mxCell>'
+             + '<mxCell id="e2" edge="1" parent="1" source="b" target="far" '
+               'style="edgeStyle=orthogonalEdgeStyle;"><mxGeometry relative="1" as="geometry">'
+               '<Array as="points"><mxPoint x="600" y="300"/></Array></mxGeometry></mxCell>')
+    path = make_drawio([('Page', cells)])
+    for backend in ('pptx', 'bulk'):
+        convert(path, str(tmp_path / f'{backend}.pptx'), backend=backend)
+    convert(path, str(tmp_path / 'workers.pptx'), workers=2)
+    assert (tmp_path / 'bulk.pptx').read_bytes() == (tmp_path / 'pptx.pptx').read_bytes()
+    assert (tmp_path / 'workers.pptx').read_bytes() == (tmp_path / 'pptx.pptx').read_bytes()
+
+    connectors = [shape for shape in Presentation(str(tmp_path / 'bulk.pptx')).slides[0].shapes
+                  if shape.shape_type == MSO_SHAPE_TYPE.LINE]
+    assert len(connectors) == 2
+    for connector in connectors:
+        geometry = connector._element.spPr
+        assert geometry.find(qn('a:custGeom')) is not None and geometry.find(qn('a:prstGeom')) is None
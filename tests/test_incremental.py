@@ -0,0 +1,113 @@
+import os
+import weakref
+import zipfile
+
+import pytest
+
+from conftest import page_cells
+from converter import Observer, convert
+from converter.incremental import IncrementalConverter, fingerprint_path
+from converter.parser import DrawioParser
+
+
+def slide_parts(path):
+    with zipfile.ZipFile(path) as z:
+        return {name: z.read(name) for name in z.namelist()
+                if name.startswith('ppt/slides/')}
+
+
+@pytest.fixture
+def pages():
+    return [(f'P{i}', page_cells(4 + i, 3 + i, label=f'Page {i}')) for i in range(4)]
+
+
+def test_only_changed_pages_are_rendered(pages, make_drawio, tmp_path):
+    output = str(tmp_path / 'out.pptx')
+    full = str(tmp_path / 'full.pptx')
+
+    def update(pages):
+        source = make_drawio(pages)
+        result = IncrementalConverter(source, output).update()
+        convert(source, full)
+        # The slides always match a from-scratch conversion
+        assert slide_parts(output) == slide_parts(full)
+        return result
+
+    assert update(pages) == (4, 0)
+    assert update(pages) == (0, 4)
+
+    pages[2] = ('P2', page_cells(2, 1, label='Edited'))
+    assert update(pages) == (1, 3)
+
+    pages.insert(1, ('Inserted', page_cells(3, 2)))
+    assert update(pages) == (1, 4)
+
+    del pages[3]
+    pages.reverse()
+    assert update(pages) == (0, 4)
+
+
+def test_changed_options_rebuild_everything(pages, make_drawio, tmp_path):
+    source = make_drawio(pages)
+    output = str(tmp_path / 'out.pptx')
+    assert IncrementalConverter(source, output).update() == (4, 0)
+    assert IncrementalConverter(source, output, template='minimal').update() == (4, 0)
+
+    # A missing or stale fingerprint file also means a full rebuild
+    (tmp_path / 'out.pptx.pages.json').write_text('{}')
+    assert fingerprint_path(output).endswith('.pages.json')
+    assert IncrementalConverter(source, output, template='minimal').update() == (4, 0)
+
+
+def test_update_holds_one_page_at_a_time(pages, make_drawio, tmp_path, monkeypatch):
+    source = make_drawio(pages * 2)
+    output = str(tmp_path / 'out.pptx')
+    live = weakref.WeakSet()
+    most = []
+    make_page = DrawioParser._make_page
+
+    def tracked(self, diagram):
+        page = make_page(self, diagram)
+        live.add(page)
+        most.append(len(live))
+        return page
+
+    monkeypatch.setattr(DrawioParser, '_make_page', tracked)
+    assert IncrementalConverter(source, output).update() == (8, 0)
+    # The page being read, and at most the one before it
+    assert max(most) <= 2
+
+
+def test_watch_reports_through_the_observer(pages, make_drawio, tmp_path, monkeypatch):
+    class Stop(Exception):
+        pass
+
+    class Recorder(Observer):
+        def output_updated(self, output_file, rendered, reused):
+            events.append(('updated', rendered, reused))
+
+        def update_failed(self, error):
+            events.append(('failed', str(error)))
+
+    events = []
+    source = make_drawio(pages)
+    converter = IncrementalConverter(source, str(tmp_path / 'out.pptx'), observer=Recorder())
+    results = iter([OSError('busy'), ValueError('half saved'), (4, 0)])
+
+    def update():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def sleep(interval):
+        # Make the file look changed, until the updates run out
+        if len(events) == 3:
+            raise Stop
+        os.utime(source, ns=(len(events), len(events)))
+
+    monkeypatch.setattr(converter, 'update', update)
+    monkeypatch.setattr('converter.incremental.time.sleep', sleep)
+    with pytest.raises(Stop):
+        converter.watch()
+    assert events == [('failed', 'busy'), ('failed', 'half saved'), ('updated', 4, 0)]
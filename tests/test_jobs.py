@@ -0,0 +1,110 @@
+import io
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import drawio_xml, page_cells
+from converter.cache import ResultCache
+from converter.jobs import JobQueue
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'webapp')))
+import app as webapp  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(webapp, 'result_cache',
+                        ResultCache(str(tmp_path / 'outputs'), 'test'))
+    queue = JobQueue(workers=1, max_pending=2)
+    monkeypatch.setattr(webapp, 'job_queue', queue)
+    yield webapp.app.test_client()
+    queue.shutdown()
+
+
+def upload(data, name='d.drawio'):
+    return {'file': (io.BytesIO(data), name)}
+
+
+def wait_for(client, url):
+    for _ in range(200):
+        status = client.get(url).get_json()
+        if status['status'] in ('done', 'failed'):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job at {url} did not finish")
+
+
+def test_job_flow(client):
+    data = drawio_xml([('A', page_cells()), ('B', page_cells(3, 2))]).encode()
+
+    # Hold the only worker so submitted jobs stay queued
+    release = threading.Event()
+    webapp.job_queue.submit(lambda job: release.wait())
+
+    r = client.post('/jobs', data=upload(data), content_type='multipart/form-data')
+    assert r.status_code == 202
+    location = r.headers['Location']
+    assert r.get_json()['status'] == 'queued'
+
+    assert client.get(location + '/download').status_code == 409
+
+    r = client.post('/jobs', data=upload(b'<mxfile/>'), content_type='multipart/form-data')
+    assert r.status_code == 429
+    assert r.headers['Retry-After']
+
+    release.set()
+    status = wait_for(client, location)
+    assert status['status'] == 'done'
+    assert status['pages_done'] == status['pages_total'] == 2
+    assert status['progress'] == 1.0
+
+    r = client.get(status['download_url'])
+    assert r.status_code == 200
+    assert r.data[:2] == b'PK'
+    etag = r.headers['ETag']
+    r = client.get(status['download_url'], headers={'If-None-Match': etag})
+    assert r.status_code == 304
+
+
+def test_failed_and_unknown_jobs(client):
+    r = client.post('/jobs', data=upload(b'<not xml'), content_type='multipart/form-data')
+    status = wait_for(client, r.headers['Location'])
+    assert status['status'] == 'failed'
+    assert status['error']
+
+    assert client.get('/jobs/nope').status_code == 404
+    assert client.post('/jobs').status_code == 400
+
+
+def test_download_after_eviction(client):
+    data = drawio_xml([('A', page_cells())]).encode()
+    r = client.post('/jobs', data=upload(data), content_type='multipart/form-data')
+    status = wait_for(client, r.headers['Location'])
+    webapp.result_cache.max_bytes = 0
+    webapp.result_cache.evict()
+    assert client.get(status['download_url']).status_code == 410
+
+
+def test_upload_is_served_from_cache(client, monkeypatch, tmp_path):
+    data = drawio_xml([('A', page_cells())]).encode()
+    r = client.post('/', data=upload(data), content_type='multipart/form-data')
+    assert r.status_code == 200
+    location = r.headers['X-Result-Location']
+    # Converted in memory; the cache entry is the only file written
+    assert os.listdir(tmp_path) == ['outputs']
+    assert [name for name in os.listdir(tmp_path / 'outputs')] == [r.headers['ETag'].strip('"') + '.pptx']
+
+    calls = []
+    monkeypatch.setattr(webapp, 'convert', lambda *args, **kwargs: calls.append(args))
+    monkeypatch.setattr(webapp, 'convert_bytes', lambda *args, **kwargs: calls.append(args))
+    again = client.post('/', data=upload(data), content_type='multipart/form-data')
+    assert again.data == r.data
+    assert calls == []
+
+    assert client.get(location, headers={'If-None-Match': r.headers['ETag']}).status_code == 304
+    assert client.get(location).data == r.data
+    assert client.get('/result/' + 'f' * 64).status_code == 404
+    assert client.get('/result/nothex').status_code == 404
@@ -0,0 +1,99 @@
+import base64
+import hashlib
+import struct
+import zipfile
+import zlib
+
+import pytest
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+from converter import convert
+from converter.media import decode_image, style_image
+from converter.styles import compile_style
+
+
+def png(color):
+    """A 1x1 PNG of the given RGB color."""
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data
+                + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+    raw = zlib.compress(b'\x00' + bytes(color))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', 1, 1, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', raw) + chunk(b'IEND', b''))
+
+
+RED = base64.b64encode(png((255, 0, 0))).decode()
+BLUE = base64.b64encode(png((0, 0, 255))).decode()
+
+
+def image_cells(images, prefix='i'):
+    """A row of image cells (with labels under them) joined by edges."""
+    cells = ['<mxCell id="0"/><mxCell id="1" parent="0"/>']
+    for i, payload in enumerate(images):
+        cells.append(
+            f'<mxCell id="{prefix}{i}" value="Icon {i}" style="shape=image;verticalLabelPosition=bottom;'
+            f'image=data:image/png,{payload};" vertex="1" parent="1">'
+            f'<mxGeometry x="{i * 100}" y="0" width="48" height="48" as="geometry"/></mxCell>')
+    for i in range(len(images) - 1):
+        cells.append(
+            f'<mxCell id="{prefix}e{i}" edge="1" parent="1" source="{prefix}{i}" target="{prefix}{i + 1}">'
+            f'<mxGeometry relative="1" as="geometry"/></mxCell>')
+    return ''.join(cells)
+
+
+@pytest.fixture
+def icons(make_drawio):
+    return make_drawio([('One', image_cells([RED, BLUE, RED, RED])),
+                        ('Two', image_cells([BLUE, BLUE]))])
+
+
+def test_style_image():
+    image = style_image(f'shape=image;image=data:image/png,{RED};aspect=fixed;')
+    assert (image.ext, image.payload) == ('png', RED)
+    assert style_image(f'image=data:image/png;base64,{RED}').payload == RED
+    assert style_image('shape=image;image=data:image/svg+xml,PHN2Zz48L3N2Zz4=;') is None
+    assert style_image('shape=image;image=https://example.com/icon.png;') is None
+    assert style_image(f'image=data:image/png,{RED[:-1]};') is None
+
+
+def test_compiled_style_keeps_no_image_data():
+    for style_str in (f'shape=image;image=data:image/png,{RED};aspect=fixed;',
+                      f'shape=image;image=data:image/png;base64,{RED}'):
+        style = compile_style(style_str)
+        assert style.image.payload == RED
+        assert style.get('image') == 'data:image/png'
+        assert not any(RED[:16] in str(item) for item in style.attrs.items())
+
+
+def test_decode_in_chunks(monkeypatch):
+    monkeypatch.setattr('converter.media.DECODE_CHUNK', 8)
+    sha1, blob = decode_image(RED)
+    assert blob == png((255, 0, 0))
+    assert sha1 == hashlib.sha1(blob).hexdigest()
+
+
+def test_images_become_pictures_sharing_parts(icons, tmp_path):
+    output = str(tmp_path / 'out.pptx')
+    convert(icons, output, backend='bulk')
+
+    with zipfile.ZipFile(output) as z:
+        media = sorted(name for name in z.namelist() if name.startswith('ppt/media/'))
+        assert media == ['ppt/media/image1.png', 'ppt/media/image2.png']
+        assert {z.read(name) for name in media} == {png((255, 0, 0)), png((0, 0, 255))}
+
+    slides = Presentation(output).slides
+    pictures = [s for s in slides[0].shapes if s.shape_type == MSO_SHAPE_TYPE.PICTURE]
+    assert [p.image.blob == png((255, 0, 0)) for p in pictures] == [True, False, True, True]
+    # Labels sit under their image
+    labels = [s for s in slides[0].shapes if s.has_text_frame and s.text_frame.text.startswith('Icon')]
+    assert [(label.left, label.top) for label in labels] == [(p.left, p.top + p.height) for p in pictures]
+    assert len(slides[0].part.rels) == 3  # layout and two images
+    assert slides[1].shapes[0].image.blob == png((0, 0, 255))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_backends_and_workers_agree(icons, tmp_path, workers):
+    convert(icons, str(tmp_path / 'pptx.pptx'), backend='pptx')
+    convert(icons, str(tmp_path / 'bulk.pptx'), backend='bulk', workers=workers)
+    assert (tmp_path / 'bulk.pptx').read_bytes() == (tmp_path / 'pptx.pptx').read_bytes()
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from conftest import page_cells
+from converter import convert
+from converter.observe import Observer, PrintObserver, ProfileObserver, profiled
+
+
+@pytest.fixture
+def sample(make_drawio):
+    return make_drawio([('First', page_cells(6, 5)), ('Second', page_cells(3, 2))])
+
+
+def test_silent_without_observer(sample, tmp_path, capsys):
+    convert(sample, str(tmp_path / 'out.pptx'))
+    assert capsys.readouterr().out == ''
+
+
+def test_print_observer(sample, tmp_path, capsys):
+    convert(sample, str(tmp_path / 'out.pptx'), observer=PrintObserver())
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == f"Parsing {sample}..."
+    assert "  Processing page 'First': 6 shapes, 5 connections" in lines
+    assert lines[-2:] == ["Found 2 pages.", "Done."]
+
+
+@pytest.mark.parametrize('backend', ['pptx', 'bulk'])
+def test_profile_report(backend, sample, tmp_path):
+    events = []
+
+    class Recorder(Observer):
+        def page_done(self, index, name, n_vertices, n_edges):
+            events.append((index, name, n_vertices, n_edges))
+
+    observer = ProfileObserver(inner=Recorder())
+    convert(sample, str(tmp_path / 'out.pptx'), backend=backend, observer=observer)
+    report_path = tmp_path / 'report.json'
+    observer.write(str(report_path))
+    report = json.loads(report_path.read_text())
+
+    assert events == [(0, 'First', 6, 5), (1, 'Second', 3, 2)]
+    phases = report['phases']
+    assert set(phases) == {'parse', 'extract', 'vertices', 'edges', 'text', 'save'}
+    assert phases['vertices']['count'] == 9
+    assert phases['edges']['count'] == 7
+    assert phases['extract']['calls'] == 2
+    # One label per vertex plus the three labelled edges
+    assert phases['text']['count'] == 9 + 3
+    assert all(p['wall'] >= 0 and p['cpu'] >= 0 for p in phases.values())
+    assert report['peak_rss'] > 0
+    assert [page['name'] for page in report['pages']] == ['First', 'Second']
+    assert report['pages'][1]['phases']['vertices']['count'] == 3
+
+
+def test_parallel_profile(sample, tmp_path):
+    observer = ProfileObserver()
+    convert(sample, str(tmp_path / 'out.pptx'), workers=2, threads=True, observer=observer)
+    assert observer.phases['render']['count'] == 2
+    assert len(observer.pages) == 2
+
+
+@pytest.mark.parametrize('suffix', ['.prof', '.folded'])
+def test_profiled_dump(suffix, sample, tmp_path):
+    dump = tmp_path / f'dump{suffix}'
+    with profiled(str(dump)):
+        for _ in range(20):
+            convert(sample, str(tmp_path / 'out.pptx'))
+    assert dump.stat().st_size > 0
@@ -0,0 +1,133 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from conftest import page_cells
+from pptx import Presentation
+
+from converter import MemoryLimitExceeded, convert, convert_bytes
+
+HERE = os.path.dirname(__file__)
+
+STYLED_CELLS = (
+    '<mxCell id="0"/><mxCell id="1" parent="0"/>'
+    '<mxCell id="a" value="&lt;b&gt;Bold&lt;/b&gt; and &lt;i&gt;it&lt;/i&gt;" '
+    'style="ellipse;fillColor=none;strokeColor=#6c8ebf;strokeWidth=2;fontColor=#FF0000;html=1;" '
+    'vertex="1" parent="1"><mxGeometry x="10" y="10" width="120" height="60" as="geometry"/></mxCell>'
+    '<mxCell id="b" value="a&lt;br&gt;b" style="rhombus;fontSize=14;strokeColor=none;" '
+    'vertex="1" parent="1"><mxGeometry x="300" y="200" width="80" height="80" as="geometry"/></mxCell>'
+    '<mxCell id="c" value="" style="shape=cylinder;fillColor=#abc;" vertex="1" parent="b">'
+    '<mxGeometry x="10" y="10" width="40" height="40" as="geometry"/></mxCell>'
+    '<mxCell id="e1" value="Yes" style="edgeStyle=orthogonalEdgeStyle;dashed=1;startArrow=diamond;'
+    'startSize=14;strokeColor=#ff0000;" edge="1" parent="1" source="a" target="b">'
+    '<mxGeometry x="-0.5" y="10" relative="1" as="geometry"><mxPoint x="5" y="-7" as="offset"/>'
+    '</mxGeometry></mxCell>'
+    '<mxCell id="e2" value="&lt;b&gt;x&lt;/b&gt;" style="curved=1;endArrow=open;endSize=3;" edge="1" '
+    'parent="1" source="b" target="c"><mxGeometry relative="1" as="geometry"/></mxCell>'
+)
+
+
+def read_parts(path):
+    with zipfile.ZipFile(path) as z:
+        return {name: z.read(name) for name in z.namelist()}
+
+
+@pytest.fixture
+def sample(make_drawio):
+    return make_drawio([('Styled', STYLED_CELLS), ('Plain', page_cells(12, 11)),
+                        ('Empty', '<mxCell id="0"/>')], compressed=True)
+
+
+@pytest.mark.parametrize('source', ['sample', 'TestDiagram.drawio'])
+def test_bulk_backend_matches_pptx(source, sample, tmp_path):
+    input_file = sample if source == 'sample' else os.path.join(HERE, source)
+    convert(input_file, str(tmp_path / 'pptx.pptx'), backend='pptx')
+    convert(input_file, str(tmp_path / 'bulk.pptx'), backend='bulk')
+    assert read_parts(tmp_path / 'bulk.pptx') == read_parts(tmp_path / 'pptx.pptx')
+
+
+def test_unknown_backend(sample, tmp_path):
+    with pytest.raises(ValueError, match='Unknown backend'):
+        convert(sample, str(tmp_path / 'x.pptx'), backend='nope')
+
+
+@pytest.mark.parametrize('workers,threads', [(2, False), (3, False), (2, True)])
+def test_parallel_output_is_byte_identical(workers, threads, sample, tmp_path):
+    serial = tmp_path / 'serial.pptx'
+    parallel = tmp_path / 'parallel.pptx'
+    convert(sample, str(serial), backend='bulk')
+    convert(sample, str(parallel), workers=workers, threads=threads)
+    assert parallel.read_bytes() == serial.read_bytes()
+
+
+class _Unseekable(io.RawIOBase):
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._stream.readinto(buffer)
+
+
+def test_convert_in_memory(sample, tmp_path):
+    convert(sample, str(tmp_path / 'file.pptx'))
+    expected = (tmp_path / 'file.pptx').read_bytes()
+    with open(sample, 'rb') as f:
+        data = f.read()
+
+    assert convert_bytes(data) == expected
+    assert convert_bytes(memoryview(data), backend='bulk', workers=2) == expected
+
+    # Streams are read from their position, and may be re-read for progress
+    stream = io.BytesIO(b'junk' + data)
+    stream.seek(4)
+    output = io.BytesIO()
+    pages = []
+    convert(stream, output, progress=lambda done, total, name: pages.append((done, total)))
+    assert output.getvalue() == expected
+    assert pages == [(1, 3), (2, 3), (3, 3)]
+
+    output = io.BytesIO()
+    convert(_Unseekable(data), output, progress=lambda *args: None)
+    assert output.getvalue() == expected
+
+
+@pytest.mark.parametrize('backend,workers', [('pptx', None), ('bulk', None), ('bulk', 2)])
+def test_low_memory_writes_the_same_parts(backend, workers, sample, tmp_path):
+    convert(sample, str(tmp_path / 'normal.pptx'), backend=backend)
+    convert(sample, str(tmp_path / 'low.pptx'), backend=backend, workers=workers, low_memory=True)
+    assert read_parts(tmp_path / 'low.pptx') == read_parts(tmp_path / 'normal.pptx')
+    assert len(Presentation(str(tmp_path / 'low.pptx')).slides) == 3
+
+    # Streams work too
+    output = io.BytesIO()
+    convert(sample, output, backend=backend, workers=workers, low_memory=True)
+    assert read_parts(output) == read_parts(tmp_path / 'normal.pptx')
+
+
+def test_memory_limit(sample, tmp_path):
+    output = tmp_path / 'out.pptx'
+    with pytest.raises(MemoryLimitExceeded, match="on page 'Styled'"):
+        convert(sample, str(output), max_memory=1)
+    assert not output.exists()
+
+    convert(sample, str(output), max_memory=1024 * 1024)
+    convert(sample, str(tmp_path / 'normal.pptx'))
+    assert read_parts(output) == read_parts(tmp_path / 'normal.pptx')
+
+
+def test_page_selection(sample, tmp_path):
+    output = tmp_path / 'selected.pptx'
+    done = []
+    convert(sample, str(output), pages='Plain,3', progress=lambda *args: done.append(args))
+    assert done == [(1, 2, 'Plain'), (2, 2, 'Empty')]
+    assert len(Presentation(str(output)).slides) == 2
+
+    convert(sample, str(tmp_path / 'all.pptx'))
+    selected, everything = read_parts(output), read_parts(tmp_path / 'all.pptx')
+    assert selected['ppt/slides/slide1.xml'] == everything['ppt/slides/slide2.xml']
+    assert selected['ppt/slides/slide2.xml'] == everything['ppt/slides/slide3.xml']
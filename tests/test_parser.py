@@ -0,0 +1,287 @@
+import base64
+import zlib
+
+import pytest
+
+from conftest import compress_model, page_cells
+from converter.parser import DrawioParser, decode_diagram
+
+
+def test_compressed_pages_match_uncompressed(make_drawio):
+    pages = [('One', page_cells(6, 5)), ('Two', page_cells(3, 2, label='Other'))]
+    plain = DrawioParser(make_drawio(pages, name='plain.drawio')).parse()
+    packed = DrawioParser(make_drawio(pages, compressed=True, name='packed.drawio')).parse()
+
+    assert [p.name for p in packed] == ['One', 'Two']
+    for a, b in zip(plain, packed):
+        assert b.compressed and not a.compressed
+        va, ea = a.data
+        vb, eb = b.data
+        assert [(v.id, v.value, v.x, v.y) for v in va] == [(v.id, v.value, v.x, v.y) for v in vb]
+        assert [(e.id, e.source, e.target) for e in ea] == [(e.id, e.source, e.target) for e in eb]
+
+
+def test_zlib_header_is_accepted():
+    model = '<mxGraphModel><root><mxCell id="0"/></root></mxGraphModel>'
+    text = base64.b64encode(zlib.compress(model.encode())).decode()
+    assert decode_diagram(text).tag == 'mxGraphModel'
+
+
+def test_compressed_pages_are_decoded_lazily(make_drawio):
+    pages = [('Good', page_cells()), ('Bad', page_cells())]
+    path = make_drawio(pages, compressed=True)
+    with open(path, encoding='utf-8') as f:
+        xml = f.read()
+    # Corrupt the second page only
+    good = compress_model(f'<mxGraphModel><root>{page_cells()}</root></mxGraphModel>')
+    head, tail = xml.rsplit(good, 1)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(head + 'not-base64!' + tail)
+
+    first, second = DrawioParser(path).parse()
+    assert len(first.data[0]) == 6
+    # The bad page fails on access, and keeps failing the same way
+    for _ in range(2):
+        with pytest.raises(ValueError, match='Error decoding'):
+            second.data
+
+
+def test_pages_stream_before_the_rest_is_read(make_drawio):
+    # A page large enough that the broken one lies beyond the parser's first reads
+    path = make_drawio([('First', page_cells()), ('Large', page_cells(500, 0)),
+                        ('Broken', page_cells())])
+    with open(path, encoding='utf-8') as f:
+        xml = f.read()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(xml.replace('<diagram name="Broken"><mxGraphModel>', '<diagram name="Broken"><oops>'))
+
+    pages = DrawioParser(path).iter_pages()
+    first = next(pages)
+    assert first.name == 'First'
+    assert len(first.data[0]) == 6
+    with pytest.raises(ValueError, match='Error parsing'):
+        list(pages)
+
+
+def test_read_pages_are_detached(make_drawio, monkeypatch):
+    path = make_drawio([(f'P{i}', page_cells()) for i in range(3)])
+    parser = DrawioParser(path)
+    roots = []
+    diagrams = []
+    iter_events = parser._iter_events
+
+    def recording():
+        for event, elem in iter_events():
+            if not roots:
+                roots.append(elem)
+            if event == 'end' and elem.tag == 'diagram':
+                diagrams.append(elem)
+            yield event, elem
+
+    monkeypatch.setattr(parser, '_iter_events', recording)
+    for page in parser.iter_pages():
+        # Every page read so far, this one included, is out of the document
+        assert len(diagrams) == int(page.name[1:]) + 1
+        assert not any(diagram in roots[0] for diagram in diagrams)
+        assert len(page.data[0]) == 6
+    assert len(roots[0]) == 0
+
+
+def test_inflate_limit():
+    model = '<mxGraphModel><root>' + ' ' * 100000 + '</root></mxGraphModel>'
+    text = compress_model(model)
+    assert decode_diagram(text).tag == 'mxGraphModel'
+    with pytest.raises(ValueError, match='inflates to more than'):
+        decode_diagram(text, max_size=1000)
+
+
+def test_truncated_payload():
+    text = compress_model('<mxGraphModel><root/></mxGraphModel>')
+    data = base64.b64decode(text)
+    with pytest.raises(ValueError):
+        decode_diagram(base64.b64encode(data[:len(data) // 2]).decode())
+
+
+def test_page_count_and_errors(make_drawio, tmp_path):
+    path = make_drawio([('A', page_cells()), ('B', page_cells()), ('C', page_cells())])
+    assert DrawioParser(path).page_count() == 3
+
+    # Empty pages don't count, wherever the count comes from
+    mixed = tmp_path / 'mixed.drawio'
+    mixed.write_text(f'<mxfile><diagram name="a">  </diagram><diagram name="b"/>'
+                     f'<diagram name="c"><mxGraphModel><root>{page_cells()}</root></mxGraphModel>'
+                     f'</diagram></mxfile>')
+    parser = DrawioParser(str(mixed))
+    assert parser.page_count() == parser.page_count('1-') == len(parser.parse()) == 1
+
+    empty = tmp_path / 'empty.drawio'
+    empty.write_text('<mxfile><diagram name="x"></diagram></mxfile>')
+    assert DrawioParser(str(empty)).page_count() == 0
+    with pytest.raises(ValueError, match='Could not find'):
+        DrawioParser(str(empty)).parse()
+    with pytest.raises(ValueError, match='Error parsing'):
+        DrawioParser(str(tmp_path / 'missing.drawio')).parse()
+
+
+def _vertex(id_, parent, x, y):
+    return (f'<mxCell id="{id_}" vertex="1" parent="{parent}">'
+            f'<mxGeometry x="{x}" y="{y}" width="10" height="10" as="geometry"/></mxCell>')
+
+
+def test_deeply_nested_positions(make_drawio):
+    depth = 2000
+    cells = ['<mxCell id="0"/><mxCell id="1" parent="0"/>', _vertex('c0', '1', 5, 7)]
+    cells += [_vertex(f'c{i}', f'c{i - 1}', 1, 2) for i in range(1, depth)]
+    vertices, _ = DrawioParser(make_drawio([('Deep', ''.join(cells))])).parse()[0].data
+
+    pos = {v.id: (v.x, v.y) for v in vertices}
+    assert pos['c0'] == (5, 7)
+    assert pos['c1'] == (6, 9)
+    assert pos[f'c{depth - 1}'] == (5 + depth - 1, 7 + 2 * (depth - 1))
+
+
+def test_children_of_edges_and_layers_are_not_offset(make_drawio):
+    cells = ('<mxCell id="0"/><mxCell id="1" parent="0"/>'
+             + _vertex('a', '1', 100, 100)
+             + '<mxCell id="e" edge="1" parent="1" source="a" target="a">'
+               '<mxGeometry x="50" y="50" relative="1" as="geometry"/></mxCell>'
+             + _vertex('label', 'e', 3, 4))
+    vertices, _ = DrawioParser(make_drawio([('P', cells)])).parse()[0].data
+    assert {v.id: (v.x, v.y) for v in vertices}['label'] == (3, 4)
+
+
+def test_parent_cycle_falls_back_to_own_offset(make_drawio):
+    cells = ('<mxCell id="0"/><mxCell id="1" parent="0"/>'
+             + _vertex('a', 'b', 10, 20) + _vertex('b', 'a', 30, 40)
+             + _vertex('c', 'c', 1, 2) + _vertex('d', 'a', 1, 1))
+    vertices, _ = DrawioParser(make_drawio([('P', cells)])).parse()[0].data
+    pos = {v.id: (v.x, v.y) for v in vertices}
+    assert pos['a'] == (10, 20)
+    assert pos['b'] == (30, 40)
+    assert pos['c'] == (1, 2)
+    assert pos['d'] == (1, 1)
+
+
+def test_edge_label_geometry(make_drawio):
+    cells = ('<mxCell id="0"/><mxCell id="1" parent="0"/>'
+             + _vertex('a', '1', 0, 0) + _vertex('b', '1', 100, 0)
+             + '<mxCell id="e1" value="x" edge="1" parent="1" source="a" target="b">'
+               '<mxGeometry x="0.5" y="10" relative="1" as="geometry">'
+               '<mxPoint x="1" y="2" as="sourcePoint"/><mxPoint x="5" y="-7" as="offset"/>'
+               '</mxGeometry></mxCell>'
+             + '<mxCell id="e2" value="y" edge="1" parent="1" source="a" target="b">'
+               '<mxGeometry relative="1" as="geometry"/></mxCell>')
+    _, edges = DrawioParser(make_drawio([('P', cells)])).parse()[0].data
+    e1, e2 = edges
+    assert (e1.label_position, e1.label_offset) == (0.75, 10)
+    assert (e1.label_dx, e1.label_dy) == (5, -7)
+    assert (e2.label_position, e2.label_offset, e2.label_dx, e2.label_dy) == (0.5, 0, 0, 0)
+
+
+def test_edge_waypoints(make_drawio):
+    cells = ('<mxCell id="0"/><mxCell id="1" parent="0"/>'
+             + _vertex('box', '1', 100, 200) + _vertex('a', 'box', 0, 0) + _vertex('b', 'box', 50, 50)
+             + '<mxCell id="e1" edge="1" parent="1" source="a" target="b">'
+               '<mxGeometry relative="1" as="geometry"><mxPoint x="9" y="9" as="sourcePoint"/>'
+               '<Array as="points"><mxPoint x="10" y="20"/><mxPoint x="30"/></Array></mxGeometry></mxCell>'
+             + '<mxCell id="e2" edge="1" parent="box" source="a" target="b">'
+               '<mxGeometry relative="1" as="geometry"><Array as="points"><mxPoint x="10" y="20"/>'
+               '</Array></mxGeometry></mxCell>'
+             + '<mxCell id="e3" edge="1" parent="1" source="a" target="b">'
+               '<mxGeometry relative="1" as="geometry"/></mxCell>')
+    _, edges = DrawioParser(make_drawio([('P', cells)])).parse()[0].data
+    assert [e.points for e in edges] == [((10, 20), (30, 0)), ((110, 220),), ()]
+
+
+def test_page_directory(make_drawio, tmp_path):
+    pages = [('One', page_cells()), ('Two &amp; &quot;more&quot;', page_cells()), ('Three', page_cells())]
+    path = make_drawio(pages)
+    with open(path, 'rb') as f:
+        data = f.read()
+    entries = DrawioParser(path).directory()
+    assert [(e.number, e.name, e.compressed) for e in entries] == [
+        (1, 'One', False), (2, 'Two & "more"', False), (3, 'Three', False)]
+    for entry in entries:
+        assert data[entry.offset:].startswith(b'<diagram ')
+        assert data[:entry.end].endswith(b'</diagram>')
+
+    packed = DrawioParser(make_drawio(pages, compressed=True, name='packed.drawio')).directory()
+    assert [e.compressed for e in packed] == [True] * 3
+
+    # Empty pages are skipped, as they are when parsing
+    empty = tmp_path / 'empty.drawio'
+    empty.write_text('<mxfile><diagram name="x" id="a"/><diagram name="y"> </diagram>'
+                     f'<diagram name="z" id="b"><mxGraphModel><root>{page_cells()}</root>'
+                     '</mxGraphModel></diagram></mxfile>')
+    [entry] = DrawioParser(str(empty)).directory()
+    assert (entry.number, entry.name, entry.id) == (1, 'z', 'b')
+
+    # End tags may have space before the '>'
+    spaced = tmp_path / 'spaced.drawio'
+    spaced.write_text(f'<mxfile><diagram name="p"><mxGraphModel><root>{page_cells()}</root>'
+                      '</mxGraphModel></diagram\n ><diagram name="q"> </diagram ></mxfile>')
+    [entry] = DrawioParser(str(spaced)).directory()
+    assert entry.name == 'p'
+    assert spaced.read_bytes()[:entry.end].endswith(b'</diagram\n >')
+    assert [len(page.data[0]) for page in DrawioParser(str(spaced)).parse('p')] == [6]
+
+
+def test_page_directory_without_offsets(tmp_path):
+    # A raw model is one page
+    raw = tmp_path / 'raw.xml'
+    raw.write_text(f'<mxGraphModel><root>{page_cells()}</root></mxGraphModel>')
+    [entry] = DrawioParser(str(raw)).directory()
+    assert (entry.name, entry.offset) == ('Page-1', None)
+    assert len(DrawioParser(str(raw)).parse('1')[0].data[0]) == 6
+
+    # Other encodings are read with the XML parser
+    latin = tmp_path / 'latin.drawio'
+    latin.write_bytes(('<?xml version="1.0" encoding="ISO-8859-1"?><mxfile>'
+                       f'<diagram name="Caf\xe9"><mxGraphModel><root>{page_cells()}</root></mxGraphModel>'
+                       '</diagram><diagram name="Two"><mxGraphModel><root>'
+                       f'{page_cells(2, 1)}</root></mxGraphModel></diagram></mxfile>').encode('latin-1'))
+    entries = DrawioParser(str(latin)).directory()
+    assert [(e.name, e.offset) for e in entries] == [('Caf\xe9', None), ('Two', None)]
+    [page] = DrawioParser(str(latin)).parse('Two')
+    assert len(page.data[0]) == 2
+
+
+def test_page_selection(make_drawio):
+    names = ['Intro', 'Design', '3', 'Design', 'End']
+    path = make_drawio([(name, page_cells()) for name in names])
+    parser = DrawioParser(path)
+
+    def selected(pages):
+        return [page.name for page in parser.iter_pages(pages)]
+
+    assert selected('Intro,2') == ['Intro', 'Design']
+    # Names come first; document order; each page once
+    assert selected('3') == ['3']
+    assert selected(['End', 'Design', 2]) == ['Design', 'Design', 'End']
+    assert selected('2-3, 5') == ['Design', '3', 'End']
+    assert selected('4-') == ['Design', 'End']
+    assert selected('-1') == ['Intro']
+    assert parser.page_count('Design') == 2
+
+    for pages, message in [('Missing', "No page named 'Missing'"), ('6', 'out of range'),
+                           ('3-2', 'out of range'), ('0', 'out of range'), ([], 'No pages')]:
+        with pytest.raises(ValueError, match=message):
+            parser.parse(pages)
+
+
+def test_unselected_pages_are_not_parsed(make_drawio):
+    path = make_drawio([('Good', page_cells()), ('Broken', page_cells()), ('Also', page_cells(2, 1))])
+    with open(path, encoding='utf-8') as f:
+        xml = f.read()
+    head, tail = xml.split('<diagram name="Broken">', 1)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(head + '<diagram name="Broken"><mxGraphModel><root><oops>' + tail)
+
+    with pytest.raises(ValueError, match='Error parsing'):
+        DrawioParser(path).parse()
+    assert [len(page.data[0]) for page in DrawioParser(path).parse('Good,3')] == [6, 2]
+    # Streams and bytes are scanned the same way
+    with open(path, 'rb') as f:
+        assert [page.name for page in DrawioParser(f).parse('Also')] == ['Also']
+        f.seek(0)
+        assert [page.name for page in DrawioParser(f.read()).parse('1')] == ['Good']
@@ -0,0 +1,39 @@
+from pptx.dml.color import RGBColor
+from pptx.util import Pt
+
+from converter.styles import NO_COLOR, compile_style
+
+
+def test_same_string_gives_the_same_object():
+    style_str = 'rounded=1;fillColor=#dae8fc;strokeColor=#6c8ebf;'
+    assert compile_style(style_str) is compile_style(style_str)
+    # A copy of the string is found by value
+    assert compile_style(''.join(style_str)) is compile_style(style_str)
+    assert compile_style(style_str) is not compile_style(style_str + 'dashed=1;')
+
+
+def test_defaults():
+    style = compile_style('')
+    assert style.fill_color == RGBColor(0xFF, 0xFF, 0xFF)
+    assert style.stroke_color == RGBColor(0, 0, 0)
+    assert style.line_color == RGBColor(0, 0, 0)
+    assert style.line_width == Pt(1)
+    # Shapes keep the template's outline width and text size
+    assert style.stroke_width is None
+    assert style.font_size is None
+
+    style = compile_style('fillColor=none;strokeColor=none;')
+    assert (style.fill_color, style.stroke_color) == (NO_COLOR, NO_COLOR)
+    # Connectors stay visible
+    assert style.line_color == RGBColor(0, 0, 0)
+
+
+def test_bad_sizes_fall_back():
+    assert compile_style('strokeWidth=2.5;').stroke_width == Pt(2.5)
+    assert compile_style('fontSize=14;').font_size == Pt(14)
+    for value in ('wide', '-1', 'nan', '1e9'):
+        style = compile_style(f'strokeWidth={value};fontSize={value};')
+        # Left untouched, as when setting them used to fail
+        assert (style.stroke_width, style.line_width, style.font_size) == (None, None, None)
+    # Too small for PowerPoint
+    assert compile_style('fontSize=0;').font_size is None
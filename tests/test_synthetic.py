@@ -0,0 +1,25 @@
+import synthetic
+from converter.parser import DrawioParser
+
+
+def test_generator_parameters(tmp_path):
+    for compressed in (False, True):
+        path = synthetic.write(str(tmp_path / f'{compressed}.drawio'), shapes=50, edges=30,
+                               depth=5, html=2, pages=3, compressed=compressed)
+        pages = DrawioParser(path).parse()
+        assert len(pages) == 3
+        assert all(page.compressed == compressed for page in pages)
+        vertices, edges = pages[0].data
+        assert (len(vertices), len(edges)) == (50, 30)
+        assert '<b>Node</b>' in vertices[0].value
+
+        # Every fifth vertex starts a new chain of five nested containers
+        parents = {v.id: v.parent_id for v in vertices}
+        assert parents['v0'] == '1'
+        assert parents['v4'] == 'v3'
+        assert parents['v5'] == '1'
+
+
+def test_generator_is_deterministic():
+    assert synthetic.generate(shapes=20, seed=3) == synthetic.generate(shapes=20, seed=3)
+    assert synthetic.generate(shapes=20, seed=3) != synthetic.generate(shapes=20, seed=4)
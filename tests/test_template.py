@@ -0,0 +1,41 @@
+import io
+
+import pytest
+from pptx import Presentation
+
+from converter import template
+from converter.template import blank_layout, load_template
+
+
+@pytest.mark.parametrize('name', ['default', 'minimal'])
+def test_copies_are_isolated(name):
+    first = load_template(name)
+    first.slides.add_slide(blank_layout(first))
+    first.slide_width = 914400 * 3
+
+    second = load_template(name)
+    assert len(second.slides) == 0
+    assert second.slide_width != 914400 * 3
+    assert len(template._cache[name].slides) == 0
+
+
+def test_copy_saves_its_slides_after_cache_was_inspected():
+    load_template('default')
+    assert len(template._cache['default'].slides) == 0
+
+    prs = load_template('default')
+    prs.slides.add_slide(blank_layout(prs))
+    stream = io.BytesIO()
+    prs.save(stream)
+    assert len(Presentation(stream).slides) == 1
+
+
+def test_minimal_template_keeps_only_blank_layout():
+    prs = load_template('minimal')
+    assert [layout.name for layout in prs.slide_layouts] == ['Blank']
+    assert len(load_template('default').slide_layouts) > 1
+
+
+def test_unknown_template():
+    with pytest.raises(ValueError, match='Unknown template'):
+        load_template('fancy')
@@ -0,0 +1,100 @@
+from xml.sax.saxutils import escape
+
+from lxml import etree
+from pptx import Presentation
+from pptx.oxml.ns import qn
+from pptx.text.text import Font
+from pptx.util import Pt
+
+from conftest import page_cells
+from converter import convert
+from converter.utils import PLAIN, parse_html_label
+
+
+def runs(label):
+    return [(text, fmt.bold, fmt.italic, fmt.underline, fmt.color, fmt.size)
+            for text, fmt in parse_html_label(label)]
+
+
+def test_nested_formatting_is_restored_on_close():
+    assert runs('<span style="color:#ff0000">a<b>b<font color="#00ff00">c</font>d</b>e</span>f') == [
+        ('a', False, False, False, '#ff0000', None),
+        ('b', True, False, False, '#ff0000', None),
+        ('c', True, False, False, '#00ff00', None),
+        ('d', True, False, False, '#ff0000', None),
+        ('e', False, False, False, '#ff0000', None),
+        ('f', False, False, False, None, None),
+    ]
+
+
+def test_line_breaks_and_entities():
+    assert runs('a<br>b<br/>c<BR />d&amp;e&lt;f&nbsp;g') == [('a\nb\nc\nd&e<f\xa0g', False, False, False, None, None)]
+    assert runs('<div>one</div><div style="text-align:left">two</div>') == [
+        ('\none\n\ntwo\n', False, False, False, None, None)]
+
+
+def test_inline_css():
+    assert runs('<span style="font-weight: 700; font-style: italic; text-decoration: underline;'
+                ' background-color: #ffff00; font-size: 18px">x</span>') == [
+        ('x', True, True, True, None, '18')]
+    assert runs('<span style="color: rgb(255, 0, 16)">x</span>') == [('x', False, False, False, '#ff0010', None)]
+    assert runs('<font size="5">x</font>') == [('x', False, False, False, None, '24')]
+
+
+def test_stray_markup():
+    assert runs('x < y') == [('x < y', False, False, False, None, None)]
+    assert runs('a</b>b<!-- note -->c') == [('abc', False, False, False, None, None)]
+    assert runs('<b></b>') == []
+    assert parse_html_label('<i>x</i>')[0][1] == PLAIN._replace(italic=True)
+
+
+def label_shape(make_drawio, tmp_path, value, style='html=1;'):
+    cells = ('<mxCell id="0"/><mxCell id="1" parent="0"/>'
+             f'<mxCell id="v" value="{escape(value, {'"': '&quot;'})}" style="{style}" vertex="1" parent="1">'
+             '<mxGeometry x="0" y="0" width="120" height="60" as="geometry"/></mxCell>')
+    output = str(tmp_path / 'out.pptx')
+    convert(make_drawio([('Page', cells)]), output)
+    return Presentation(output).slides[0].shapes[0]
+
+
+def body_font(shape):
+    lst_style = shape.text_frame._txBody.find(qn('a:lstStyle'))
+    return Font(lst_style.find(qn('a:lvl1pPr')).find(qn('a:defRPr')))
+
+
+def test_style_font_color_applies_to_unstyled_runs(make_drawio, tmp_path):
+    shape = label_shape(make_drawio, tmp_path, 'plain <b>bold</b> and plain',
+                        style='html=1;fontColor=#FF0000;fontSize=20;')
+
+    defaults = body_font(shape)
+    assert str(defaults.color.rgb) == 'FF0000'
+    assert defaults.size == Pt(20)
+    assert defaults.bold is None
+    fonts = [run.font for run in shape.text_frame.paragraphs[0].runs]
+    assert [font.bold for font in fonts] == [None, True, None]
+    assert all(font.size is None and font.color.type is None for font in fonts)
+
+
+def test_runs_are_merged_and_only_differences_kept(make_drawio, tmp_path):
+    shape = label_shape(make_drawio, tmp_path,
+                        '<b>Long</b><span style="font-weight:bold"> bold text</span> <i>x</i>')
+
+    assert [run.text for run in shape.text_frame.paragraphs[0].runs] == ['Long bold text', ' ', 'x']
+    # Reading run.font would add an empty rPr
+    assert b'<a:rPr' not in etree.tostring(shape.text_frame.paragraphs[0].runs[0]._r)
+    defaults = body_font(shape)
+    assert defaults.bold is True and defaults.italic is None
+    assert str(defaults.color.rgb) == '000000'
+    fonts = [run.font for run in shape.text_frame.paragraphs[0].runs]
+    assert [(font.bold, font.italic) for font in fonts] == [(None, None), (False, None), (False, True)]
+
+
+def test_backends_agree_on_rich_labels(make_drawio, tmp_path):
+    label = escape('<b>x</b> &amp; <span style="color:#0000ff">y</span>', {'"': '&quot;'})
+    path = make_drawio([('Page', page_cells(4, 3, label=label))])
+    outputs = []
+    for backend in ('pptx', 'bulk'):
+        outputs.append(str(tmp_path / f'{backend}.pptx'))
+        convert(path, outputs[-1], backend=backend)
+    with open(outputs[0], 'rb') as a, open(outputs[1], 'rb') as b:
+        assert a.read() == b.read()
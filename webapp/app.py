@@ -1,6 +1,6 @@
+import io
 import os
-import uuid
-from flask import Flask, render_template, request, send_file, flash, redirect, url_for
+from flask import Flask, render_template, request, send_file, flash, redirect, url_for, abort, jsonify
 from werkzeug.utils import secure_filename
 import sys
 
@@ -8,7 +8,9 @@ import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from converter import convert, __version__
+from converter import convert, convert_bytes, __version__
+from converter.cache import ResultCache
+from converter.jobs import JobQueue, QueueFull
 
 
 
@@ -16,12 +18,29 @@ app = Flask(__name__)
 
 app.secret_key = 'supersecretkey'  # Change this for production
 
-app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'uploads')
-
 app.config['OUTPUT_FOLDER'] = os.path.join(os.path.dirname(__file__), 'outputs')
 
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB limit
 
+# Converted files are kept in OUTPUT_FOLDER, keyed by the upload's content
+app.config['CACHE_MAX_BYTES'] = int(os.environ.get('DRAWIO2PPTX_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+app.config['CACHE_MAX_AGE'] = int(os.environ.get('DRAWIO2PPTX_CACHE_MAX_AGE', 7 * 24 * 3600))
+
+result_cache = ResultCache(app.config['OUTPUT_FOLDER'], __version__,
+                           max_bytes=app.config['CACHE_MAX_BYTES'],
+                           max_age=app.config['CACHE_MAX_AGE'])
+
+# Background conversions for the /jobs API
+app.config['JOB_WORKERS'] = int(os.environ.get('DRAWIO2PPTX_JOB_WORKERS', 2))
+
+app.config['JOB_QUEUE_DEPTH'] = int(os.environ.get('DRAWIO2PPTX_JOB_QUEUE_DEPTH', 16))
+
+job_queue = JobQueue(workers=app.config['JOB_WORKERS'],
+                     max_pending=app.config['JOB_QUEUE_DEPTH'])
+
+converting = {}  # cache key -> job whose conversion is filling that entry
+
 
 
 ALLOWED_EXTENSIONS = {'drawio', 'xml'}
@@ -70,49 +89,187 @@ def index():
 
             filename = secure_filename(file.filename)
 
-            unique_id = str(uuid.uuid4())
+            output_filename = f"{os.path.splitext(filename)[0]}.pptx"
 
-            input_path = os.path.join(
+            data = file.read()
 
-                app.config['UPLOAD_FOLDER'], f"{unique_id}_{filename}")
+            key = result_cache.key_for(data)
 
-            output_filename = f"{os.path.splitext(filename)[0]}.pptx"
 
-            output_path = os.path.join(
 
-                app.config['OUTPUT_FOLDER'], f"{unique_id}_{output_filename}")
+            try:
 
+                return send_converted(key, data, output_filename)
 
+            except Exception as e:
 
-            file.save(input_path)
+                flash(f"Error converting file: {str(e)}")
 
+                return redirect(request.url)
 
 
-            try:
 
-                convert(input_path, output_path)
+    return render_template('index.html', version=__version__)
 
-                return send_file(output_path, as_attachment=True, download_name=output_filename)
 
-            except Exception as e:
 
-                flash(f"Error converting file: {str(e)}")
 
-                return redirect(request.url)
 
-            finally:
+@app.route('/result/<key>')
 
-                # Cleanup could happen here or via a cron job
+def result(key):
+    """Re-download a cached conversion; supports If-None-Match."""
+    name = request.args.get('name', 'diagram.pptx')
+    if not all(c in '0123456789abcdef' for c in key) or len(key) != 64:
+        abort(404)
+    output_path = result_cache.get(key)
+    if output_path is None:
+        abort(404)
+    try:
+        return send_result(output_path, key, secure_filename(name) or 'diagram.pptx')
+    except FileNotFoundError:
+        abort(404)
 
-                pass
 
 
 
-    return render_template('index.html', version=__version__)
+
+@app.route('/jobs', methods=['POST'])
+
+def submit_job():
+    """Queue a conversion and return its id without waiting for it."""
+    file = request.files.get('file')
+    if file is None or not allowed_file(file.filename):
+        return jsonify(error='Expected a .drawio or .xml file'), 400
+
+    filename = secure_filename(file.filename)
+    data = file.read()
+    key = result_cache.key_for(data)
+
+    def run(job):
+        return convert_cached(key, data, job=job)
+
+    try:
+        job = job_queue.submit(run, meta=(key, f"{os.path.splitext(filename)[0]}.pptx"))
+    except QueueFull:
+        response = jsonify(error='Too many conversions in progress, try again later')
+        response.status_code = 429
+        response.headers['Retry-After'] = '5'
+        return response
+
+    response = jsonify(job_status(job))
+    response.status_code = 202
+    response.headers['Location'] = url_for('get_job', job_id=job.id)
+    return response
+
+
+
+
+
+@app.route('/jobs/<job_id>')
+
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(error='Unknown job'), 404
+    return jsonify(job_status(job))
+
+
+
+
+
+@app.route('/jobs/<job_id>/download')
+
+def download_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(error='Unknown job'), 404
+    if job.status != 'done':
+        return jsonify(job_status(job)), 409
+    key, download_name = job.meta
+    # The cached file may have been evicted since the job finished
+    output_path = result_cache.get(key)
+    if output_path is None:
+        return jsonify(error='Result has expired, submit the file again'), 410
+    try:
+        return send_result(output_path, key, download_name)
+    except FileNotFoundError:
+        return jsonify(error='Result has expired, submit the file again'), 410
+
+
+
+
+
+def job_status(job):
+    status = job.to_dict()
+    leader = converting.get(job.meta[0])
+    if job.status == 'running' and leader is not None and leader is not job:
+        # Same file as a conversion already running: report that one's progress
+        status.update(pages_done=leader.pages_done, pages_total=leader.pages_total,
+                      page=leader.page, progress=round(leader.fraction, 3))
+    if job.status == 'done':
+        status['download_url'] = url_for('download_job', job_id=job.id)
+    return status
+
+
+
+
+
+def convert_cached(key, data, job=None):
+    """Path of the cached conversion of `data`, converting it on a miss."""
+    def produce(output_path):
+        if job is not None:
+            converting[key] = job
+        try:
+            convert(data, output_path, progress=job.progress if job else None)
+        finally:
+            converting.pop(key, None)
+
+    return result_cache.get_or_create(key, produce)
+
+
+
+
+
+def send_converted(key, data, download_name):
+    """Respond with the conversion of `data`, converting it on a cache miss.
+
+    A fresh conversion is sent from memory as it is stored in the cache,
+    rather than being read back from disk.
+    """
+    converted = []
+
+    def produce(output_path):
+        pptx = convert_bytes(data)
+        with open(output_path, 'wb') as f:
+            f.write(pptx)
+        converted.append(pptx)
+
+    for attempt in range(2):
+        output_path = result_cache.get_or_create(key, produce)
+        if converted:
+            return send_result(io.BytesIO(converted[0]), key, download_name)
+        try:
+            return send_result(output_path, key, download_name)
+        except FileNotFoundError:
+            # Evicted between the cache lookup and opening it: convert again
+            if attempt:
+                raise
+
+
+
+
+
+def send_result(output, key, download_name):
+    """Send a path or in-memory file as the download for cache entry `key`."""
+    # The cache key is a content hash, so it doubles as a strong ETag
+    response = send_file(output, as_attachment=True, download_name=download_name,
+                         etag=key, conditional=True)
+    response.headers['X-Result-Location'] = url_for('result', key=key, name=download_name)
+    return response
 
 
 
 if __name__ == '__main__':
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
     app.run(host='0.0.0.0', port=5003)